@@ -1,10 +1,18 @@
+import os
+
 from django.contrib import admin
-from .models import Dataset, Equipment, EquipmentTypeSummary, PDFReport
+from django.http import FileResponse, Http404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from .models import (
+    Anomaly, Dataset, Equipment, EquipmentTypeSummary, Measurement, PDFReport, RequestProfile, TrackedEquipment, UploadSession,
+)
 
 
 @admin.register(Dataset)
 class DatasetAdmin(admin.ModelAdmin):
-    list_display = ['id', 'filename', 'upload_timestamp', 'total_equipment_count', 'file_hash']
+    list_display = ['id', 'filename', 'upload_timestamp', 'total_equipment_count', 'anomaly_count', 'file_hash']
 
 
 @admin.register(Equipment)
@@ -18,6 +26,71 @@ class EquipmentTypeSummaryAdmin(admin.ModelAdmin):
     list_display = ['id', 'dataset', 'equipment_type', 'count']
 
 
+@admin.register(Anomaly)
+class AnomalyAdmin(admin.ModelAdmin):
+    list_display = ['id', 'dataset', 'row_number', 'equipment_name', 'metric', 'rule', 'value']
+    list_filter = ['rule', 'metric']
+    raw_id_fields = ['dataset']
+
+
+@admin.register(TrackedEquipment)
+class TrackedEquipmentAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'equipment_type', 'owner', 'first_seen', 'last_seen']
+    search_fields = ['name_key']
+
+
+@admin.register(Measurement)
+class MeasurementAdmin(admin.ModelAdmin):
+    list_display = ['id', 'equipment', 'recorded_at', 'flowrate', 'pressure', 'temperature', 'dataset_id']
+    raw_id_fields = ['equipment', 'dataset']
+
+
 @admin.register(PDFReport)
 class PDFReportAdmin(admin.ModelAdmin):
     list_display = ['id', 'dataset', 'report_filename', 'generated_at', 'file_size']
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['id', 'filename', 'received_bytes', 'total_size', 'uploaded_by', 'updated_at']
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ['id', 'view_name', 'method', 'path', 'duration_ms', 'status_code', 'requested_by', 'created_at', 'download_link']
+    list_filter = ['view_name']
+    readonly_fields = [f.name for f in RequestProfile._meta.fields if f.name != 'summary'] + ['download_link', 'summary_display']
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        urls = [
+            path(
+                '<int:pk>/download/',
+                self.admin_site.admin_view(self.download_view),
+                name='api_requestprofile_download',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    @admin.display(description='Profile')
+    def download_link(self, obj):
+        if not obj.pk:
+            return '-'
+        url = reverse('admin:api_requestprofile_download', args=[obj.pk])
+        return format_html('<a href="{}">Download .prof</a>', url)
+
+    @admin.display(description='Top functions (cumulative)')
+    def summary_display(self, obj):
+        return format_html('<pre style="font-size: 11px">{}</pre>', obj.summary)
+
+    def download_view(self, request, pk):
+        profile = self.get_object(request, str(pk))
+        if profile is None or not os.path.exists(profile.file_path):
+            raise Http404
+        return FileResponse(
+            open(profile.file_path, 'rb'),
+            as_attachment=True,
+            filename=os.path.basename(profile.file_path),
+        )
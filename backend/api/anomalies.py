@@ -0,0 +1,170 @@
+"""
+Vectorised anomaly detection for uploaded datasets, configured by
+settings.ANOMALY_DETECTION (missing keys fall back to DEFAULTS).
+
+Every rule works per equipment type on whole DataFrame columns and
+reduces to a lower/upper bound per row, so cost grows linearly with the
+file and not with the number of types or flags:
+
+- range:   hard limits per type (RANGE_LIMITS; the '*' entry covers other types)
+- zscore:  further than ZSCORE_THRESHOLD standard deviations from the type mean
+- iqr:     outside [Q1 - IQR_FACTOR * IQR, Q3 + IQR_FACTOR * IQR] of the type
+- history: outside the min/max that earlier uploads in the same namespace
+           recorded for the type (EquipmentTypeSummary), widened by
+           HISTORY_MARGIN of that span
+
+pandas is imported lazily, as in api.utils.
+"""
+from django.conf import settings
+from django.db.models import Max, Min
+from typing import TYPE_CHECKING
+
+from .csv_schema import NUMERIC_COLUMNS
+from .models import Anomaly, EquipmentTypeSummary
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+RULES = ['range', 'zscore', 'iqr', 'history']
+
+DEFAULTS = {
+    'ENABLED': True,
+    'ZSCORE_THRESHOLD': 3.0,
+    'IQR_FACTOR': 1.5,
+    # Per-type statistics are meaningless for a handful of rows
+    'MIN_GROUP_SIZE': 8,
+    'HISTORY_MARGIN': 0.25,
+    'RANGE_LIMITS': {
+        '*': {'Flowrate': (0, None), 'Pressure': (0, None), 'Temperature': (-273.15, None)},
+    },
+    # Reject the upload instead of flagging rows that break RANGE_LIMITS
+    'REJECT_OUT_OF_RANGE': False,
+    # Flags stored per dataset; Dataset.anomaly_count still counts all of them
+    'MAX_STORED': 10000,
+}
+
+FLAG_COLUMNS = [
+    'row_number', 'equipment_name', 'equipment_type', 'metric', 'rule', 'value', 'lower', 'upper', 'score',
+]
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, 'ANOMALY_DETECTION', {})}
+
+
+def historical_bounds(user) -> dict:
+    """{type: {column: (min, max)}} over the namespace's stored type summaries."""
+    fields = {}
+    for col in NUMERIC_COLUMNS:
+        attr = col.lower()
+        fields[f'{attr}_lo'] = Min(f'min_{attr}')
+        fields[f'{attr}_hi'] = Max(f'max_{attr}')
+    rows = (
+        EquipmentTypeSummary.objects.filter(dataset__uploaded_by=user)
+        .values('equipment_type')
+        .annotate(**fields)
+    )
+
+    def _float(value):
+        return None if value is None else float(value)
+
+    return {
+        row['equipment_type']: {
+            col: (_float(row[f'{col.lower()}_lo']), _float(row[f'{col.lower()}_hi'])) for col in NUMERIC_COLUMNS
+        }
+        for row in rows
+    }
+
+
+def _bounds_by_type(types: 'pd.Series', bounds: dict, col: str, default=(None, None)):
+    """Per-row lower/upper float arrays from a {type: {col: (lo, hi)}} mapping (NaN: no bound)."""
+    lo = {t: b[col][0] for t, b in bounds.items() if col in b and b[col][0] is not None}
+    hi = {t: b[col][1] for t, b in bounds.items() if col in b and b[col][1] is not None}
+    lower = types.map(lo).astype('float64')
+    upper = types.map(hi).astype('float64')
+    if default[0] is not None:
+        lower = lower.fillna(float(default[0]))
+    if default[1] is not None:
+        upper = upper.fillna(float(default[1]))
+    return lower.to_numpy(), upper.to_numpy()
+
+
+def detect_anomalies(df: 'pd.DataFrame', history: dict = None, config: dict = None) -> 'pd.DataFrame':
+    """
+    Flag implausible readings in a parsed upload (see utils.parse_upload).
+    Returns one row per (row, metric, rule) with FLAG_COLUMNS, ordered by row.
+    """
+    import numpy as np
+    import pandas as pd
+
+    config = config or get_config()
+    types = df['Type'].astype(str)
+    grouped = df.groupby(types)[NUMERIC_COLUMNS]
+    large_group = (types.map(types.value_counts()) >= config['MIN_GROUP_SIZE']).to_numpy()
+
+    mean = grouped.transform('mean')
+    std = grouped.transform('std')
+    q1 = grouped.transform('quantile', 0.25)
+    q3 = grouped.transform('quantile', 0.75)
+
+    limits = dict(config['RANGE_LIMITS'])
+    default_limits = limits.pop('*', {})
+    frames = []
+    for col in NUMERIC_COLUMNS:
+        values = df[col].to_numpy(dtype=np.float64)
+        sigma = std[col].to_numpy()
+        spread = config['ZSCORE_THRESHOLD'] * sigma
+        iqr = config['IQR_FACTOR'] * (q3[col] - q1[col]).to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            zscore = (values - mean[col].to_numpy()) / sigma
+        rules = {
+            'range': _bounds_by_type(types, limits, col, default_limits.get(col, (None, None))),
+            'zscore': tuple(np.where(large_group & (sigma > 0), b, np.nan) for b in (
+                mean[col].to_numpy() - spread, mean[col].to_numpy() + spread,
+            )),
+            'iqr': tuple(np.where(large_group, b, np.nan) for b in (
+                q1[col].to_numpy() - iqr, q3[col].to_numpy() + iqr,
+            )),
+        }
+        if history:
+            lower, upper = _bounds_by_type(types, history, col)
+            margin = config['HISTORY_MARGIN'] * (upper - lower)
+            rules['history'] = (lower - margin, upper + margin)
+
+        for rule, (lower, upper) in rules.items():
+            # NaN bounds (no limit, small group, unseen type) never flag
+            mask = (values < lower) | (values > upper)
+            if not mask.any():
+                continue
+            idx = np.flatnonzero(mask)
+            frames.append(pd.DataFrame({
+                'row_number': idx + 1,
+                'equipment_name': df['Equipment Name'].astype(str).to_numpy()[idx],
+                'equipment_type': types.to_numpy()[idx],
+                'metric': col.lower(),
+                'rule': rule,
+                'value': values[idx],
+                'lower': lower[idx],
+                'upper': upper[idx],
+                'score': zscore[idx] if rule == 'zscore' else np.nan,
+            }))
+    if not frames:
+        return pd.DataFrame(columns=FLAG_COLUMNS)
+    return pd.concat(frames, ignore_index=True).sort_values(['row_number', 'metric', 'rule'], kind='stable')
+
+
+def save_anomalies(dataset, flags: 'pd.DataFrame', limit: int, batch_size: int = 2000) -> None:
+    """Store up to `limit` flags (lowest rows first) for the dataset."""
+    import pandas as pd
+
+    def _float(value):
+        return None if pd.isna(value) else float(value)
+
+    Anomaly.objects.bulk_create((
+        Anomaly(
+            dataset=dataset, row_number=int(row.row_number), equipment_name=row.equipment_name[:255],
+            equipment_type=row.equipment_type[:100], metric=row.metric, rule=row.rule,
+            value=float(row.value), lower=_float(row.lower), upper=_float(row.upper), score=_float(row.score),
+        )
+        for row in flags.head(limit).itertuples(index=False)
+    ), batch_size=batch_size)
@@ -0,0 +1,112 @@
+"""
+CSV schema rules shared by the server parser and the desktop pre-upload validator.
+
+Keep this module dependency-free: desktop-frontend/services/csv_schema.py is a
+verbatim copy, and the test suite fails if the two drift apart.
+"""
+import math
+
+REQUIRED_COLUMNS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+NUMERIC_COLUMNS = ['Flowrate', 'Pressure', 'Temperature']
+
+# Readings are stored in these units whatever the file used
+CANONICAL_UNITS = {'Flowrate': 'm3/h', 'Pressure': 'bar', 'Temperature': 'C'}
+
+# (factor, offset) taking a reading in each unit to the canonical one: value * factor + offset
+UNITS = {
+    'Flowrate': {'m3/h': (1.0, 0.0), 'L/min': (0.06, 0.0), 'L/s': (3.6, 0.0), 'gpm': (0.22712470704, 0.0)},
+    'Pressure': {
+        'bar': (1.0, 0.0), 'Pa': (1e-5, 0.0), 'kPa': (0.01, 0.0), 'MPa': (10.0, 0.0),
+        'psi': (0.0689475729, 0.0), 'atm': (1.01325, 0.0),
+    },
+    'Temperature': {'C': (1.0, 0.0), 'F': (5 / 9, -160 / 9), 'K': (1.0, -273.15)},
+}
+UNIT_ALIASES = {
+    'm³/h': 'm3/h', 'm3/hr': 'm3/h', 'lpm': 'L/min', 'l/m': 'L/min', 'usgpm': 'gpm',
+    '°c': 'C', 'degc': 'C', 'celsius': 'C', '°f': 'F', 'degf': 'F', 'fahrenheit': 'F', 'kelvin': 'K',
+}
+
+# Cell values pandas.read_csv treats as missing; they fail the numeric check
+NA_VALUES = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+])
+
+
+def split_unit(header):
+    """'Pressure (psi)' or 'Pressure [psi]' -> ('Pressure', 'psi'); (header, None) without a suffix."""
+    header = str(header).strip()
+    for opening, closing in ('()', '[]'):
+        if header.endswith(closing) and opening in header:
+            name, _, unit = header[:-1].rpartition(opening)
+            return name.strip(), unit.strip()
+    return header, None
+
+
+def normalise_unit(column, unit):
+    """Spelling of `unit` used in UNITS for a numeric column; raises ValueError if unknown."""
+    known = UNITS[column]
+    key = str(unit).strip().lower().replace(' ', '')
+    for name in known:
+        if name.lower() == key:
+            return name
+    if UNIT_ALIASES.get(key) in known:
+        return UNIT_ALIASES[key]
+    raise ValueError(f"Unknown unit '{unit}' for {column}. Use one of: {', '.join(known)}")
+
+
+def resolve_columns(columns):
+    """
+    Match headers to REQUIRED_COLUMNS (whitespace-stripped, case-insensitive,
+    ignoring a unit suffix such as ' (psi)').
+    Returns {header: canonical name}; raises ValueError naming missing columns.
+    """
+    headers = [str(c).strip() for c in columns]
+    col_map = {split_unit(c)[0].lower(): c for c in headers}
+    missing = [req for req in REQUIRED_COLUMNS if req.lower() not in col_map]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}. Found: {', '.join(headers)}")
+    return {col_map[req.lower()]: req for req in REQUIRED_COLUMNS}
+
+
+def resolve_units(columns, requested=None):
+    """
+    Unit of each numeric column: the header suffix, else requested[column]
+    (e.g. an upload parameter), else the canonical unit. Raises ValueError for
+    unknown units or a suffix that contradicts the request.
+    """
+    requested = requested or {}
+    units = {}
+    for header in columns:
+        name, suffix = split_unit(header)
+        for column in NUMERIC_COLUMNS:
+            if suffix is not None and column.lower() == name.lower():
+                units[column] = normalise_unit(column, suffix)
+    for column in NUMERIC_COLUMNS:
+        if requested.get(column):
+            unit = normalise_unit(column, requested[column])
+            if units.setdefault(column, unit) != unit:
+                raise ValueError(f"{column} is in {units[column]} according to its header, not {unit}")
+        units.setdefault(column, CANONICAL_UNITS[column])
+    return units
+
+
+def from_canonical(column, unit):
+    """(factor, offset) taking a canonical reading to `unit`; the inverse of UNITS[column][unit]."""
+    factor, offset = UNITS[column][unit]
+    return 1 / factor, -offset / factor
+
+
+def non_numeric_error(column):
+    return f"Column '{column}' contains non-numeric values"
+
+
+def parse_numeric(text):
+    """Convert one cell of a numeric column; raises ValueError where the server would."""
+    value = text.strip()
+    if value in NA_VALUES or text in NA_VALUES or '_' in value:
+        raise ValueError(value)
+    number = float(value)
+    if math.isnan(number):
+        raise ValueError(value)
+    return number
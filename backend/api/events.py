@@ -0,0 +1,146 @@
+"""
+In-process event broadcasting for the Server-Sent Events endpoint (/api/events/).
+
+Views publish dataset-created, dataset-pruned, job-progress and
+report-ready events into a dataset namespace (the owning user's id, or
+None for anonymous uploads); a stream only receives its own namespace.
+Recent events are kept in a ring buffer so a client reconnecting with
+Last-Event-ID gets what it missed (or a "resync" event if the gap is too
+old); a fresh stream starts with a "hello" event carrying the current id. The broker lives in process memory: run a single ASGI worker, or
+replace it with a shared layer, when scaling out.
+"""
+import asyncio
+import collections
+import itertools
+import json
+import queue
+import threading
+
+DATASET_CREATED = 'dataset-created'
+DATASET_PRUNED = 'dataset-pruned'
+JOB_PROGRESS = 'job-progress'
+REPORT_READY = 'report-ready'
+RESYNC = 'resync'
+HELLO = 'hello'
+
+# Reconnect delay suggested to EventSource clients
+RETRY_MS = 3000
+
+Event = collections.namedtuple('Event', ['id', 'type', 'data', 'namespace'])
+
+
+def format_sse(event):
+    data = json.dumps(event.data, separators=(',', ':'))
+    # Resync carries no id so it does not move the client's Last-Event-ID
+    prefix = f'id: {event.id}\n' if event.id is not None else ''
+    return f'{prefix}event: {event.type}\ndata: {data}\n\n'
+
+
+class Subscription:
+    """One connected stream. deliver() may be called from any thread."""
+
+    def __init__(self, broker, namespace, max_pending, loop=None):
+        self.broker = broker
+        self.namespace = namespace
+        self.overflowed = False
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._loop = loop
+        self._wakeup = asyncio.Event() if loop is not None else None
+
+    def deliver(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # A stalled client is disconnected; it reconnects with Last-Event-ID and backfills
+            self.overflowed = True
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass  # event loop already closed
+
+    def get(self, timeout):
+        """Blocking wait for the next event (WSGI); None on timeout."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    async def aget(self, timeout):
+        """Async wait for the next event (ASGI); None on timeout."""
+        while True:
+            try:
+                return self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            self._wakeup.clear()
+            if not self._queue.empty():
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class EventBroker:
+    def __init__(self, history=256, max_pending=1000):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._history = collections.deque(maxlen=history)
+        self._subscribers = set()
+        self.max_pending = max_pending
+
+    def publish(self, namespace, event_type, data):
+        with self._lock:
+            event = Event(next(self._ids), event_type, data, namespace)
+            self._history.append(event)
+            subscribers = [s for s in self._subscribers if s.namespace == namespace]
+        for subscription in subscribers:
+            subscription.deliver(event)
+        return event
+
+    def subscribe(self, namespace=None, last_event_id=None, loop=None):
+        """
+        Register a stream, queueing any buffered events after last_event_id.
+        A stream without one gets a hello event with the current id instead, so
+        its reconnects can be checked for gaps even if nothing was published.
+        """
+        subscription = Subscription(self, namespace, self.max_pending, loop)
+        with self._lock:
+            newest = self._history[-1].id if self._history else 0
+            if last_event_id is None:
+                subscription.deliver(Event(newest, HELLO, {}, namespace))
+            else:
+                oldest = self._history[0].id if self._history else 1
+                # Too far behind the ring buffer, or an id from before a server restart
+                if last_event_id < oldest - 1 or last_event_id > newest:
+                    subscription.deliver(Event(None, RESYNC, {}, namespace))
+                for event in self._history:
+                    if event.id > last_event_id and event.namespace == namespace:
+                        subscription.deliver(event)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+BROKER = EventBroker()
+
+
+def publish(namespace, event_type, **data):
+    return BROKER.publish(namespace, event_type, data)
+
+
+def job_progress(namespace, job, job_id, progress, **data):
+    """Broadcast progress (0..1) of a long-running job such as an upload or report build."""
+    return publish(namespace, JOB_PROGRESS, job=job, job_id=str(job_id), progress=round(progress, 4), **data)
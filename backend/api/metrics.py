@@ -0,0 +1,135 @@
+"""
+In-process metrics registry rendered in the Prometheus text exposition format.
+
+Metrics are kept per worker process; scrape each worker (or run a single
+worker) to get a complete picture.
+"""
+import threading
+
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 500, 1000, 10000, 100000)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000, 100000000)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(pairs) -> str:
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+    type_name = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, '') for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f'{self.name}{_format_labels(list(zip(self.labelnames, key)))} {_format_value(value)}'
+            for key, value in items
+        ]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, '') for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def collect(self):
+        with self._lock:
+            items = sorted((key, [list(s[0]), s[1], s[2]]) for key, s in self._series.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{_format_labels(pairs + [("le", _format_value(float(bound)))])} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(pairs)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(pairs)} {count}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUESTS_TOTAL = REGISTRY.register(Counter(
+    'api_requests_total', 'Total HTTP requests handled.', ['endpoint', 'method', 'status'],
+))
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    'api_request_duration_seconds', 'End-to-end request latency.', ['endpoint', 'method'],
+))
+DB_QUERIES = REGISTRY.register(Histogram(
+    'api_request_db_queries', 'SQL queries executed per request.', ['endpoint'], buckets=QUERY_COUNT_BUCKETS,
+))
+DB_TIME = REGISTRY.register(Histogram(
+    'api_request_db_duration_seconds', 'Time spent in SQL per request.', ['endpoint'],
+))
+RENDER_TIME = REGISTRY.register(Histogram(
+    'api_response_render_duration_seconds', 'Time spent serialising/rendering the response body.', ['endpoint'],
+))
+RESPONSE_SIZE = REGISTRY.register(Histogram(
+    'api_response_size_bytes', 'Response body size (non-streaming responses).', ['endpoint'], buckets=SIZE_BUCKETS,
+))
@@ -0,0 +1,109 @@
+"""
+Request instrumentation: latency, SQL query counts/time, render time and
+response size, plus a slow-request log listing the most expensive SQL.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.middleware.gzip import GZipMiddleware as DjangoGZipMiddleware
+
+from . import metrics
+
+logger = logging.getLogger('api.instrumentation')
+
+
+class QueryStats:
+    """DB execute wrapper that aggregates queries by SQL text for one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.statements = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.time += elapsed
+            entry = self.statements.get(sql)
+            if entry is None:
+                self.statements[sql] = [1, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+
+    def top(self, n):
+        """Return the n statements with the highest total time as (sql, count, seconds)."""
+        ranked = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)
+        return [(sql, count, total) for sql, (count, total) in ranked[:n]]
+
+
+def _endpoint(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return '/' + match.route if match.route else match.view_name or 'unknown'
+
+
+class InstrumentationMiddleware:
+    """Record per-endpoint metrics for every request (see api.metrics)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        request._render_time = 0.0
+        start = time.perf_counter()
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        endpoint = _endpoint(request)
+        metrics.REQUESTS_TOTAL.inc(endpoint=endpoint, method=request.method, status=str(response.status_code))
+        metrics.REQUEST_LATENCY.observe(elapsed, endpoint=endpoint, method=request.method)
+        metrics.DB_QUERIES.observe(stats.count, endpoint=endpoint)
+        metrics.DB_TIME.observe(stats.time, endpoint=endpoint)
+        if request._render_time:
+            metrics.RENDER_TIME.observe(request._render_time, endpoint=endpoint)
+        if not response.streaming:
+            metrics.RESPONSE_SIZE.observe(len(response.content), endpoint=endpoint)
+
+        threshold = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 1000) / 1000.0
+        if elapsed >= threshold:
+            self._log_slow_request(request, response, elapsed, stats)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time the render step.
+        start = time.perf_counter()
+
+        def _record(rendered):
+            request._render_time += time.perf_counter() - start
+
+        response.add_post_render_callback(_record)
+        return response
+
+    def _log_slow_request(self, request, response, elapsed, stats):
+        top_n = getattr(settings, 'SLOW_REQUEST_TOP_SQL', 5)
+        lines = [
+            f'Slow request: {request.method} {request.path} -> {response.status_code} '
+            f'in {elapsed * 1000:.0f}ms ({stats.count} queries, {stats.time * 1000:.0f}ms in SQL)'
+        ]
+        for sql, count, total in stats.top(top_n):
+            lines.append(f'  {count:>7}x {total * 1000:9.1f}ms  {sql[:300]}')
+        logger.warning('\n'.join(lines))
+
+
+class GZipMiddleware(DjangoGZipMiddleware):
+    """GZip, except for event streams: the compressor would hold back each small event."""
+
+    def process_response(self, request, response):
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+        return super().process_response(request, response)
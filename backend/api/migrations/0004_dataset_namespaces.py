@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 23:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_upload_session'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dataset',
+            name='file_hash',
+            field=models.CharField(db_index=True, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=models.Index(fields=['uploaded_by', 'upload_timestamp'], name='dataset_owner_uploaded_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dataset',
+            constraint=models.UniqueConstraint(fields=('uploaded_by', 'file_hash'), name='unique_dataset_per_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='dataset',
+            constraint=models.UniqueConstraint(condition=models.Q(('uploaded_by__isnull', True)), fields=('file_hash',), name='unique_anonymous_dataset'),
+        ),
+    ]
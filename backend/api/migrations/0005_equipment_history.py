@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-18 23:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0004_dataset_namespaces'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackedEquipment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name_key', models.CharField(max_length=255)),
+                ('name', models.CharField(max_length=255)),
+                ('equipment_type', models.CharField(max_length=100)),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tracked_equipment', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Tracked equipment',
+                'ordering': ['name_key'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Measurement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField()),
+                ('flowrate', models.FloatField()),
+                ('pressure', models.FloatField()),
+                ('temperature', models.FloatField()),
+                ('dataset', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='measurements', to='api.dataset')),
+                ('equipment', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='measurements', to='api.trackedequipment')),
+            ],
+            options={
+                'ordering': ['recorded_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='trackedequipment',
+            constraint=models.UniqueConstraint(fields=('owner', 'name_key'), name='unique_equipment_per_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='trackedequipment',
+            constraint=models.UniqueConstraint(condition=models.Q(('owner__isnull', True)), fields=('name_key',), name='unique_anonymous_equipment'),
+        ),
+        migrations.AddIndex(
+            model_name='measurement',
+            index=models.Index(fields=['equipment', 'recorded_at'], name='measurement_series_idx'),
+        ),
+    ]
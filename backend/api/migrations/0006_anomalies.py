@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-18 23:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_equipment_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='anomaly_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='Anomaly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row_number', models.IntegerField()),
+                ('equipment_name', models.CharField(max_length=255)),
+                ('equipment_type', models.CharField(max_length=100)),
+                ('metric', models.CharField(max_length=20)),
+                ('rule', models.CharField(choices=[('range', 'Outside range limits'), ('zscore', 'Z-score outlier'), ('iqr', 'IQR outlier'), ('history', 'Outside historical range')], max_length=10)),
+                ('value', models.FloatField()),
+                ('lower', models.FloatField(blank=True, null=True)),
+                ('upper', models.FloatField(blank=True, null=True)),
+                ('score', models.FloatField(blank=True, null=True)),
+                ('dataset', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='anomalies', to='api.dataset')),
+            ],
+            options={
+                'verbose_name_plural': 'Anomalies',
+                'ordering': ['row_number', 'metric', 'rule'],
+                'indexes': [models.Index(fields=['dataset', 'row_number'], name='anomaly_dataset_row_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 23:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_anomalies'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='source_units',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 23:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_dataset_source_units'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='extra_columns',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='extra_values',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipmenttypesummary',
+            name='extra_stats',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 23:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0008_extra_columns'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dataset',
+            name='uploaded_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='datasets', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 4.2.30 on 2026-10-18 23:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_dataset_owner_cascade'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dataset',
+            name='avg_flowrate',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='dataset',
+            name='avg_pressure',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='dataset',
+            name='avg_temperature',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='equipment',
+            name='flowrate',
+            field=models.FloatField(),
+        ),
+        migrations.AlterField(
+            model_name='equipment',
+            name='pressure',
+            field=models.FloatField(),
+        ),
+        migrations.AlterField(
+            model_name='equipment',
+            name='temperature',
+            field=models.FloatField(),
+        ),
+        migrations.AlterField(
+            model_name='equipmenttypesummary',
+            name='avg_flowrate',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='equipmenttypesummary',
+            name='avg_pressure',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='equipmenttypesummary',
+            name='avg_temperature',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='equipmenttypesummary',
+            name='max_flowrate',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='equipmenttypesummary',
+            name='max_pressure',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='equipmenttypesummary',
+            name='max_temperature',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='equipmenttypesummary',
+            name='min_flowrate',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='equipmenttypesummary',
+            name='min_pressure',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='equipmenttypesummary',
+            name='min_temperature',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -2,6 +2,8 @@
 Models for Chemical Equipment Parameter Visualizer.
 """
 import hashlib
+import os
+import uuid
 from decimal import Decimal
 from django.db import models
 from django.conf import settings
@@ -12,13 +14,21 @@ class Dataset(models.Model):
     filename = models.CharField(max_length=255)
     upload_timestamp = models.DateTimeField(auto_now_add=True)
     total_equipment_count = models.IntegerField(default=0)
-    avg_flowrate = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
-    avg_pressure = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
-    avg_temperature = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
-    file_hash = models.CharField(max_length=64, unique=True, db_index=True)
+    avg_flowrate = models.FloatField(null=True, blank=True)
+    avg_pressure = models.FloatField(null=True, blank=True)
+    avg_temperature = models.FloatField(null=True, blank=True)
+    file_hash = models.CharField(max_length=64, db_index=True)
+    # Rows x checks flagged at ingest (api.anomalies); may exceed the Anomaly rows kept
+    anomaly_count = models.IntegerField(default=0)
+    # Units the file reported readings in ({column: unit}); stored readings are in csv_schema.CANONICAL_UNITS
+    source_units = models.JSONField(default=dict, blank=True)
+    # Names of the file's additional numeric columns, in the order of Equipment.extra_values
+    extra_columns = models.JSONField(default=list, blank=True)
+    # Each user's datasets form a namespace (anonymous uploads share one); lists, dedup and retention are per namespace.
+    # Deleting a user deletes their datasets rather than publishing them to the anonymous namespace.
     uploaded_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.SET_NULL,
+        on_delete=models.CASCADE,
         null=True,
         blank=True,
         related_name='datasets'
@@ -28,6 +38,14 @@ class Dataset(models.Model):
         ordering = ['-upload_timestamp']
         indexes = [
             models.Index(fields=['upload_timestamp']),
+            models.Index(fields=['uploaded_by', 'upload_timestamp'], name='dataset_owner_uploaded_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['uploaded_by', 'file_hash'], name='unique_dataset_per_user'),
+            # NULLs never collide in a unique index, so the anonymous namespace needs its own
+            models.UniqueConstraint(
+                fields=['file_hash'], condition=models.Q(uploaded_by__isnull=True), name='unique_anonymous_dataset'
+            ),
         ]
 
     def __str__(self):
@@ -39,10 +57,13 @@ class Equipment(models.Model):
     dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='equipment_list', db_index=True)
     equipment_name = models.CharField(max_length=255)
     equipment_type = models.CharField(max_length=100, db_index=True)
-    flowrate = models.DecimalField(max_digits=12, decimal_places=2)
-    pressure = models.DecimalField(max_digits=12, decimal_places=2)
-    temperature = models.DecimalField(max_digits=12, decimal_places=2)
+    # Canonical units (csv_schema.CANONICAL_UNITS); floats so converted readings keep their precision
+    flowrate = models.FloatField()
+    pressure = models.FloatField()
+    temperature = models.FloatField()
     row_number = models.IntegerField(default=0)
+    # Readings of Dataset.extra_columns, positionally (None where the cell was empty)
+    extra_values = models.JSONField(null=True, blank=True)
 
     class Meta:
         ordering = ['row_number']
@@ -60,15 +81,17 @@ class EquipmentTypeSummary(models.Model):
     dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='type_summaries', db_index=True)
     equipment_type = models.CharField(max_length=100, db_index=True)
     count = models.IntegerField(default=0)
-    avg_flowrate = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
-    avg_pressure = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
-    avg_temperature = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
-    min_flowrate = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
-    max_flowrate = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
-    min_pressure = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
-    max_pressure = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
-    min_temperature = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
-    max_temperature = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    avg_flowrate = models.FloatField(null=True, blank=True)
+    avg_pressure = models.FloatField(null=True, blank=True)
+    avg_temperature = models.FloatField(null=True, blank=True)
+    min_flowrate = models.FloatField(null=True, blank=True)
+    max_flowrate = models.FloatField(null=True, blank=True)
+    min_pressure = models.FloatField(null=True, blank=True)
+    max_pressure = models.FloatField(null=True, blank=True)
+    min_temperature = models.FloatField(null=True, blank=True)
+    max_temperature = models.FloatField(null=True, blank=True)
+    # {column: {'avg', 'min', 'max', 'count'}} for Dataset.extra_columns
+    extra_stats = models.JSONField(default=dict, blank=True)
 
     class Meta:
         ordering = ['equipment_type']
@@ -78,6 +101,86 @@ class EquipmentTypeSummary(models.Model):
         verbose_name_plural = 'Equipment type summaries'
 
 
+class Anomaly(models.Model):
+    """A reading flagged at ingest by one of the checks in api.anomalies."""
+    RULE_CHOICES = [
+        ('range', 'Outside range limits'),
+        ('zscore', 'Z-score outlier'),
+        ('iqr', 'IQR outlier'),
+        ('history', 'Outside historical range'),
+    ]
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='anomalies', db_index=False)
+    row_number = models.IntegerField()
+    equipment_name = models.CharField(max_length=255)
+    equipment_type = models.CharField(max_length=100)
+    metric = models.CharField(max_length=20)
+    rule = models.CharField(max_length=10, choices=RULE_CHOICES)
+    value = models.FloatField()
+    lower = models.FloatField(null=True, blank=True)
+    upper = models.FloatField(null=True, blank=True)
+    score = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['row_number', 'metric', 'rule']
+        indexes = [
+            models.Index(fields=['dataset', 'row_number'], name='anomaly_dataset_row_idx'),
+        ]
+        verbose_name_plural = 'Anomalies'
+
+    def __str__(self):
+        return f"Row {self.row_number} {self.metric} ({self.rule})"
+
+
+class TrackedEquipment(models.Model):
+    """
+    Registry of physical equipment across uploads, keyed by normalised
+    equipment name within the owner's namespace (see Dataset.uploaded_by).
+    """
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='tracked_equipment'
+    )
+    name_key = models.CharField(max_length=255)
+    name = models.CharField(max_length=255)
+    equipment_type = models.CharField(max_length=100)
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        ordering = ['name_key']
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'name_key'], name='unique_equipment_per_user'),
+            models.UniqueConstraint(
+                fields=['name_key'], condition=models.Q(owner__isnull=True), name='unique_anonymous_equipment'
+            ),
+        ]
+        verbose_name_plural = 'Tracked equipment'
+
+    def __str__(self):
+        return f"{self.name} ({self.equipment_type})"
+
+
+class Measurement(models.Model):
+    """Append-only time series: one reading per tracked equipment row of each upload."""
+    # Covered by the (equipment, recorded_at) index, which serves every history range scan
+    equipment = models.ForeignKey(TrackedEquipment, on_delete=models.CASCADE, related_name='measurements', db_index=False)
+    # History outlives dataset retention (MEASUREMENT_RETENTION_DAYS bounds it instead)
+    dataset = models.ForeignKey(Dataset, on_delete=models.SET_NULL, null=True, blank=True, related_name='measurements')
+    recorded_at = models.DateTimeField()
+    flowrate = models.FloatField()
+    pressure = models.FloatField()
+    temperature = models.FloatField()
+
+    class Meta:
+        ordering = ['recorded_at']
+        indexes = [
+            models.Index(fields=['equipment', 'recorded_at'], name='measurement_series_idx'),
+        ]
+
+
 class PDFReport(models.Model):
     """Generated PDF reports for datasets."""
     dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='reports', db_index=True)
@@ -90,6 +193,62 @@ class PDFReport(models.Model):
         return f"{self.report_filename} for dataset {self.dataset_id}"
 
 
+class RequestProfile(models.Model):
+    """cProfile capture of a single request, taken on demand by a staff user."""
+    view_name = models.CharField(max_length=100)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='request_profiles'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    duration_ms = models.FloatField(default=0)
+    status_code = models.IntegerField(default=0)
+    file_path = models.CharField(max_length=500)
+    file_size = models.BigIntegerField(default=0)
+    summary = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f}ms)"
+
+
+
+class UploadSession(models.Model):
+    """A resumable chunked upload; chunks are appended to a part file until finalised."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    total_size = models.BigIntegerField()
+    file_hash = models.CharField(max_length=64, db_index=True)
+    chunk_size = models.IntegerField()
+    received_bytes = models.BigIntegerField(default=0)
+    uploaded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='upload_sessions'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-updated_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_bytes}/{self.total_size} bytes)"
+
+    @property
+    def part_path(self):
+        return os.path.join(settings.MEDIA_ROOT, 'uploads', f'{self.id}.part')
+
+
 def compute_file_hash(content_bytes):
     """Compute SHA256 hash of file content for duplicate detection."""
     return hashlib.sha256(content_bytes).hexdigest()
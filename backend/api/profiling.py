@@ -0,0 +1,84 @@
+"""
+Opt-in per-request profiling for hot endpoints.
+
+Staff users can send ``X-Profile: 1`` (or ``?profile=1``) to a decorated view.
+The view runs under cProfile; the raw stats are written to
+``MEDIA_ROOT/profiles`` and indexed by a RequestProfile row, which can be
+browsed and downloaded from the admin.
+"""
+import cProfile
+import functools
+import io
+import logging
+import pstats
+import time
+import uuid
+
+from django.conf import settings
+
+from .models import RequestProfile
+
+logger = logging.getLogger(__name__)
+
+TRUTHY = ('1', 'true', 'yes')
+
+
+def profiling_requested(request) -> bool:
+    """True when a staff user asked for this request to be profiled."""
+    if not getattr(settings, 'REQUEST_PROFILING_ENABLED', True):
+        return False
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated or not user.is_staff:
+        return False
+    flag = request.headers.get('X-Profile') or request.GET.get('profile', '')
+    return flag.lower() in TRUTHY
+
+
+def _save_profile(request, view_name, profiler, duration, response):
+    profile_dir = settings.MEDIA_ROOT / 'profiles'
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    file_path = profile_dir / f'{view_name}-{stamp}-{uuid.uuid4().hex[:8]}.prof'
+    profiler.dump_stats(str(file_path))
+
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats('cumulative').print_stats(getattr(settings, 'REQUEST_PROFILE_SUMMARY_LINES', 40))
+
+    return RequestProfile.objects.create(
+        view_name=view_name,
+        method=request.method,
+        path=request.get_full_path()[:500],
+        requested_by=request.user,
+        duration_ms=duration * 1000,
+        status_code=getattr(response, 'status_code', 0),
+        file_path=str(file_path),
+        file_size=file_path.stat().st_size,
+        summary=out.getvalue(),
+    )
+
+
+def profiled(view_func):
+    """
+    Decorator for function views that enables opt-in cProfile capture.
+    Place it below @api_view so request.user is the DRF-authenticated user.
+    """
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not profiling_requested(request):
+            return view_func(request, *args, **kwargs)
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = view_func(request, *args, **kwargs)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - start
+        try:
+            record = _save_profile(request, view_func.__name__, profiler, duration, response)
+            response['X-Profile-Id'] = str(record.id)
+        except Exception:
+            logger.exception('Saving request profile failed')
+        return response
+    return wrapper
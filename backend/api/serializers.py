@@ -4,7 +4,8 @@ Serializers for Chemical Equipment API.
 from rest_framework import serializers
 from django.contrib.auth.models import User
 
-from .models import Dataset, Equipment, EquipmentTypeSummary
+from .models import Anomaly, Dataset, Equipment, EquipmentTypeSummary, TrackedEquipment
+from .utils import DISPLAY_DECIMALS, with_display_units
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -16,7 +17,10 @@ class UserSerializer(serializers.ModelSerializer):
 class EquipmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Equipment
-        fields = ['id', 'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature', 'row_number']
+        fields = [
+            'id', 'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature', 'row_number',
+            'extra_values',
+        ]
 
 
 class EquipmentTypeSummarySerializer(serializers.ModelSerializer):
@@ -26,14 +30,28 @@ class EquipmentTypeSummarySerializer(serializers.ModelSerializer):
             'id', 'equipment_type', 'count',
             'avg_flowrate', 'avg_pressure', 'avg_temperature',
             'min_flowrate', 'max_flowrate', 'min_pressure', 'max_pressure',
-            'min_temperature', 'max_temperature',
+            'min_temperature', 'max_temperature', 'extra_stats',
         ]
 
 
+class AnomalySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Anomaly
+        fields = [
+            'id', 'row_number', 'equipment_name', 'equipment_type', 'metric', 'rule', 'value', 'lower', 'upper', 'score',
+        ]
+
+
+class TrackedEquipmentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TrackedEquipment
+        fields = ['id', 'name', 'equipment_type', 'first_seen', 'last_seen']
+
+
 class DatasetListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Dataset
-        fields = ['id', 'filename', 'upload_timestamp', 'total_equipment_count', 'avg_flowrate', 'avg_pressure', 'avg_temperature']
+        fields = ['id', 'filename', 'upload_timestamp', 'total_equipment_count', 'avg_flowrate', 'avg_pressure', 'avg_temperature', 'file_hash', 'anomaly_count', 'source_units', 'extra_columns']
 
 
 class DatasetDetailSerializer(serializers.ModelSerializer):
@@ -44,6 +62,43 @@ class DatasetDetailSerializer(serializers.ModelSerializer):
         model = Dataset
         fields = [
             'id', 'filename', 'upload_timestamp', 'total_equipment_count',
-            'avg_flowrate', 'avg_pressure', 'avg_temperature',
-            'equipment_list', 'type_summaries',
+            'avg_flowrate', 'avg_pressure', 'avg_temperature', 'file_hash', 'anomaly_count', 'source_units',
+            'extra_columns', 'equipment_list', 'type_summaries',
         ]
+
+
+class DisplayUnitsMixin:
+    """
+    Report avg_/min_/max_ reading fields in display units, from
+    context['conversions'] ({metric: (factor, offset)}, see utils.display_conversions).
+    Meant for per-dataset and per-type rows; equipment rows are converted by the database.
+    """
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        for metric, (factor, offset) in self.context.get('conversions', {}).items():
+            for name in (f'avg_{metric}', f'min_{metric}', f'max_{metric}'):
+                if data.get(name) is not None:
+                    data[name] = round(data[name] * factor + offset, DISPLAY_DECIMALS)
+        return data
+
+
+class DisplayEquipmentSerializer(EquipmentSerializer):
+    """EquipmentSerializer over a with_display_units() queryset."""
+    flowrate = serializers.FloatField(source='flowrate_display')
+    pressure = serializers.FloatField(source='pressure_display')
+    temperature = serializers.FloatField(source='temperature_display')
+
+
+class DisplayTypeSummarySerializer(DisplayUnitsMixin, EquipmentTypeSummarySerializer):
+    pass
+
+
+class DisplayDatasetDetailSerializer(DisplayUnitsMixin, DatasetDetailSerializer):
+    """DatasetDetailSerializer in the display units of context['conversions']."""
+    equipment_list = serializers.SerializerMethodField()
+    type_summaries = DisplayTypeSummarySerializer(many=True, read_only=True)
+
+    def get_equipment_list(self, dataset):
+        rows = with_display_units(dataset.equipment_list.all(), self.context['conversions'])
+        return DisplayEquipmentSerializer(rows, many=True).data
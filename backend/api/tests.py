@@ -1,11 +1,17 @@
 """
 API tests for Chemical Equipment Parameter Visualizer.
 """
-from django.test import TestCase, Client
+import hashlib
+import json
+
+from django.test import TestCase, Client, override_settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth.models import User
 from rest_framework import status
-from .models import Dataset, Equipment, EquipmentTypeSummary
+from . import events
+from .models import (
+    Anomaly, Dataset, Equipment, EquipmentTypeSummary, Measurement, RequestProfile, TrackedEquipment, UploadSession,
+)
 
 
 SAMPLE_CSV = '''Equipment Name,Type,Flowrate,Pressure,Temperature
@@ -15,6 +21,14 @@ Heat-Exchanger-C3,Shell and Tube,200.3,6.8,90.5
 '''
 
 
+def upload(client, content, name='data.csv', **params):
+    """POST content (str or bytes) to /api/upload/ as a multipart file, with extra form fields."""
+    if isinstance(content, str):
+        content = content.encode()
+    f = SimpleUploadedFile(name, content, content_type='text/csv')
+    return client.post('/api/upload/', {'file': f, **params}, format='multipart')
+
+
 class UploadAPITest(TestCase):
     def setUp(self):
         self.client = Client()
@@ -44,6 +58,248 @@ class UploadAPITest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('Duplicate', response.json().get('error', ''))
 
+    def test_upload_integer_columns(self):
+        content = b'Equipment Name,Type,Flowrate,Pressure,Temperature\nPump-1,Pump,120,8,65\n'
+        f = SimpleUploadedFile('ints.csv', content, content_type='text/csv')
+        response = self.client.post('/api/upload/', {'file': f}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(float(Equipment.objects.get().flowrate), 120.0)
+
+    def test_desktop_csv_schema_in_sync(self):
+        from pathlib import Path
+        from django.conf import settings
+        desktop_copy = Path(settings.BASE_DIR).parent / 'desktop-frontend' / 'services' / 'csv_schema.py'
+        if not desktop_copy.exists():
+            self.skipTest('desktop-frontend not checked out')
+        server_copy = Path(__file__).with_name('csv_schema.py')
+        self.assertEqual(desktop_copy.read_text(), server_copy.read_text())
+
+
+class UnitConversionTest(TestCase):
+    CSV = (
+        'Equipment Name,Type,Flowrate [L/min],Pressure (psi),Temperature (°F)\n'
+        'Pump-1,Pump,100,14.503774,212\n'
+        'Pump-2,Pump,200,29.007548,32\n'
+    )
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_header_units_converted_at_ingest(self):
+        response = upload(self.client, self.CSV)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        dataset = Dataset.objects.get()
+        self.assertEqual(dataset.source_units, {'flowrate': 'L/min', 'pressure': 'psi', 'temperature': 'F'})
+        rows = list(Equipment.objects.order_by('row_number').values_list('flowrate', 'pressure', 'temperature'))
+        for row, expected in zip(rows, [(6.0, 1.0, 100.0), (12.0, 2.0, 0.0)]):
+            for value, want in zip(row, expected):
+                self.assertAlmostEqual(value, want, places=6)
+        self.assertAlmostEqual(dataset.avg_temperature, 50.0)
+
+    def test_unit_parameters(self):
+        csv = SAMPLE_CSV.replace('Pressure', 'pressure').replace('8.2', '820')
+        response = upload(self.client, csv, pressure_unit='kPa', temperature_unit='kelvin')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        pump = Equipment.objects.get(equipment_name='Pump-A1')
+        self.assertAlmostEqual(pump.pressure, 8.2)
+        self.assertAlmostEqual(pump.temperature, -207.85)
+        self.assertIn("Unknown unit 'mmHg'", upload(self.client, SAMPLE_CSV, pressure_unit='mmHg').json()['error'])
+        response = upload(self.client, self.CSV, pressure_unit='bar')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_converted_readings_round_trip(self):
+        csv = 'Equipment Name,Type,Flowrate,Pressure,Temperature\nA,Pump,1,5,20\nB,Pump,1,7,20\nC,Pump,1,9,20\n'
+        dataset_id = upload(self.client, csv, pressure_unit='psi').json()['dataset_id']
+        rows = self.client.get(f'/api/datasets/{dataset_id}/equipment/', {'pressure_unit': 'psi'}).json()
+        self.assertEqual([r['pressure'] for r in rows['results']], [5.0, 7.0, 9.0])
+
+    def test_display_units(self):
+        dataset_id = upload(self.client, self.CSV).json()['dataset_id']
+        params = {'pressure_unit': 'psi', 'temperature_unit': 'F'}
+        detail = self.client.get(f'/api/datasets/{dataset_id}/', params).json()
+        self.assertEqual(detail['units'], {'flowrate': 'm3/h', 'pressure': 'psi', 'temperature': 'F'})
+        self.assertEqual([e['temperature'] for e in detail['equipment_list']], [212.0, 32.0])
+        self.assertEqual(detail['equipment_list'][0]['pressure'], 14.503774)
+        self.assertEqual(detail['type_summaries'][0]['max_temperature'], 212.0)
+        self.assertEqual(detail['avg_temperature'], 122.0)
+        canonical = self.client.get(f'/api/datasets/{dataset_id}/')
+        self.assertNotEqual(canonical['ETag'], self.client.get(f'/api/datasets/{dataset_id}/', params)['ETag'])
+
+        summary = self.client.get(f'/api/datasets/{dataset_id}/summary/', params).json()
+        self.assertEqual((summary['min_temperature'], summary['max_temperature']), (32.0, 212.0))
+        rows = self.client.get(f'/api/datasets/{dataset_id}/equipment/', {'flowrate_unit': 'L/min'}).json()
+        self.assertEqual([r['flowrate'] for r in rows['results']], [100.0, 200.0])
+        chart = self.client.get(f'/api/datasets/{dataset_id}/chart-data/', params).json()
+        self.assertEqual(chart['metrics']['temperature']['lttb']['y'], [212.0, 32.0])
+        response = self.client.get(f'/api/datasets/{dataset_id}/summary/', {'pressure_unit': 'furlongs'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExtraColumnsTest(TestCase):
+    CSV = (
+        'Equipment Name,Type,Flowrate,Pressure,Temperature,Vibration,Power (kW),Notes\n'
+        'Pump-1,Pump,100,5,60,1.5,30,ok\n'
+        'Pump-2,Pump,110,5,61,2.5,,check seal\n'
+        'Tank-1,Tank,10,1,20,0.5,2,\n'
+    )
+
+    def setUp(self):
+        self.client = Client()
+        self.dataset_id = upload(self.client, self.CSV, 'extra.csv').json()['dataset_id']
+
+    def test_extra_numeric_columns_stored(self):
+        dataset = Dataset.objects.get(pk=self.dataset_id)
+        self.assertEqual(dataset.extra_columns, ['Vibration', 'Power (kW)'])
+        values = list(Equipment.objects.order_by('row_number').values_list('extra_values', flat=True))
+        self.assertEqual(values, [[1.5, 30.0], [2.5, None], [0.5, 2.0]])
+        pump = EquipmentTypeSummary.objects.get(dataset=dataset, equipment_type='Pump')
+        self.assertEqual(pump.extra_stats['Power (kW)'], {'avg': 30.0, 'min': 30.0, 'max': 30.0, 'count': 1})
+        self.assertEqual(pump.extra_stats['Vibration']['avg'], 2.0)
+        self.assertEqual(float(pump.avg_flowrate), 105.0)
+
+    def test_extra_columns_in_summary(self):
+        extra = self.client.get(f'/api/datasets/{self.dataset_id}/summary/').json()['extra']
+        self.assertEqual(extra['Vibration'], {'avg': 1.5, 'min': 0.5, 'max': 2.5, 'count': 3})
+        self.assertEqual(extra['Power (kW)'], {'avg': 16.0, 'min': 2.0, 'max': 30.0, 'count': 2})
+        detail = self.client.get(f'/api/datasets/{self.dataset_id}/').json()
+        self.assertEqual(detail['equipment_list'][1]['extra_values'], [2.5, None])
+
+    def test_export_keeps_extra_columns(self):
+        response = self.client.get(f'/api/datasets/{self.dataset_id}/export/')
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'Equipment Name,Type,Flowrate,Pressure,Temperature,Vibration,Power (kW)\r\n'))
+        reimported = upload(self.client, content, 'export.csv').json()['dataset_id']
+        values = Equipment.objects.filter(dataset_id=reimported).values_list('extra_values', flat=True)
+        self.assertEqual(list(values), [[1.5, 30.0], [2.5, None], [0.5, 2.0]])
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            return
+        import io
+        response = self.client.get(f'/api/datasets/{self.dataset_id}/export/', {'fmt': 'parquet'})
+        table = pq.read_table(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(table.column('Power (kW)').to_pylist(), [30.0, None, 2.0])
+
+
+@override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0)  # uploads are spooled to disk and parsed from there
+class FileFormatTest(TestCase):
+    HEADER = ['Equipment Name', 'Type', 'Flowrate', 'Pressure (psi)', 'Temperature', 'Vibration', 'Notes']
+    ROWS = [
+        ['Pump-A1', 'Centrifugal Pump', 120.5, 14.5, 65.3, 1.5, 'ok'],
+        ['Reactor-B2', 'Batch Reactor', 85, 29, 180.0, None, 'x'],
+        ['Heat-Exchanger-C3', 'Shell and Tube', 200.3, 43.5, 90.5, 0.7, None],
+    ]
+
+    def setUp(self):
+        self.client = Client()
+
+    def _assert_ingested(self, response):
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        dataset = Dataset.objects.get(pk=response.json()['dataset_id'])
+        self.assertEqual(dataset.total_equipment_count, 3)
+        self.assertEqual(dataset.extra_columns, ['Vibration'])
+        rows = list(Equipment.objects.filter(dataset=dataset).values_list('equipment_name', 'pressure', 'extra_values'))
+        self.assertEqual(rows[1][0], 'Reactor-B2')
+        self.assertAlmostEqual(rows[1][1], 29 / 14.503774)  # psi header converted to bar
+        self.assertEqual([r[2] for r in rows], [[1.5], [None], [0.7]])
+
+    def test_xlsx_upload(self):
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            self.skipTest('openpyxl not installed')
+        import io
+        workbook = Workbook()
+        sheet = workbook.active
+        for row in [self.HEADER] + self.ROWS:
+            sheet.append(row)
+        sheet.append([None] * len(self.HEADER))  # trailing empty row
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        self._assert_ingested(upload(self.client, buffer.getvalue(), 'plant.xlsx'))
+
+    def test_parquet_upload(self):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest('pyarrow not installed')
+        import io
+        table = pa.table({name: [row[i] for row in self.ROWS] for i, name in enumerate(self.HEADER)})
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer, row_group_size=2)
+        self._assert_ingested(upload(self.client, buffer.getvalue(), 'plant.parquet'))
+
+    def test_invalid_binary_files(self):
+        response = upload(self.client, b'PK\x03\x04 not really a workbook', 'broken.xlsx')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Invalid Excel file', response.json()['error'])
+        response = upload(self.client, b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'old.xls')
+        self.assertIn('.xls', response.json()['error'])
+
+
+class ChunkedUploadAPITest(TestCase):
+    def setUp(self):
+        import tempfile
+        from pathlib import Path
+        self._media = tempfile.TemporaryDirectory()
+        self.addCleanup(self._media.cleanup)
+        override = override_settings(MEDIA_ROOT=Path(self._media.name), UPLOAD_CHUNK_SIZE=64)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client = Client()
+        self.content = SAMPLE_CSV.encode()
+        self.sha256 = hashlib.sha256(self.content).hexdigest()
+
+    def _init(self, sha256=None):
+        return self.client.post('/api/uploads/', {
+            'filename': 'chunked.csv', 'size': len(self.content), 'sha256': sha256 or self.sha256,
+        }, content_type='application/json')
+
+    def _put(self, upload_id, offset, data):
+        return self.client.put(f'/api/uploads/{upload_id}/chunk/?offset={offset}', data,
+                               content_type='application/octet-stream')
+
+    def test_chunked_upload_resumes_and_completes(self):
+        response = self._init()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        upload_id, chunk_size = response.json()['upload_id'], response.json()['chunk_size']
+        self.assertEqual(self._put(upload_id, 0, self.content[:chunk_size]).json()['offset'], chunk_size)
+
+        # An interrupted client re-initialises and continues from the acknowledged offset
+        resumed = self._init()
+        self.assertEqual(resumed.status_code, status.HTTP_200_OK)
+        self.assertEqual(resumed.json()['upload_id'], upload_id)
+        self.assertEqual(resumed.json()['offset'], chunk_size)
+        # Re-sending an acknowledged chunk is harmless; skipping ahead is rejected
+        self.assertEqual(self._put(upload_id, 0, self.content[:chunk_size]).json()['offset'], chunk_size)
+        self.assertEqual(self._put(upload_id, chunk_size + 1, b'x').status_code, status.HTTP_409_CONFLICT)
+
+        offset = chunk_size
+        while offset < len(self.content):
+            offset = self._put(upload_id, offset, self.content[offset:offset + chunk_size]).json()['offset']
+        response = self.client.post(f'/api/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['total_equipment_count'], 3)
+        self.assertEqual(Dataset.objects.get().file_hash, self.sha256)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_checksum_mismatch_rejected(self):
+        upload_id = self._init(sha256='0' * 64).json()['upload_id']
+        for offset in range(0, len(self.content), 64):
+            self._put(upload_id, offset, self.content[offset:offset + 64])
+        response = self.client.post(f'/api/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Checksum', response.json()['error'])
+        self.assertEqual(Dataset.objects.count(), 0)
+
+    def test_incomplete_upload_not_finalised(self):
+        upload_id = self._init().json()['upload_id']
+        self._put(upload_id, 0, self.content[:64])
+        response = self.client.post(f'/api/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()['offset'], 64)
+
 
 class DatasetsAPITest(TestCase):
     def setUp(self):
@@ -61,6 +317,12 @@ class DatasetsAPITest(TestCase):
         self.assertIsInstance(data, list)
         self.assertGreaterEqual(len(data), 1)
 
+    def test_list_datasets_by_file_hash(self):
+        response = self.client.get('/api/datasets/', {'file_hash': 'abc123'})
+        self.assertEqual([d['id'] for d in response.json()], [self.dataset.id])
+        response = self.client.get('/api/datasets/', {'file_hash': 'missing'})
+        self.assertEqual(response.json(), [])
+
     def test_dataset_detail(self):
         response = self.client.get(f'/api/datasets/{self.dataset.id}/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -68,6 +330,14 @@ class DatasetsAPITest(TestCase):
         self.assertEqual(data['id'], self.dataset.id)
         self.assertEqual(data['filename'], 'test.csv')
 
+    def test_dataset_detail_etag(self):
+        response = self.client.get(f'/api/datasets/{self.dataset.id}/')
+        etag = response['ETag']
+        self.assertIn('abc123', etag)
+        self.assertEqual(response.json()['file_hash'], 'abc123')
+        response = self.client.get(f'/api/datasets/{self.dataset.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
     def test_dataset_summary(self):
         response = self.client.get(f'/api/datasets/{self.dataset.id}/summary/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -76,6 +346,488 @@ class DatasetsAPITest(TestCase):
         self.assertIn('equipment_type_distribution', data)
 
 
+class ExportAPITest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        f = SimpleUploadedFile('export.csv', SAMPLE_CSV.encode(), content_type='text/csv')
+        response = self.client.post('/api/upload/', {'file': f}, format='multipart')
+        self.dataset_id = response.json()['dataset_id']
+
+    def test_export_csv(self):
+        response = self.client.get(f'/api/datasets/{self.dataset_id}/export/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'Equipment Name,Type,Flowrate,Pressure,Temperature')
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[1].startswith('Pump-A1,Centrifugal Pump,120.5,'))
+
+    async def test_export_streams_under_asgi(self):
+        import warnings
+        from django.test import AsyncClient
+        with warnings.catch_warnings():
+            # Django warns when it has to buffer a sync iterator to serve it asynchronously
+            warnings.simplefilter('error')
+            response = await AsyncClient().get(f'/api/datasets/{self.dataset_id}/export/')
+            self.assertTrue(response.is_async)
+            content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(content.decode().splitlines()), 4)
+
+    def test_export_csv_gzip(self):
+        import gzip
+        response = self.client.get(f'/api/datasets/{self.dataset_id}/export/?gzip=1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('.csv.gz', response['Content-Disposition'])
+        content = gzip.decompress(b''.join(response.streaming_content)).decode()
+        self.assertIn('Reactor-B2', content)
+
+    def test_export_parquet(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest('pyarrow not installed')
+        import io
+        response = self.client.get(f'/api/datasets/{self.dataset_id}/export/?fmt=parquet')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        table = pq.read_table(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(table.column('Flowrate').to_pylist()[0], 120.5)
+
+    def test_export_unknown_format(self):
+        response = self.client.get(f'/api/datasets/{self.dataset_id}/export/?fmt=xml')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ChartDataAPITest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = Client()
+        rows = ['Equipment Name,Type,Flowrate,Pressure,Temperature']
+        for i in range(200):
+            rows.append(f'Pump-{i},{"Pump" if i % 2 else "Tank"},{100 + i % 17}.5,{5 + i % 3}.2,{60 + i % 11}.1')
+        self.dataset_id = upload(self.client, '\n'.join(rows), 'chart.csv').json()['dataset_id']
+
+    def test_chart_data_downsampled(self):
+        response = self.client.get(f'/api/datasets/{self.dataset_id}/chart-data/?resolution=50&bins=10')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['total_count'], 200)
+        self.assertEqual(sorted(data['type_distribution']['labels']), ['Pump', 'Tank'])
+        flow = data['metrics']['flowrate']
+        self.assertEqual(sum(flow['histogram']['counts']), 200)
+        self.assertEqual(len(flow['histogram']['edges']), 11)
+        self.assertEqual(len(flow['binned']['mean']), 50)
+        self.assertEqual(len(flow['lttb']['x']), 50)
+        self.assertEqual(flow['lttb']['x'][0], 0)
+        self.assertEqual(flow['lttb']['x'][-1], 199)
+        self.assertEqual(flow['lttb']['names'][0], 'Pump-0')
+
+    def test_chart_data_small_dataset_not_downsampled(self):
+        response = self.client.get(f'/api/datasets/{self.dataset_id}/chart-data/?resolution=1000')
+        flow = response.json()['metrics']['flowrate']
+        self.assertEqual(len(flow['lttb']['x']), 200)
+
+    def test_chart_data_cached(self):
+        url = f'/api/datasets/{self.dataset_id}/chart-data/'
+        first = self.client.get(url, {'resolution': 50}).json()
+        with self.assertNumQueries(1):  # ownership lookup; nothing reads equipment rows
+            self.assertEqual(self.client.get(url, {'resolution': 50}).json(), first)
+        self.assertEqual(len(self.client.get(url, {'resolution': 20}).json()['metrics']['flowrate']['lttb']['x']), 20)
+
+    def test_chart_data_invalid_params(self):
+        response = self.client.get(f'/api/datasets/{self.dataset_id}/chart-data/?resolution=abc')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AnalyticsAPITest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = Client()
+        rows = ['Equipment Name,Type,Flowrate,Pressure,Temperature']
+        for i in range(100):
+            # Pressure tracks flowrate; temperature runs the other way; one Tank reads far too hot
+            rows.append(f'E-{i},{"Pump" if i % 2 else "Tank"},{i},{2 * i + 1},{500 if i == 10 else 200 - i}')
+        dataset_id = upload(self.client, '\n'.join(rows), 'analytics.csv').json()['dataset_id']
+        self.url = f'/api/datasets/{dataset_id}/analytics/'
+
+    def test_analytics_payload(self):
+        response = self.client.get(self.url, {'bins': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['metrics'], ['flowrate', 'pressure', 'temperature'])
+        pearson = data['correlation']['pearson']
+        self.assertEqual(pearson[0][0], 1.0)
+        self.assertEqual(pearson[0][1], 1.0)
+        self.assertLess(data['correlation']['spearman'][0][2], -0.99)
+        self.assertEqual(data['histograms']['flowrate']['counts'], [20] * 5)
+        flow = data['quantiles']['flowrate']
+        self.assertEqual(flow['overall'][0], 0.0)
+        self.assertEqual(flow['overall'][-1], 99.0)
+        self.assertEqual(flow['by_type']['Pump'][3], 50.0)
+        tank = {b['label']: b for b in data['box']['temperature']}['Tank']
+        self.assertEqual((tank['count'], tank['outliers']), (50, 1))
+        self.assertEqual(tank['whishi'], 200.0)
+        self.assertLessEqual(tank['whislo'], tank['q1'])
+
+    def test_analytics_cached(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(2):  # ETag and ownership lookups; nothing reads equipment rows
+            self.assertEqual(self.client.get(self.url).json(), first.json())
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.client.get(self.url, {'bins': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MetricsAPITest(TestCase):
+    def setUp(self):
+        self.client = Client()
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_metrics_endpoint_reports_requests(self):
+        self.client.get('/api/datasets/')
+        response = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('# TYPE api_request_duration_seconds histogram', body)
+        self.assertIn('api_requests_total{endpoint="/api/datasets/",method="GET",status="200"}', body)
+        self.assertIn('api_request_db_queries_count{endpoint="/api/datasets/"}', body)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_metrics_are_restricted(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        User.objects.create_user('ops', password='pass12345', is_staff=True)
+        self.client.login(username='ops', password='pass12345')
+        self.assertEqual(self.client.get('/api/metrics/').status_code, status.HTTP_200_OK)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_request_logs_top_sql(self):
+        with self.assertLogs('api.instrumentation', level='WARNING') as logs:
+            self.client.get('/api/datasets/')
+        self.assertIn('Slow request: GET /api/datasets/', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+
+class ProfilingTest(TestCase):
+    def setUp(self):
+        import tempfile
+        from pathlib import Path
+        self._media = tempfile.TemporaryDirectory()
+        self.addCleanup(self._media.cleanup)
+        override = override_settings(MEDIA_ROOT=Path(self._media.name))
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client = Client()
+        self.dataset = Dataset.objects.create(filename='p.csv', file_hash='prof1')
+
+    def test_staff_profile_captured(self):
+        staff = User.objects.create_user('staff', 'staff@test.com', 'pass12345', is_staff=True)
+        self.client.force_login(staff)
+        Dataset.objects.filter(pk=self.dataset.pk).update(uploaded_by=staff)
+        response = self.client.get(f'/api/datasets/{self.dataset.id}/', HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        profile = RequestProfile.objects.get(id=response['X-Profile-Id'])
+        self.assertEqual(profile.view_name, 'dataset_detail')
+        self.assertGreater(profile.file_size, 0)
+        self.assertIn('cumulative', profile.summary)
+
+    def test_non_staff_not_profiled(self):
+        user = User.objects.create_user('plain', 'plain@test.com', 'pass12345')
+        self.client.force_login(user)
+        Dataset.objects.filter(pk=self.dataset.pk).update(uploaded_by=user)
+        response = self.client.get(f'/api/datasets/{self.dataset.id}/?profile=1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header('X-Profile-Id'))
+        self.assertEqual(RequestProfile.objects.count(), 0)
+
+
+class EventStreamTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+
+    def _open_stream(self, **extra):
+        response = self.client.get('/api/events/', **extra)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertNotIn('Content-Encoding', response)
+        stream = iter(response.streaming_content)
+        self.assertTrue(next(stream).startswith(b'retry:'))
+        return response, stream
+
+    def test_upload_and_prune_are_broadcast(self):
+        response, stream = self._open_stream(HTTP_ACCEPT_ENCODING='gzip')
+        try:
+            with override_settings(MAX_DATASETS=0):
+                f = SimpleUploadedFile('live.csv', SAMPLE_CSV.encode(), content_type='text/csv')
+                self.client.post('/api/upload/', {'file': f}, format='multipart')
+            received = []
+            while not received or received[-1][0] != 'dataset-pruned':
+                lines = next(stream).decode().splitlines()
+                fields = dict(line.split(': ', 1) for line in lines if line and not line.startswith(':'))
+                received.append((fields['event'], json.loads(fields['data'])))
+        finally:
+            response.close()
+        types = [t for t, _ in received]
+        self.assertEqual(types[0], events.HELLO)
+        self.assertEqual(types[-2:], ['dataset-created', 'dataset-pruned'])
+        self.assertEqual(set(types[1:-2]), {'job-progress'})
+        created = received[-2][1]['dataset']
+        self.assertEqual(created['filename'], 'live.csv')
+        self.assertEqual(received[-1][1]['ids'], [created['id']])
+
+    def test_reconnect_replays_missed_events(self):
+        first = events.publish(None, 'job-progress', job='test', progress=0.5)
+        events.publish(None, 'job-progress', job='test', progress=1.0)
+        response, stream = self._open_stream(HTTP_LAST_EVENT_ID=str(first.id))
+        try:
+            chunk = next(stream).decode()
+        finally:
+            response.close()
+        self.assertIn(f'id: {first.id + 1}\n', chunk)
+        self.assertIn('"progress":1.0', chunk)
+
+    def test_idle_reconnect_does_not_resync(self):
+        events.publish(None, 'job-progress', job='test', progress=1.0)
+        response, stream = self._open_stream()
+        try:
+            hello = next(stream).decode()
+        finally:
+            response.close()
+        self.assertIn('event: hello\n', hello)
+        hello_id = int(hello.split('id: ', 1)[1].split('\n', 1)[0])
+        subscription = events.BROKER.subscribe(last_event_id=hello_id)
+        self.assertIsNone(subscription.get(timeout=0))
+        subscription.close()
+
+    def test_broker_requests_resync_when_history_is_gone(self):
+        broker = events.EventBroker(history=2)
+        for i in range(4):
+            broker.publish(None, 'job-progress', {'i': i})
+        subscription = broker.subscribe(last_event_id=1)
+        self.assertEqual(subscription.get(timeout=0).type, events.RESYNC)
+        self.assertEqual([subscription.get(timeout=0).data['i'] for _ in range(2)], [2, 3])
+        subscription.close()
+        self.assertEqual(broker.subscriber_count, 0)
+        # Other namespaces' events are neither delivered nor replayed
+        subscription = broker.subscribe(namespace=7, last_event_id=2)
+        broker.publish(None, 'job-progress', {'i': 4})
+        broker.publish(7, 'job-progress', {'i': 5})
+        self.assertEqual(subscription.get(timeout=0).data, {'i': 5})
+        self.assertIsNone(subscription.get(timeout=0))
+        subscription.close()
+        # An id from before a server restart cannot be replayed either
+        subscription = broker.subscribe(last_event_id=99)
+        self.assertEqual(subscription.get(timeout=0).type, events.RESYNC)
+        self.assertIsNone(subscription.get(timeout=0))
+        subscription.close()
+
+
+class NamespaceTest(TestCase):
+    """Each user's datasets are listed, deduplicated and pruned independently."""
+
+    def setUp(self):
+        self.alice = self._client('alice')
+        self.bob = self._client('bob')
+
+    def _client(self, username):
+        User.objects.create_user(username, password='pass12345')
+        client = Client()
+        token = client.post(
+            '/api/auth/login/', {'username': username, 'password': 'pass12345'}, content_type='application/json'
+        ).json()['access']
+        client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        return client
+
+    def test_same_file_in_two_namespaces(self):
+        self.assertEqual(upload(self.alice, SAMPLE_CSV).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(upload(self.bob, SAMPLE_CSV).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(upload(self.bob, SAMPLE_CSV).status_code, status.HTTP_400_BAD_REQUEST)
+        file_hash = hashlib.sha256(SAMPLE_CSV.encode()).hexdigest()
+        self.assertEqual(len(self.alice.get('/api/datasets/', {'file_hash': file_hash}).json()), 1)
+        self.assertEqual(Client().get('/api/datasets/', {'file_hash': file_hash}).json(), [])
+
+    def test_datasets_are_private(self):
+        dataset_id = upload(self.alice, SAMPLE_CSV).json()['dataset_id']
+        self.assertEqual(self.bob.get('/api/datasets/').json(), [])
+        for path in ('', 'summary/', 'chart-data/', 'export/'):
+            response = self.bob.get(f'/api/datasets/{dataset_id}/{path}')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, path)
+        self.assertEqual(self.bob.get(f'/api/datasets/{dataset_id}/equipment/').json()['count'], 0)
+        self.assertEqual(self.alice.get(f'/api/datasets/{dataset_id}/').status_code, status.HTTP_200_OK)
+        response = self.alice.get(f'/api/datasets/{dataset_id}/equipment/')
+        self.assertEqual(response.json()['count'], 3)
+
+    @override_settings(MAX_DATASETS=2)
+    def test_retention_is_per_namespace(self):
+        bob_id = upload(self.bob, SAMPLE_CSV).json()['dataset_id']
+        alice_ids = [
+            upload(self.alice, SAMPLE_CSV + f'Extra-{i},Pump,1,2,3\n').json()['dataset_id']
+            for i in range(3)
+        ]
+        listed = [d['id'] for d in self.alice.get('/api/datasets/').json()]
+        self.assertEqual(listed, alice_ids[:0:-1])
+        self.assertTrue(Dataset.objects.filter(pk=bob_id).exists())
+
+    def test_deleting_user_deletes_their_datasets(self):
+        anonymous_id = upload(Client(), SAMPLE_CSV).json()['dataset_id']
+        upload(self.alice, SAMPLE_CSV)
+        User.objects.get(username='alice').delete()
+        self.assertEqual(list(Dataset.objects.values_list('pk', flat=True)), [anonymous_id])
+        self.assertEqual(len(Client().get('/api/datasets/').json()), 1)
+
+    def test_analytics_not_shared_across_namespaces(self):
+        csv = SAMPLE_CSV.replace('8.2', '145.04').replace('15.5', '217.56').replace('6.8', '72.52')
+        alice_id = upload(self.alice, csv, pressure_unit='psi').json()['dataset_id']
+        bob_id = upload(self.bob, csv).json()['dataset_id']
+        alice = self.alice.get(f'/api/datasets/{alice_id}/analytics/').json()
+        bob = self.bob.get(f'/api/datasets/{bob_id}/analytics/').json()
+        self.assertAlmostEqual(alice['quantiles']['pressure']['overall'][-1], 15.0, places=3)
+        self.assertEqual(bob['quantiles']['pressure']['overall'][-1], 217.56)
+        self.assertEqual(bob['dataset_id'], bob_id)
+
+    def test_events_are_scoped(self):
+        subscription = events.BROKER.subscribe(namespace=None)
+        try:
+            self.assertEqual(subscription.get(timeout=0).type, events.HELLO)
+            upload(self.alice, SAMPLE_CSV)
+            self.assertIsNone(subscription.get(timeout=0))
+        finally:
+            subscription.close()
+
+
+class EquipmentHistoryTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+
+    def test_history_across_uploads(self):
+        upload(self.client, SAMPLE_CSV)
+        upload(self.client, SAMPLE_CSV.replace('Pump-A1,Centrifugal Pump,120.5', ' pump-a1 ,Centrifugal Pump,130.5'))
+        self.assertEqual(TrackedEquipment.objects.count(), 3)
+        response = self.client.get('/api/equipment/history/', {'name': ['PUMP-A1', 'Missing-9']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['missing'], ['Missing-9'])
+        [series] = data['series']
+        self.assertEqual(series['name'], 'pump-a1')
+        self.assertEqual(series['total_points'], 2)
+        self.assertEqual(series['flowrate']['mean'], [120.5, 130.5])
+        # History survives dataset retention
+        with override_settings(MAX_DATASETS=0):
+            upload(self.client, SAMPLE_CSV.replace('120.5', '140.5'))
+        self.assertEqual(Dataset.objects.count(), 0)
+        series = self.client.get('/api/equipment/history/', {'name': 'Pump-A1'}).json()['series'][0]
+        self.assertEqual(series['flowrate']['mean'], [120.5, 130.5, 140.5])
+
+    def test_history_is_downsampled(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        upload(self.client, SAMPLE_CSV)
+        pump = TrackedEquipment.objects.get(name_key='pump-a1')
+        start = timezone.now()
+        Measurement.objects.bulk_create(
+            Measurement(equipment=pump, recorded_at=start + timedelta(hours=i), flowrate=i, pressure=1, temperature=2)
+            for i in range(100)
+        )
+        response = self.client.get('/api/equipment/history/', {'id': pump.id, 'points': 10})
+        series = response.json()['series'][0]
+        self.assertEqual(series['total_points'], 101)
+        self.assertEqual(len(series['t']), 10)
+        self.assertEqual(sum(series['count']), 101)
+        since = (start + timedelta(hours=90)).isoformat()
+        series = self.client.get('/api/equipment/history/', {'id': pump.id, 'since': since}).json()['series'][0]
+        self.assertEqual(series['flowrate']['max'], list(range(90, 100)))
+
+    def test_old_history_is_pruned(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        upload(self.client, SAMPLE_CSV)
+        long_ago = timezone.now() - timedelta(days=40)
+        Measurement.objects.update(recorded_at=long_ago)
+        TrackedEquipment.objects.exclude(name_key='pump-a1').update(last_seen=long_ago)
+        with override_settings(MEASUREMENT_RETENTION_DAYS=30):
+            upload(self.client, 'Equipment Name,Type,Flowrate,Pressure,Temperature\nPump-A1,Centrifugal Pump,1,2,3\n')
+        self.assertEqual(list(TrackedEquipment.objects.values_list('name_key', flat=True)), ['pump-a1'])
+        self.assertEqual(list(Measurement.objects.values_list('flowrate', flat=True)), [1.0])
+
+    def test_long_names_fit_the_registry_key(self):
+        long_name = 'Pump ' + 'x' * 300
+        self.assertEqual(upload(self.client, SAMPLE_CSV.replace('Pump-A1', long_name)).status_code, status.HTTP_201_CREATED)
+        tracked = TrackedEquipment.objects.get(name__startswith='Pump x')
+        self.assertEqual(len(tracked.name_key), 255)
+        series = self.client.get('/api/equipment/history/', {'name': long_name.upper()}).json()['series']
+        self.assertEqual(series[0]['total_points'], 1)
+
+    def test_history_requires_equipment(self):
+        self.assertEqual(self.client.get('/api/equipment/history/').status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/equipment/history/', {'id': 1, 'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AnomalyDetectionTest(TestCase):
+    # 14 similar pumps, one far-off pump and a reactor with a negative pressure
+    CSV = 'Equipment Name,Type,Flowrate,Pressure,Temperature\n' + ''.join(
+        f'Pump-{i},Centrifugal Pump,{100 + i},5.0,60.0\n' for i in range(14)
+    ) + 'Pump-X,Centrifugal Pump,1000,5.0,60.0\nReactor-1,Batch Reactor,80,-2.0,150.0\n'
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_outliers_are_flagged(self):
+        response = upload(self.client, self.CSV)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        flags = set(Anomaly.objects.values_list('row_number', 'metric', 'rule'))
+        self.assertEqual(flags, {(15, 'flowrate', 'zscore'), (15, 'flowrate', 'iqr'), (16, 'pressure', 'range')})
+        self.assertEqual(response.json()['anomaly_count'], 3)
+
+        url = f"/api/datasets/{response.json()['dataset_id']}/anomalies/"
+        data = self.client.get(url, {'rule': 'range'}).json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['results'][0]['equipment_name'], 'Reactor-1')
+        self.assertEqual(data['results'][0]['lower'], 0.0)
+        self.assertEqual(self.client.get(url, {'metric': 'flowrate'}).json()['count'], 2)
+
+    def test_history_check_uses_earlier_uploads(self):
+        upload(self.client, SAMPLE_CSV)
+        response = upload(self.client, 'Equipment Name,Type,Flowrate,Pressure,Temperature\nReactor-9,Batch Reactor,85.0,15.5,400.0\n')
+        dataset = Dataset.objects.get(pk=response.json()['dataset_id'])
+        [flag] = dataset.anomalies.all()
+        self.assertEqual((flag.metric, flag.rule, flag.upper), ('temperature', 'history', 180.0))
+
+    def test_reject_out_of_range(self):
+        with override_settings(ANOMALY_DETECTION={'REJECT_OUT_OF_RANGE': True}):
+            response = upload(self.client, self.CSV)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('16', response.json()['error'])
+        self.assertEqual(Dataset.objects.count(), 0)
+
+    def test_detection_can_be_disabled(self):
+        with override_settings(ANOMALY_DETECTION={'ENABLED': False}):
+            response = upload(self.client, self.CSV)
+        self.assertEqual(response.json()['anomaly_count'], 0)
+        self.assertFalse(Anomaly.objects.exists())
+
+
+class ColdStartImportTest(TestCase):
+    def test_urlconf_does_not_import_heavy_libraries(self):
+        import json
+        import os
+        import subprocess
+        import sys
+        from django.conf import settings
+        snippet = (
+            'import json, sys, django; django.setup(); import config.urls; '
+            'print(json.dumps([m for m in ("pandas", "numpy", "reportlab", "pyarrow") if m in sys.modules]))'
+        )
+        proc = subprocess.run(
+            [sys.executable, '-c', snippet], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'config.settings'},
+        )
+        self.assertEqual(json.loads(proc.stdout.strip().splitlines()[-1]), [])
+
+
 class AuthAPITest(TestCase):
     def setUp(self):
         self.client = Client()
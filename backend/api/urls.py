@@ -8,11 +8,23 @@ from . import views
 
 urlpatterns = [
     path('upload/', views.upload_csv),
+    path('uploads/', views.upload_init),
+    path('uploads/<uuid:upload_id>/', views.upload_status),
+    path('uploads/<uuid:upload_id>/chunk/', views.upload_chunk),
+    path('uploads/<uuid:upload_id>/complete/', views.upload_complete),
     path('datasets/', views.dataset_list),
     path('datasets/<int:pk>/', views.dataset_detail),
     path('datasets/<int:pk>/summary/', views.dataset_summary),
     path('datasets/<int:pk>/equipment/', views.EquipmentList.as_view()),
+    path('datasets/<int:pk>/anomalies/', views.AnomalyList.as_view()),
+    path('datasets/<int:pk>/chart-data/', views.dataset_chart_data),
+    path('datasets/<int:pk>/analytics/', views.dataset_analytics),
     path('datasets/<int:pk>/generate-pdf/', views.generate_pdf),
+    path('datasets/<int:pk>/export/', views.export_dataset),
+    path('equipment/', views.TrackedEquipmentList.as_view()),
+    path('equipment/history/', views.equipment_history),
+    path('events/', views.event_stream),
+    path('metrics/', views.metrics_view),
     path('auth/login/', views.login),
     path('auth/register/', views.register),
     path('auth/token/refresh/', TokenRefreshView.as_view()),
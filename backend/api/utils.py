@@ -1,65 +1,193 @@
 """
 Utility functions for CSV parsing, analytics, and PDF generation.
+
+pandas, numpy and ReportLab are imported inside the functions that need
+them, so importing this module (and therefore api.views / the URLconf)
+stays cheap for worker boot, manage.py commands and auth-only requests.
 """
+import csv
 import io
+import itertools
 import os
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
 from decimal import Decimal
 from django.conf import settings
-from django.db.models import Count
+from django.db import connection
+from django.db.models import Count, F, FloatField, Value
+from django.db.models.functions import Round
+from django.utils import timezone
+from typing import TYPE_CHECKING
+
+from . import events
+from .csv_schema import (
+    CANONICAL_UNITS, REQUIRED_COLUMNS, NUMERIC_COLUMNS, UNITS, from_canonical, non_numeric_error, resolve_columns, resolve_units,
+)
+from .models import (
+    Anomaly, Dataset, Equipment, EquipmentTypeSummary, Measurement, PDFReport, TrackedEquipment, UploadSession,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+
+# Flagged readings listed individually in the PDF report
+REPORT_MAX_ANOMALIES = 20
+
+EXPORT_FIELDS = ['equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature']
+
+NAME_KEY_LENGTH = TrackedEquipment._meta.get_field('name_key').max_length
+
+
+UPLOAD_FORMATS = ['csv', 'xlsx', 'parquet']
+
+# Leading bytes of each binary upload format (xlsx is a zip package)
+_MAGIC = [(b'PAR1', 'parquet'), (b'PK\x03\x04', 'xlsx'), (b'\xd0\xcf\x11\xe0', 'xls')]
+
 
-import pandas as pd
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
+def detect_upload_format(file) -> str:
+    """'csv', 'xlsx' or 'parquet' from the file's leading bytes; the file is rewound."""
+    head = file.read(8)
+    file.seek(0)
+    for magic, fmt in _MAGIC:
+        if head.startswith(magic):
+            if fmt == 'xls':
+                raise ValueError('Legacy .xls workbooks are not supported; save the sheet as .xlsx or CSV.')
+            return fmt
+    return 'csv'
+
+
+def parse_upload(file, units: dict = None) -> 'pd.DataFrame':
+    """Read a CSV, .xlsx or Parquet upload and validate it like parse_csv_with_pandas."""
+    fmt = detect_upload_format(file)
+    if fmt == 'xlsx':
+        return _normalise_frame(read_xlsx_frame(file), units)
+    if fmt == 'parquet':
+        return _normalise_frame(read_parquet_frame(file), units)
+    return parse_csv_with_pandas(file, units)
+
+
+def read_xlsx_frame(file, chunk_rows: int = 10000) -> 'pd.DataFrame':
+    """
+    First worksheet of an .xlsx workbook (header in the first row), read
+    with openpyxl's read-only reader. Cell values are turned into DataFrame
+    blocks of chunk_rows rows, so at most one block of per-cell Python
+    objects is alive at a time; the returned frame holds the whole sheet.
+    """
+    import pandas as pd
+
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('Excel uploads require openpyxl to be installed on the server.')
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except Exception as e:
+        raise ValueError(f"Invalid Excel file: {str(e)}")
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            raise ValueError('Invalid Excel file: the first worksheet is empty')
+        columns = [f'Unnamed: {i}' if h is None else str(h) for i, h in enumerate(header)]
+        width = len(columns)
+        blocks = []
+        while True:
+            batch = list(itertools.islice(rows, chunk_rows))
+            if not batch:
+                break
+            # Sheets without stored dimensions can yield ragged rows
+            if any(len(row) != width for row in batch):
+                batch = [tuple(row[:width]) + (None,) * (width - len(row)) for row in batch]
+            blocks.append(pd.DataFrame.from_records(batch, columns=columns))
+    finally:
+        workbook.close()
 
-from .models import Dataset, Equipment, EquipmentTypeSummary, PDFReport
+    df = pd.concat(blocks, ignore_index=True) if blocks else pd.DataFrame(columns=columns)
+    # Formatted but empty rows at the bottom of a sheet are not data
+    return df.dropna(how='all').reset_index(drop=True).infer_objects()
 
 
-REQUIRED_COLUMNS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+def read_parquet_frame(file) -> 'pd.DataFrame':
+    """
+    Parquet upload as a DataFrame. Only the required columns and other
+    numeric columns are read, and Arrow buffers are released as they are
+    converted, so peak memory stays close to one copy of the frame.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError('Parquet uploads require pyarrow to be installed on the server.')
+    try:
+        parquet = pq.ParquetFile(file)
+        schema = parquet.schema_arrow
+        required = set(resolve_columns(schema.names))
+        numeric = (pa.types.is_integer, pa.types.is_floating, pa.types.is_decimal)
+        columns = [
+            field.name for field in schema
+            if field.name.strip() in required or any(is_type(field.type) for is_type in numeric)
+        ]
+        table = parquet.read(columns=columns)
+    except (pa.ArrowException, OSError) as e:
+        raise ValueError(f"Invalid Parquet file: {str(e)}")
+    return table.to_pandas(split_blocks=True, self_destruct=True)
 
 
-def parse_csv_with_pandas(file) -> pd.DataFrame:
+def parse_csv_with_pandas(file, units: dict = None) -> 'pd.DataFrame':
     """
     Validate and parse CSV file. Raises ValueError on invalid format.
-    Returns pandas DataFrame with normalized column names.
+    Returns pandas DataFrame as described in _normalise_frame.
     """
+    import pandas as pd
+
     try:
-        content = file.read()
-        if isinstance(content, bytes):
-            content = content.decode('utf-8')
-        df = pd.read_csv(io.StringIO(content))
+        # Read from the file object: decoding it into a string first held the bytes, the text and the frame at once
+        df = pd.read_csv(file, encoding='utf-8')
     except Exception as e:
         raise ValueError(f"Invalid CSV format: {str(e)}")
+    return _normalise_frame(df, units)
 
-    # Normalize column names (strip whitespace, handle common variants)
-    df.columns = df.columns.str.strip()
-
-    # Check required columns (case-insensitive mapping)
-    col_map = {c.lower(): c for c in df.columns}
-    missing = []
-    for req in REQUIRED_COLUMNS:
-        if req.lower() not in col_map:
-            missing.append(req)
 
-    if missing:
-        raise ValueError(f"Missing required columns: {', '.join(missing)}. Found: {', '.join(df.columns)}")
+def _normalise_frame(df: 'pd.DataFrame', units: dict = None) -> 'pd.DataFrame':
+    """
+    Validate a freshly read upload. Returns the DataFrame with normalized column
+    names and readings converted to canonical units; df.attrs['units'] holds the
+    units the file used (header suffixes such as 'Pressure (psi)', else `units`,
+    else canonical). Other columns the reader typed as numeric are kept as
+    float64 and listed in df.attrs['extra_columns']; text columns are dropped.
+    """
+    import pandas as pd
 
-    # Rename to standard names
-    rename_map = {col_map[r.lower()]: r for r in REQUIRED_COLUMNS}
-    df = df.rename(columns=rename_map)
+    # Normalize column names (strip whitespace, case-insensitive match); rules shared with the desktop validator
+    df.columns = df.columns.str.strip()
+    source_units = resolve_units(df.columns, units)
+    df = df.rename(columns=resolve_columns(df.columns))
 
-    # Validate numeric columns
-    for col in ['Flowrate', 'Pressure', 'Temperature']:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
+    # Validate numeric columns (float64, as stored)
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
         if df[col].isna().any():
-            raise ValueError(f"Column '{col}' contains non-numeric values")
+            raise ValueError(non_numeric_error(col))
+        factor, offset = UNITS[col][source_units[col]]
+        if (factor, offset) != (1.0, 0.0):
+            df[col] = df[col] * factor + offset
 
+    # Extra columns keep the dtype read_csv inferred for the whole column (empty cells become NaN)
+    extras = [
+        col for col in df.columns
+        if col not in REQUIRED_COLUMNS and not col.startswith('Unnamed:')
+        and pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])
+    ][:getattr(settings, 'MAX_EXTRA_COLUMNS', 50)]
+    df = df[REQUIRED_COLUMNS + extras].astype({col: 'float64' for col in extras})
+
+    df.attrs['units'] = source_units
+    df.attrs['extra_columns'] = extras
     return df
 
 
-def calculate_summary_stats(df: pd.DataFrame) -> dict:
+def calculate_summary_stats(df: 'pd.DataFrame') -> dict:
     """
     Calculate total count, averages, type distribution, min/max.
     Returns dict suitable for API response.
@@ -83,16 +211,513 @@ def calculate_summary_stats(df: pd.DataFrame) -> dict:
     return summary
 
 
-def prune_old_datasets():
+def prune_old_datasets(user=None):
     """
-    Delete oldest datasets when count exceeds MAX_DATASETS.
-    Uses Django ORM - no DB trigger needed.
+    Delete the oldest datasets in a user's namespace (None: anonymous uploads)
+    once it holds more than MAX_DATASETS. Only that namespace's slice of the
+    (uploaded_by, upload_timestamp) index is read, so other users' data is
+    neither scanned nor evicted.
     """
     max_ds = getattr(settings, 'MAX_DATASETS', 5)
-    ids_to_keep = list(
-        Dataset.objects.all().order_by('-upload_timestamp').values_list('id', flat=True)[:max_ds]
+    pruned = list(
+        Dataset.objects.filter(uploaded_by=user)
+        .order_by('-upload_timestamp', '-id')
+        .values_list('id', flat=True)[max_ds:]
+    )
+    if pruned:
+        Dataset.objects.filter(id__in=pruned).delete()
+        events.publish(user.id if user else None, events.DATASET_PRUNED, ids=pruned)
+
+
+def prune_old_measurements(user=None):
+    """
+    Delete a namespace's equipment history older than MEASUREMENT_RETENTION_DAYS,
+    and the tracked equipment not seen since (measurements outlive datasets, so
+    MAX_DATASETS does not bound them).
+    """
+    days = getattr(settings, 'MEASUREMENT_RETENTION_DAYS', 365)
+    if not days:
+        return
+    cutoff = timezone.now() - timedelta(days=days)
+    TrackedEquipment.objects.filter(owner=user, last_seen__lt=cutoff).delete()
+    Measurement.objects.filter(equipment__owner=user, recorded_at__lt=cutoff).delete()
+
+
+def prune_stale_upload_sessions():
+    """Delete chunked uploads (and their part files) idle for longer than UPLOAD_SESSION_TTL_HOURS."""
+    ttl_hours = getattr(settings, 'UPLOAD_SESSION_TTL_HOURS', 24)
+    cutoff = timezone.now() - timedelta(hours=ttl_hours)
+    for session in UploadSession.objects.filter(updated_at__lt=cutoff):
+        try:
+            os.remove(session.part_path)
+        except FileNotFoundError:
+            pass
+        session.delete()
+
+
+def _insert_in_batches(model, objs, batch_size: int, **kwargs) -> None:
+    """bulk_create from an iterator without materialising every instance at once."""
+    objs = iter(objs)
+    while True:
+        batch = list(itertools.islice(objs, batch_size))
+        if not batch:
+            return
+        model.objects.bulk_create(batch, batch_size=batch_size, **kwargs)
+
+
+def _insert_rows(model, fields: list, rows, batch_size: int) -> None:
+    """
+    executemany() plain tuples into model's table, skipping the per-row model
+    instances and SQL compilation of bulk_create. Only for tables whose rows
+    need no field defaults, pre_save hooks or signals.
+    """
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(name).column) for name in fields)
+    sql = f"INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES ({', '.join(['%s'] * len(fields))})"
+    rows = iter(rows)
+    with connection.cursor() as cursor:
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                return
+            cursor.executemany(sql, batch)
+
+
+def _extra_rows(df: 'pd.DataFrame', extras: list):
+    """Per-row lists of the extra columns' readings, NaN as None; None per row when there are none."""
+    if not extras:
+        return itertools.repeat(None)
+    block = df[extras]
+    return block.astype(object).where(block.notna(), None).to_numpy().tolist()
+
+
+def save_equipment_rows(dataset: Dataset, df: 'pd.DataFrame', batch_size: int = 2000) -> None:
+    """Insert the dataset's Equipment rows in batches (row_number is 1-based, in file order)."""
+    columns = zip(
+        df['Equipment Name'].astype(str).tolist(), df['Type'].astype(str).tolist(),
+        df['Flowrate'].tolist(), df['Pressure'].tolist(), df['Temperature'].tolist(),
+        _extra_rows(df, df.attrs.get('extra_columns', [])),
+    )
+    _insert_in_batches(Equipment, (
+        Equipment(
+            dataset=dataset, equipment_name=name, equipment_type=eq_type,
+            flowrate=flowrate, pressure=pressure, temperature=temperature, row_number=i, extra_values=extra,
+        )
+        for i, (name, eq_type, flowrate, pressure, temperature, extra) in enumerate(columns, start=1)
+    ), batch_size)
+
+
+def save_type_summaries(dataset: Dataset, df: 'pd.DataFrame') -> None:
+    """
+    One EquipmentTypeSummary per type, from a single grouped pass over the
+    standard readings and the extra columns.
+    """
+    extras = df.attrs.get('extra_columns', [])
+    grouped = df.groupby('Type')[NUMERIC_COLUMNS + extras]
+    stats = grouped.agg(['mean', 'min', 'max', 'count'])
+    sizes = grouped.size()
+
+    def _value(eq_type, col, stat):
+        value = stats.at[eq_type, (col, stat)]
+        return None if value != value else float(value)  # NaN: no readings of an extra column
+
+    summaries = []
+    for eq_type, count in sizes.items():
+        fields = {}
+        for col in NUMERIC_COLUMNS:
+            attr = col.lower()
+            fields[f'avg_{attr}'] = _value(eq_type, col, 'mean')
+            fields[f'min_{attr}'] = _value(eq_type, col, 'min')
+            fields[f'max_{attr}'] = _value(eq_type, col, 'max')
+        extra_stats = {
+            col: {
+                'avg': _value(eq_type, col, 'mean'), 'min': _value(eq_type, col, 'min'),
+                'max': _value(eq_type, col, 'max'), 'count': int(stats.at[eq_type, (col, 'count')]),
+            }
+            for col in extras
+        }
+        summaries.append(EquipmentTypeSummary(
+            dataset=dataset, equipment_type=eq_type, count=int(count), extra_stats=extra_stats, **fields,
+        ))
+    EquipmentTypeSummary.objects.bulk_create(summaries)
+
+
+def normalise_equipment_name(name) -> str:
+    """
+    Registry key: case-insensitive, with surrounding and repeated whitespace
+    ignored, cut to TrackedEquipment.name_key's length (names sharing that
+    prefix are tracked as one).
+    """
+    return ' '.join(str(name).split()).casefold()[:NAME_KEY_LENGTH]
+
+
+def record_measurements(dataset: Dataset, df: 'pd.DataFrame', batch_size: int = 2000) -> None:
+    """
+    Register the upload's equipment in the owner's namespace and append one
+    Measurement per row, timestamped with the upload. Costs a handful of
+    queries per batch_size distinct names, not per row; history older than
+    MEASUREMENT_RETENTION_DAYS is removed by prune_old_measurements().
+    """
+    import pandas as pd
+
+    owner_id = dataset.uploaded_by_id
+    recorded_at = dataset.upload_timestamp
+    names = df['Equipment Name'].astype(str).str.strip()
+    keys = names.map(normalise_equipment_name)
+    # The last occurrence in the file supplies the display name and type
+    latest = pd.DataFrame({'key': keys, 'name': names, 'type': df['Type'].astype(str)}).drop_duplicates(
+        'key', keep='last'
+    )
+    registry = TrackedEquipment.objects.filter(owner_id=owner_id)
+
+    def lookup(key_list):
+        found = {}
+        for start in range(0, len(key_list), batch_size):
+            found.update(
+                (key, (pk, name, eq_type)) for key, pk, name, eq_type in
+                registry.filter(name_key__in=key_list[start:start + batch_size])
+                .values_list('name_key', 'id', 'name', 'equipment_type')
+            )
+        return found
+
+    known = lookup(latest['key'].tolist())
+    fresh = latest[~latest['key'].isin(known)]
+    _insert_in_batches(TrackedEquipment, (
+        TrackedEquipment(
+            owner_id=owner_id, name_key=key, name=name[:255], equipment_type=eq_type[:100],
+            first_seen=recorded_at, last_seen=recorded_at,
+        )
+        for key, name, eq_type in zip(fresh['key'], fresh['name'], fresh['type'])
+    ), batch_size, ignore_conflicts=True)  # a concurrent upload may register the same names
+
+    changed = [
+        TrackedEquipment(id=known[key][0], name=name[:255], equipment_type=eq_type[:100])
+        for key, name, eq_type in zip(latest['key'], latest['name'], latest['type'])
+        if key in known and known[key][1:] != (name[:255], eq_type[:100])
+    ]
+    if changed:
+        TrackedEquipment.objects.bulk_update(changed, ['name', 'equipment_type'], batch_size=batch_size)
+    known_ids = [pk for pk, _, _ in known.values()]
+    for start in range(0, len(known_ids), batch_size):
+        TrackedEquipment.objects.filter(id__in=known_ids[start:start + batch_size]).update(last_seen=recorded_at)
+
+    ids = {key: pk for key, (pk, _, _) in known.items()}
+    ids.update((key, pk) for key, (pk, _, _) in lookup(fresh['key'].tolist()).items())
+    # Measurements are the largest insert of an upload; plain tuples keep it off the ORM's per-row path
+    _insert_rows(
+        Measurement, ['equipment', 'dataset', 'recorded_at', 'flowrate', 'pressure', 'temperature'],
+        zip(
+            keys.map(ids).tolist(), itertools.repeat(dataset.id),
+            itertools.repeat(connection.ops.adapt_datetimefield_value(recorded_at)),
+            df['Flowrate'].tolist(), df['Pressure'].tolist(), df['Temperature'].tolist(),
+        ),
+        batch_size,
+    )
+
+
+CHART_METRICS = ['flowrate', 'pressure', 'temperature']
+# Decimals of every computed reading in API responses (summaries, charts, analytics);
+# enough that unit round trips (psi -> bar -> psi) give back the file's numbers
+DISPLAY_DECIMALS = 6
+# Readings in the PDF report are for people, not round trips
+REPORT_DECIMALS = 2
+
+
+def display_conversions(units: dict) -> dict:
+    """{metric: (factor, offset)} from canonical readings to the display `units`, omitting identities."""
+    conversions = {}
+    for col, unit in units.items():
+        factor, offset = from_canonical(col, unit)
+        if (factor, offset) != (1.0, 0.0):
+            conversions[col.lower()] = (factor, offset)
+    return conversions
+
+
+def with_display_units(queryset, conversions: dict):
+    """Annotate <metric>_display for each reading, converted by the database (see display_conversions)."""
+    annotations = {}
+    for metric in CHART_METRICS:
+        if metric in conversions:
+            factor, offset = conversions[metric]
+            annotations[f'{metric}_display'] = Round(
+                F(metric) * Value(factor) + Value(offset), DISPLAY_DECIMALS, output_field=FloatField()
+            )
+        else:
+            annotations[f'{metric}_display'] = F(metric)
+    return queryset.annotate(**annotations)
+
+
+def lttb_indices(y: 'np.ndarray', threshold: int) -> 'np.ndarray':
+    """
+    Largest-Triangle-Three-Buckets downsampling over an evenly spaced x axis.
+    Returns the indices of the points to keep (always includes first and last).
+    """
+    import numpy as np
+
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = (end + next_end - 1) / 2.0
+        avg_y = y[end:next_end].mean()
+        xs = np.arange(start, end)
+        area = np.abs((a - avg_x) * (y[start:end] - y[a]) - (a - xs) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def load_metric_arrays(dataset_id: int, chunk_size: int = 5000) -> dict:
+    """Load flowrate/pressure/temperature for a dataset as float64 arrays in row order."""
+    import numpy as np
+
+    rows = (
+        Equipment.objects.filter(dataset_id=dataset_id)
+        .order_by('row_number')
+        .values_list(*CHART_METRICS)
+        .iterator(chunk_size=chunk_size)
+    )
+    blocks = []
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            blocks.append(np.asarray(batch, dtype=np.float64))
+            batch = []
+    if batch:
+        blocks.append(np.asarray(batch, dtype=np.float64))
+    matrix = np.vstack(blocks) if blocks else np.empty((0, len(CHART_METRICS)))
+    return {name: matrix[:, i] for i, name in enumerate(CHART_METRICS)}
+
+
+def _rounded(values) -> list:
+    import numpy as np
+
+    return np.round(values, DISPLAY_DECIMALS).tolist()
+
+
+def build_chart_data(dataset_id: int, resolution: int = 500, bins: int = 20, conversions: dict = None) -> dict:
+    """
+    Precompute chart payloads for a dataset: per-metric histograms, bucketed
+    mean/min/max series and LTTB-downsampled series of at most `resolution` points.
+    """
+    import numpy as np
+
+    arrays = load_metric_arrays(dataset_id)
+    for name, (factor, offset) in (conversions or {}).items():
+        arrays[name] = arrays[name] * factor + offset
+    n = len(arrays['flowrate'])
+    type_rows = list(
+        EquipmentTypeSummary.objects.filter(dataset_id=dataset_id).values_list('equipment_type', 'count')
+    )
+
+    metrics = {}
+    selected = set()
+    for name, y in arrays.items():
+        if n == 0:
+            metrics[name] = {'histogram': {'edges': [], 'counts': []},
+                             'binned': {'x': [], 'mean': [], 'min': [], 'max': []},
+                             'lttb': {'x': [], 'y': []}}
+            continue
+        counts, hist_edges = np.histogram(y, bins=bins)
+        starts = np.unique(np.linspace(0, n, min(resolution, n) + 1).astype(np.int64)[:-1])
+        sizes = np.diff(np.append(starts, n))
+        keep = lttb_indices(y, resolution)
+        selected.update(keep.tolist())
+        metrics[name] = {
+            'histogram': {'edges': _rounded(hist_edges), 'counts': counts.tolist()},
+            'binned': {
+                'x': _rounded(starts + (sizes - 1) / 2.0),
+                'mean': _rounded(np.add.reduceat(y, starts) / sizes),
+                'min': _rounded(np.minimum.reduceat(y, starts)),
+                'max': _rounded(np.maximum.reduceat(y, starts)),
+            },
+            'lttb': {'x': keep.tolist(), 'y': _rounded(y[keep])},
+        }
+
+    # Equipment names only for the points that survived downsampling (row_number is 1-based)
+    names = dict(
+        Equipment.objects.filter(dataset_id=dataset_id, row_number__in=[i + 1 for i in selected])
+        .values_list('row_number', 'equipment_name')
+    ) if selected else {}
+    for name in CHART_METRICS:
+        lttb = metrics[name]['lttb']
+        lttb['names'] = [names.get(i + 1, f'#{i + 1}') for i in lttb['x']]
+
+    return {
+        'dataset_id': dataset_id,
+        'total_count': n,
+        'resolution': resolution,
+        'type_distribution': {'labels': [t for t, _ in type_rows], 'counts': [c for _, c in type_rows]},
+        'metrics': metrics,
+    }
+
+
+QUANTILE_LEVELS = [0.0, 0.05, 0.25, 0.5, 0.75, 0.95, 1.0]
+
+
+def _finite(values) -> list:
+    """Rounded floats with NaN/inf as None (strict JSON)."""
+    import numpy as np
+
+    values = np.round(np.asarray(values, dtype=np.float64), DISPLAY_DECIMALS)
+    return [v if np.isfinite(v) else None for v in values.tolist()]
+
+
+def load_analytics_frame(dataset_id: int, chunk_size: int = 5000) -> 'pd.DataFrame':
+    """Equipment type and metrics of a dataset as a DataFrame (float64 metrics)."""
+    import pandas as pd
+
+    rows = (
+        Equipment.objects.filter(dataset_id=dataset_id)
+        .order_by('row_number')
+        .values_list('equipment_type', *CHART_METRICS)
+        .iterator(chunk_size=chunk_size)
     )
-    Dataset.objects.exclude(id__in=ids_to_keep).delete()
+    df = pd.DataFrame.from_records(rows, columns=['type', *CHART_METRICS])
+    df[CHART_METRICS] = df[CHART_METRICS].astype('float64')
+    return df
+
+
+def build_analytics(dataset_id: int, bins: int = 20, conversions: dict = None) -> dict:
+    """
+    Correlation matrices, histograms, quantiles and box-plot statistics for a
+    dataset's metrics. Box entries use matplotlib's bxp() keys (whiskers at the
+    furthest reading within 1.5 IQR of the quartiles).
+    """
+    import numpy as np
+
+    df = load_analytics_frame(dataset_id)
+    for name, (factor, offset) in (conversions or {}).items():
+        df[name] = df[name] * factor + offset
+    values = df[CHART_METRICS]
+    grouped = values.groupby(df['type'], sort=True)
+    types = list(grouped.groups) if len(df) else []
+
+    if len(df) > 1:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pearson = np.corrcoef(values.to_numpy(), rowvar=False)
+            spearman = np.corrcoef(values.rank().to_numpy(), rowvar=False)
+    else:
+        pearson = spearman = np.full((len(CHART_METRICS),) * 2, np.nan)
+
+    overall = values.quantile(QUANTILE_LEVELS) if len(df) else None
+    by_type = grouped.quantile(QUANTILE_LEVELS) if len(df) else None
+    counts = grouped.size()
+
+    histograms, quantiles, box = {}, {}, {}
+    for name in CHART_METRICS:
+        y = values[name].to_numpy()
+        if len(y):
+            hist_counts, edges = np.histogram(y, bins=bins)
+            histograms[name] = {'edges': _finite(edges), 'counts': hist_counts.tolist()}
+        else:
+            histograms[name] = {'edges': [], 'counts': []}
+        quantiles[name] = {
+            'overall': _finite(overall[name]) if overall is not None else [],
+            'by_type': {t: _finite(by_type.loc[t, name]) for t in types},
+        }
+
+        box[name] = []
+        if not types:
+            continue
+        q1 = by_type[name].xs(0.25, level=1)
+        q3 = by_type[name].xs(0.75, level=1)
+        fence = 1.5 * (q3 - q1)
+        lo_fence = df['type'].map(q1 - fence)
+        hi_fence = df['type'].map(q3 + fence)
+        column = values[name]
+        whislo = column.where(column >= lo_fence).groupby(df['type']).min()
+        whishi = column.where(column <= hi_fence).groupby(df['type']).max()
+        outliers = ((column < lo_fence) | (column > hi_fence)).groupby(df['type']).sum()
+        median = by_type[name].xs(0.5, level=1)
+        for t in types:
+            whiskers = _finite([whislo[t], q1[t], median[t], q3[t], whishi[t]])
+            box[name].append({
+                'label': t, 'count': int(counts[t]), 'outliers': int(outliers[t]),
+                **dict(zip(['whislo', 'q1', 'med', 'q3', 'whishi'], whiskers)),
+            })
+
+    return {
+        'dataset_id': dataset_id,
+        'total_count': len(df),
+        'metrics': CHART_METRICS,
+        'correlation': {'pearson': [_finite(r) for r in pearson], 'spearman': [_finite(r) for r in spearman]},
+        'histograms': histograms,
+        'quantiles': {'levels': QUANTILE_LEVELS, **quantiles},
+        'box': box,
+    }
+
+
+def _downsample_series(times: 'np.ndarray', values: 'np.ndarray', points: int) -> dict:
+    """Bucket a time-ordered series into at most `points` equal-count buckets of mean/min/max."""
+    import numpy as np
+
+    n = len(times)
+    starts = np.unique(np.linspace(0, n, min(points, n) + 1).astype(np.int64)[:-1])
+    sizes = np.diff(np.append(starts, n))
+    series = {
+        't': [
+            datetime.fromtimestamp(t, tz=dt_timezone.utc).isoformat()
+            for t in np.add.reduceat(times, starts) / sizes
+        ],
+        'count': sizes.tolist(),
+    }
+    for i, name in enumerate(CHART_METRICS):
+        y = values[:, i]
+        series[name] = {
+            'mean': _rounded(np.add.reduceat(y, starts) / sizes),
+            'min': _rounded(np.minimum.reduceat(y, starts)),
+            'max': _rounded(np.maximum.reduceat(y, starts)),
+        }
+    return series
+
+
+def build_equipment_history(equipment_ids, since=None, until=None, points: int = 500,
+                            chunk_size: int = 5000) -> dict:
+    """
+    Measurements of several tracked equipment in one ordered range scan of the
+    (equipment, recorded_at) index, each downsampled to at most `points`
+    buckets. Returns {equipment_id: series} for every requested id.
+    """
+    import numpy as np
+
+    measurements = Measurement.objects.filter(equipment_id__in=equipment_ids)
+    if since is not None:
+        measurements = measurements.filter(recorded_at__gte=since)
+    if until is not None:
+        measurements = measurements.filter(recorded_at__lt=until)
+    rows = (
+        measurements.order_by('equipment_id', 'recorded_at')
+        .values_list('equipment_id', 'recorded_at', *CHART_METRICS)
+        .iterator(chunk_size=chunk_size)
+    )
+    history = {}
+    for equipment_id, group in itertools.groupby(rows, key=lambda row: row[0]):
+        group = list(group)
+        times = np.fromiter((row[1].timestamp() for row in group), dtype=np.float64, count=len(group))
+        values = np.asarray([row[2:] for row in group], dtype=np.float64)
+        history[equipment_id] = {'total_points': len(group), **_downsample_series(times, values, points)}
+    for equipment_id in equipment_ids:
+        if equipment_id not in history:
+            history[equipment_id] = {
+                'total_points': 0, 't': [], 'count': [],
+                **{name: {'mean': [], 'min': [], 'max': []} for name in CHART_METRICS},
+            }
+    return history
+
+
+def _format_reading(value, column: str) -> str:
+    """A stored (canonical unit) reading as report text, e.g. '12.50 m3/h'; None as 'N/A'."""
+    if value is None:
+        return 'N/A'
+    return f"{value:.{REPORT_DECIMALS}f} {CANONICAL_UNITS[column]}"
 
 
 def generate_pdf_report(dataset_id: int) -> str:
@@ -100,6 +725,12 @@ def generate_pdf_report(dataset_id: int) -> str:
     Generate PDF report with summary + charts.
     Returns path to saved PDF file.
     """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
     dataset = Dataset.objects.get(id=dataset_id)
     equipment = list(Equipment.objects.filter(dataset_id=dataset_id).order_by('row_number'))
     type_summaries = list(EquipmentTypeSummary.objects.filter(dataset_id=dataset_id))
@@ -132,9 +763,9 @@ def generate_pdf_report(dataset_id: int) -> str:
     summary_data = [
         ['Metric', 'Value'],
         ['Total Equipment Count', str(dataset.total_equipment_count)],
-        ['Avg Flowrate', str(dataset.avg_flowrate) if dataset.avg_flowrate else 'N/A'],
-        ['Avg Pressure', str(dataset.avg_pressure) if dataset.avg_pressure else 'N/A'],
-        ['Avg Temperature', str(dataset.avg_temperature) if dataset.avg_temperature else 'N/A'],
+        ['Avg Flowrate', _format_reading(dataset.avg_flowrate, 'Flowrate')],
+        ['Avg Pressure', _format_reading(dataset.avg_pressure, 'Pressure')],
+        ['Avg Temperature', _format_reading(dataset.avg_temperature, 'Temperature')],
     ]
     t = Table(summary_data)
     t.setStyle(TableStyle([
@@ -171,7 +802,10 @@ def generate_pdf_report(dataset_id: int) -> str:
     top5 = sorted(equipment, key=lambda e: float(e.flowrate), reverse=True)[:5]
     top_data = [['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']]
     for e in top5:
-        top_data.append([e.equipment_name, e.equipment_type, str(e.flowrate), str(e.pressure), str(e.temperature)])
+        top_data.append([
+            e.equipment_name, e.equipment_type, _format_reading(e.flowrate, 'Flowrate'),
+            _format_reading(e.pressure, 'Pressure'), _format_reading(e.temperature, 'Temperature'),
+        ])
     t3 = Table(top_data)
     t3.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
@@ -181,6 +815,43 @@ def generate_pdf_report(dataset_id: int) -> str:
         ('GRID', (0, 0), (-1, -1), 1, colors.black),
     ]))
     elements.append(t3)
+    elements.append(Spacer(1, 0.3 * inch))
+
+    # Readings flagged at ingest (api.anomalies)
+    elements.append(Paragraph("Anomalies", styles['Heading2']))
+    flagged = Anomaly.objects.filter(dataset_id=dataset_id)
+    counts = list(flagged.values('metric', 'rule').annotate(n=Count('id')).order_by('metric', 'rule'))
+    if not dataset.anomaly_count:
+        elements.append(Paragraph("No readings were flagged.", styles['Normal']))
+    else:
+        stored = sum(c['n'] for c in counts)
+        note = f"{dataset.anomaly_count} reading(s) flagged"
+        if stored < dataset.anomaly_count:
+            note += f" ({stored} stored)"
+        elements.append(Paragraph(note + ".", styles['Normal']))
+        elements.append(Spacer(1, 0.1 * inch))
+        count_data = [['Metric', 'Check', 'Count']]
+        for c in counts:
+            count_data.append([c['metric'].title(), c['rule'], str(c['n'])])
+        rows = flagged.order_by('row_number', 'metric', 'rule')[:REPORT_MAX_ANOMALIES]
+        flag_data = [['Row', 'Equipment', 'Metric', 'Check', 'Value', 'Expected']]
+        for a in rows:
+            lower = f"{a.lower:.4g}" if a.lower is not None else ''
+            upper = f"{a.upper:.4g}" if a.upper is not None else ''
+            flag_data.append([
+                str(a.row_number), a.equipment_name, a.metric.title(), a.rule, f"{a.value:.4g}", f"{lower} .. {upper}",
+            ])
+        for data in (count_data, flag_data):
+            t4 = Table(data)
+            t4.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ]))
+            elements.append(t4)
+            elements.append(Spacer(1, 0.2 * inch))
 
     doc.build(elements)
 
@@ -194,4 +865,111 @@ def generate_pdf_report(dataset_id: int) -> str:
             'file_size': file_size,
         }
     )
+    events.publish(dataset.uploaded_by_id, events.REPORT_READY, dataset_id=dataset_id, filename=filename, file_size=file_size)
     return str(file_path)
+
+
+def _iter_equipment_rows(dataset_id: int, chunk_size: int, extra_columns=()):
+    """
+    Yield (name, type, flowrate, pressure, temperature, *extras) tuples from a
+    server-side cursor, with one value (or None) per extra column.
+    """
+    rows = (
+        Equipment.objects.filter(dataset_id=dataset_id)
+        .order_by('row_number')
+        .values_list(*EXPORT_FIELDS, 'extra_values')
+        .iterator(chunk_size=chunk_size)
+    )
+    padding = (None,) * len(extra_columns)
+    for *row, extras in rows:
+        yield (*row, *(extras or padding)) if extra_columns else tuple(row)
+
+
+class _StreamBuffer:
+    """Minimal write-only file object whose contents are drained after each write batch."""
+
+    def __init__(self):
+        self._chunks = []
+        self.closed = False
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_equipment_csv(dataset_id: int, chunk_size: int = 2000, extra_columns=()):
+    """
+    Stream a dataset's equipment rows as CSV bytes.
+    Uses the same header as uploads, followed by the dataset's extra_columns,
+    so an export can be re-imported.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(REQUIRED_COLUMNS + list(extra_columns))
+    rows = 0
+    for row in _iter_equipment_rows(dataset_id, chunk_size, extra_columns):
+        writer.writerow(row)
+        rows += 1
+        if rows % chunk_size == 0:
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode('utf-8')
+
+
+def iter_equipment_parquet(dataset_id: int, chunk_size: int = 50000, extra_columns=()):
+    """
+    Stream a dataset's equipment rows as a Parquet file, one row group per chunk,
+    with the dataset's extra_columns after the upload columns.
+    Requires pyarrow; raises ImportError if it is not installed.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [(REQUIRED_COLUMNS[0], pa.string()), (REQUIRED_COLUMNS[1], pa.string())]
+        + [(col, pa.float64()) for col in REQUIRED_COLUMNS[2:] + list(extra_columns)]
+    )
+    sink = _StreamBuffer()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+
+    def _flush(batch):
+        columns = list(zip(*batch))
+        table = pa.Table.from_arrays([
+            pa.array(values, type=field.type) for values, field in zip(columns, schema)
+        ], schema=schema)
+        writer.write_table(table)
+
+    batch = []
+    for row in _iter_equipment_rows(dataset_id, min(chunk_size, 2000), extra_columns):
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            _flush(batch)
+            batch = []
+            yield sink.drain()
+    if batch:
+        _flush(batch)
+    writer.close()
+    yield sink.drain()
+
+
+def gzip_stream(chunks, level: int = 6):
+    """Compress an iterable of byte chunks into a single gzip stream."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -1,20 +1,46 @@
 """
 API views for Chemical Equipment Parameter Visualizer.
 """
-import io
+import asyncio
+import hashlib
+import hmac
+import os
+import time
+from datetime import timezone as dt_timezone
+from asgiref.sync import sync_to_async
 from rest_framework import status, generics
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.exceptions import AuthenticationFailed, ParseError
 from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
-from django.http import FileResponse, Http404, HttpResponse
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
 from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import etag
 
-from .models import Dataset, Equipment, EquipmentTypeSummary, PDFReport
-from .serializers import DatasetListSerializer, DatasetDetailSerializer, EquipmentSerializer, UserSerializer
-from .utils import parse_csv_with_pandas, calculate_summary_stats, prune_old_datasets, generate_pdf_report
+from . import anomalies, events
+from .csv_schema import CANONICAL_UNITS, NUMERIC_COLUMNS, normalise_unit
+from .models import Anomaly, Dataset, Equipment, EquipmentTypeSummary, PDFReport, TrackedEquipment, UploadSession
+from .profiling import profiled
+from .serializers import (
+    AnomalySerializer, DatasetListSerializer, DatasetDetailSerializer, DisplayDatasetDetailSerializer,
+    DisplayEquipmentSerializer, EquipmentSerializer, TrackedEquipmentSerializer, UserSerializer,
+)
+from .utils import (
+    parse_upload, calculate_summary_stats, prune_old_datasets, prune_old_measurements, generate_pdf_report,
+    prune_stale_upload_sessions, iter_equipment_csv, iter_equipment_parquet, gzip_stream, build_chart_data,
+    save_equipment_rows, save_type_summaries, record_measurements, normalise_equipment_name, build_equipment_history, build_analytics,
+    display_conversions, with_display_units, DISPLAY_DECIMALS,
+)
 
 
 # Allow unauthenticated for upload/auth to simplify testing; protect other endpoints optionally
@@ -22,74 +48,140 @@ def get_permission():
     return [AllowAny()]  # Change to [IsAuthenticated()] for production
 
 
+def _namespace(request):
+    """
+    The user whose datasets this request works with; None is the namespace
+    shared by anonymous uploads. Plain Django callables (etag conditions, the
+    event stream) run without DRF authentication, so JWTs are checked here.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    result = JWTAuthentication().authenticate(request)
+    return result[0] if result else None
+
+
+def _user_datasets(request):
+    return Dataset.objects.filter(uploaded_by=_namespace(request))
+
+
+def _get_user_dataset(request, pk):
+    try:
+        return _user_datasets(request).get(pk=pk)
+    except Dataset.DoesNotExist:
+        raise Http404
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@profiled
 def upload_csv(request):
-    """Accept CSV file, validate, parse, save Dataset + Equipment."""
+    """Accept a CSV, .xlsx or Parquet file, validate, parse, save Dataset + Equipment."""
     if 'file' not in request.FILES and 'csv' not in request.FILES:
         return Response(
             {'error': 'No file provided. Use form field "file" or "csv".'},
             status=status.HTTP_400_BAD_REQUEST
         )
     file = request.FILES.get('file') or request.FILES.get('csv')
-    content = file.read()
-    file_hash = __import__('hashlib').sha256(content).hexdigest()
+    try:
+        units = _requested_units(request.data)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    # Hash in chunks and hand the upload itself to the parser (large uploads are spooled to disk)
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    user = request.user if request.user.is_authenticated else None
+    return _ingest_file(file, file.name, digest.hexdigest(), user, units)
 
-    if Dataset.objects.filter(file_hash=file_hash).exists():
-        return Response(
-            {'error': 'Duplicate file. This CSV has already been uploaded.'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
 
+DUPLICATE_ERROR = 'Duplicate file. This CSV has already been uploaded.'
+
+# Query/form parameters naming the unit of each reading, e.g. ?pressure_unit=psi
+UNIT_PARAMS = {col: f'{col.lower()}_unit' for col in NUMERIC_COLUMNS}
+
+
+def _requested_units(params):
+    """{column: unit} for the *_unit parameters present; ValueError for unknown units."""
+    return {col: normalise_unit(col, params[name]) for col, name in UNIT_PARAMS.items() if params.get(name)}
+
+
+def _display_units(params):
+    """
+    Units readings are reported in (canonical unless a *_unit parameter asks otherwise):
+    ({metric: unit}, conversions for utils.display_conversions). ValueError for unknown units.
+    """
+    units = {**CANONICAL_UNITS, **_requested_units(params)}
+    return {col.lower(): unit for col, unit in units.items()}, display_conversions(units)
+
+
+def _ingest_file(fileobj, filename, file_hash, user, units=None):
+    """
+    Parse a CSV, .xlsx or Parquet file and save Dataset + Equipment; shared by direct and chunked uploads.
+    `units` ({column: unit}) applies to columns whose header has no unit suffix.
+    """
+    if Dataset.objects.filter(uploaded_by=user, file_hash=file_hash).exists():
+        return Response({'error': DUPLICATE_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+
+    namespace = user.id if user else None
+    events.job_progress(namespace, 'ingest', file_hash, 0.0, filename=filename, stage='parsing')
     try:
-        df = parse_csv_with_pandas(io.BytesIO(content))
+        df = parse_upload(fileobj, units)
     except ValueError as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    config = anomalies.get_config()
+    flags = None
+    if config['ENABLED']:
+        events.job_progress(namespace, 'ingest', file_hash, 0.2, filename=filename, stage='anomalies')
+        # Bounds come from earlier uploads only; this one is not saved yet
+        flags = anomalies.detect_anomalies(df, anomalies.historical_bounds(user), config)
+        out_of_range = flags[flags['rule'] == 'range']
+        if config['REJECT_OUT_OF_RANGE'] and len(out_of_range):
+            rows = sorted(set(out_of_range['row_number'].tolist()))
+            shown = ', '.join(str(r) for r in rows[:10]) + (', ...' if len(rows) > 10 else '')
+            return Response(
+                {'error': f'{len(rows)} row(s) outside the allowed range: {shown}'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+    events.job_progress(namespace, 'ingest', file_hash, 0.25, filename=filename, stage='saving')
+
     summary = calculate_summary_stats(df)
-    user = request.user if request.user.is_authenticated else None
+    batch_size = getattr(settings, 'INGEST_BATCH_SIZE', 2000)
 
-    dataset = Dataset.objects.create(
-        filename=file.name,
-        file_hash=file_hash,
-        total_equipment_count=summary['total_count'],
-        avg_flowrate=summary['avg_flowrate'],
-        avg_pressure=summary['avg_pressure'],
-        avg_temperature=summary['avg_temperature'],
-        uploaded_by=user,
-    )
+    try:
+        with transaction.atomic():
+            dataset = Dataset.objects.create(
+                filename=filename,
+                file_hash=file_hash,
+                total_equipment_count=summary['total_count'],
+                avg_flowrate=summary['avg_flowrate'],
+                avg_pressure=summary['avg_pressure'],
+                avg_temperature=summary['avg_temperature'],
+                anomaly_count=len(flags) if flags is not None else 0,
+                source_units={col.lower(): unit for col, unit in df.attrs['units'].items()},
+                extra_columns=df.attrs['extra_columns'],
+                uploaded_by=user,
+            )
 
-    # Create equipment records
-    for i, row in df.iterrows():
-        Equipment.objects.create(
-            dataset=dataset,
-            equipment_name=str(row['Equipment Name']),
-            equipment_type=str(row['Type']),
-            flowrate=row['Flowrate'],
-            pressure=row['Pressure'],
-            temperature=row['Temperature'],
-            row_number=int(i) + 1,
-        )
+            # Create equipment records
+            save_equipment_rows(dataset, df, batch_size)
 
-    # Create equipment type summaries
-    for eq_type, count in summary['equipment_type_distribution'].items():
-        subset = df[df['Type'] == eq_type]
-        EquipmentTypeSummary.objects.create(
-            dataset=dataset,
-            equipment_type=eq_type,
-            count=count,
-            avg_flowrate=subset['Flowrate'].mean(),
-            avg_pressure=subset['Pressure'].mean(),
-            avg_temperature=subset['Temperature'].mean(),
-            min_flowrate=subset['Flowrate'].min(),
-            max_flowrate=subset['Flowrate'].max(),
-            min_pressure=subset['Pressure'].min(),
-            max_pressure=subset['Pressure'].max(),
-            min_temperature=subset['Temperature'].min(),
-            max_temperature=subset['Temperature'].max(),
-        )
+            # Create equipment type summaries
+            save_type_summaries(dataset, df)
+
+            events.job_progress(namespace, 'ingest', file_hash, 0.75, filename=filename, stage='history')
+            record_measurements(dataset, df, batch_size)
+            if flags is not None:
+                anomalies.save_anomalies(dataset, flags, config['MAX_STORED'], batch_size)
+    except IntegrityError:
+        # The same file finished uploading concurrently in this namespace
+        return Response({'error': DUPLICATE_ERROR}, status=status.HTTP_400_BAD_REQUEST)
 
-    prune_old_datasets()
+    events.publish(namespace, events.DATASET_CREATED, dataset=DatasetListSerializer(dataset).data)
+    prune_old_datasets(user)
+    prune_old_measurements(user)
     return Response({
         'dataset_id': dataset.id,
         'filename': dataset.filename,
@@ -97,38 +189,236 @@ def upload_csv(request):
         'avg_flowrate': float(dataset.avg_flowrate) if dataset.avg_flowrate else None,
         'avg_pressure': float(dataset.avg_pressure) if dataset.avg_pressure else None,
         'avg_temperature': float(dataset.avg_temperature) if dataset.avg_temperature else None,
+        'anomaly_count': dataset.anomaly_count,
     }, status=status.HTTP_201_CREATED)
 
 
+def _upload_state(session):
+    return {
+        'upload_id': str(session.id),
+        'filename': session.filename,
+        'size': session.total_size,
+        'chunk_size': session.chunk_size,
+        'offset': session.received_bytes,
+    }
+
+
+def _get_upload_session(request, upload_id):
+    try:
+        session = UploadSession.objects.get(pk=upload_id)
+    except UploadSession.DoesNotExist:
+        raise Http404
+    if session.uploaded_by_id is not None and session.uploaded_by_id != request.user.id:
+        raise Http404
+    return session
+
+
+def _discard_upload(session):
+    try:
+        os.remove(session.part_path)
+    except FileNotFoundError:
+        pass
+    session.delete()
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def upload_init(request):
+    """
+    Start (or resume) a chunked upload: {filename, size, sha256}.
+    An unfinished session for the same file and user is returned with its
+    acknowledged offset so the client continues where it stopped.
+    """
+    filename = str(request.data.get('filename') or '').strip()
+    file_hash = str(request.data.get('sha256') or '').lower()
+    try:
+        size = int(request.data.get('size'))
+    except (TypeError, ValueError):
+        size = 0
+    max_bytes = getattr(settings, 'UPLOAD_MAX_BYTES', 512 * 1024 * 1024)
+    if not filename or len(file_hash) != 64 or any(c not in '0123456789abcdef' for c in file_hash):
+        return Response({'error': 'filename and a hex sha256 are required.'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 0 < size <= max_bytes:
+        return Response({'error': f'size must be between 1 and {max_bytes} bytes.'}, status=status.HTTP_400_BAD_REQUEST)
+    user = request.user if request.user.is_authenticated else None
+    if Dataset.objects.filter(uploaded_by=user, file_hash=file_hash).exists():
+        return Response({'error': DUPLICATE_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+
+    prune_stale_upload_sessions()
+    session = UploadSession.objects.filter(file_hash=file_hash, total_size=size, uploaded_by=user).first()
+    if session is not None:
+        # Only bytes actually on disk count as acknowledged
+        on_disk = os.path.getsize(session.part_path) if os.path.exists(session.part_path) else 0
+        if on_disk != session.received_bytes:
+            session.received_bytes = min(on_disk, session.received_bytes)
+            os.makedirs(os.path.dirname(session.part_path), exist_ok=True)
+            with open(session.part_path, 'ab') as f:
+                f.truncate(session.received_bytes)
+            session.save(update_fields=['received_bytes', 'updated_at'])
+        return Response(_upload_state(session))
+
+    session = UploadSession.objects.create(
+        filename=filename[:255],
+        total_size=size,
+        file_hash=file_hash,
+        chunk_size=getattr(settings, 'UPLOAD_CHUNK_SIZE', 1024 * 1024),
+        uploaded_by=user,
+    )
+    os.makedirs(os.path.dirname(session.part_path), exist_ok=True)
+    open(session.part_path, 'wb').close()
+    return Response(_upload_state(session), status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([AllowAny])
+def upload_status(request, upload_id):
+    """Report the acknowledged offset of a chunked upload, or abort it (DELETE)."""
+    session = _get_upload_session(request, upload_id)
+    if request.method == 'DELETE':
+        _discard_upload(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(_upload_state(session))
+
+
+@api_view(['PUT'])
+@permission_classes([AllowAny])
+def upload_chunk(request, upload_id):
+    """
+    Write one chunk (raw request body) at ?offset=N. Chunks must arrive in
+    order; a resent chunk that was already acknowledged is accepted as a no-op.
+    """
+    session = _get_upload_session(request, upload_id)
+    try:
+        offset = int(request.query_params.get('offset', ''))
+    except ValueError:
+        return Response({'error': 'offset query parameter is required.'}, status=status.HTTP_400_BAD_REQUEST)
+    data = request.body
+    if not data or len(data) > session.chunk_size:
+        return Response(
+            {'error': f'Chunk must be between 1 and {session.chunk_size} bytes.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if offset + len(data) <= session.received_bytes:
+            return Response(_upload_state(session))
+        if offset != session.received_bytes:
+            return Response(
+                {'error': 'Offset does not match the acknowledged upload size.', **_upload_state(session)},
+                status=status.HTTP_409_CONFLICT
+            )
+        if offset + len(data) > session.total_size:
+            return Response({'error': 'Chunk extends past the declared file size.'}, status=status.HTTP_400_BAD_REQUEST)
+        with open(session.part_path, 'r+b') as f:
+            f.seek(offset)
+            f.write(data)
+        session.received_bytes = offset + len(data)
+        session.save(update_fields=['received_bytes', 'updated_at'])
+    events.job_progress(
+        session.uploaded_by_id, 'upload', session.id, session.received_bytes / session.total_size,
+        filename=session.filename,
+    )
+    return Response(_upload_state(session))
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@profiled
+def upload_complete(request, upload_id):
+    """Verify the assembled file against the declared SHA-256 and ingest it."""
+    session = _get_upload_session(request, upload_id)
+    if session.received_bytes != session.total_size:
+        return Response(
+            {'error': 'Upload is incomplete.', **_upload_state(session)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    digest = hashlib.sha256()
+    with open(session.part_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    if digest.hexdigest() != session.file_hash:
+        _discard_upload(session)
+        return Response(
+            {'error': 'Checksum mismatch: the uploaded file is corrupt. Please upload it again.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        units = _requested_units(request.data)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    user = request.user if request.user.is_authenticated else None
+    try:
+        with open(session.part_path, 'rb') as f:
+            response = _ingest_file(f, session.filename, session.file_hash, user, units)
+    finally:
+        _discard_upload(session)
+    return response
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def dataset_list(request):
-    """List last 5 datasets with metadata."""
-    datasets = Dataset.objects.all().order_by('-upload_timestamp')[:5]
+    """List the caller's datasets with metadata (?file_hash= looks up a file before uploading it)."""
+    datasets = _user_datasets(request).order_by('-upload_timestamp')
+    file_hash = request.query_params.get('file_hash')
+    if file_hash:
+        datasets = datasets.filter(file_hash=file_hash.lower())
+    datasets = datasets[:getattr(settings, 'MAX_DATASETS', 5)]
     serializer = DatasetListSerializer(datasets, many=True)
     return Response(serializer.data)
 
 
+# Bump when the dataset_detail payload shape changes so client caches revalidate
+DETAIL_SCHEMA_VERSION = 1
+
+
+def dataset_etag(request, pk):
+    """Datasets are immutable after upload, so the content hash identifies the payload."""
+    try:
+        datasets = _user_datasets(request)
+    except AuthenticationFailed:
+        return None  # the view itself answers 401
+    try:
+        units, conversions = _display_units(request.GET)
+    except ValueError:
+        return None  # the view answers 400
+    file_hash = datasets.filter(pk=pk).values_list('file_hash', flat=True).first()
+    if not file_hash:
+        return None
+    tag = f'{file_hash}-v{DETAIL_SCHEMA_VERSION}'
+    if conversions:
+        tag += '-' + '-'.join(units[m] for m in sorted(units)).replace('/', '')
+    return tag
+
+
+@etag(dataset_etag)
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@profiled
 def dataset_detail(request, pk):
-    """Get specific dataset with full equipment list."""
+    """Get specific dataset with full equipment list (readings in ?<metric>_unit= display units)."""
+    dataset = _get_user_dataset(request, pk)
     try:
-        dataset = Dataset.objects.get(pk=pk)
-    except Dataset.DoesNotExist:
-        raise Http404
-    serializer = DatasetDetailSerializer(dataset)
-    return Response(serializer.data)
+        units, conversions = _display_units(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if conversions:
+        serializer = DisplayDatasetDetailSerializer(dataset, context={'conversions': conversions})
+    else:
+        serializer = DatasetDetailSerializer(dataset)
+    return Response({**serializer.data, 'units': units})
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def dataset_summary(request, pk):
-    """Return JSON with total count, averages, type distribution, min/max."""
+    """Return JSON with total count, averages, type distribution, min/max (in ?<metric>_unit= units)."""
+    dataset = _get_user_dataset(request, pk)
     try:
-        dataset = Dataset.objects.get(pk=pk)
-    except Dataset.DoesNotExist:
-        raise Http404
+        units, conversions = _display_units(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     summaries = list(EquipmentTypeSummary.objects.filter(dataset_id=pk))
     type_dist = {s.equipment_type: s.count for s in summaries}
 
@@ -153,26 +443,227 @@ def dataset_summary(request, pk):
         'min_temperature': _min_val('min_temperature'),
         'max_temperature': _max_val('max_temperature'),
     }
+    for metric, (factor, offset) in conversions.items():
+        for key in (f'avg_{metric}', f'min_{metric}', f'max_{metric}'):
+            if data[key] is not None:
+                data[key] = round(data[key] * factor + offset, DISPLAY_DECIMALS)
+    data['units'] = units
+    data['extra'] = _combine_extra_stats(dataset.extra_columns, summaries)
+    return Response(data)
+
+
+def _combine_extra_stats(columns, summaries):
+    """Dataset-wide {column: {avg, min, max, count}} from the per-type extra_stats."""
+    combined = {}
+    for col in columns:
+        parts = [s.extra_stats[col] for s in summaries if s.extra_stats.get(col, {}).get('count')]
+        count = sum(p['count'] for p in parts)
+        combined[col] = {
+            'avg': round(sum(p['avg'] * p['count'] for p in parts) / count, DISPLAY_DECIMALS) if count else None,
+            'min': min((p['min'] for p in parts), default=None),
+            'max': max((p['max'] for p in parts), default=None),
+            'count': count,
+        }
+    return combined
+
+
+# Bump when the chart-data payload shape changes so cached copies are not served
+CHART_DATA_SCHEMA_VERSION = 1
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def dataset_chart_data(request, pk):
+    """
+    Return downsampled chart series and histograms (?resolution=500&bins=20).
+    Payload size depends on resolution, not on the number of rows; it is
+    cached per dataset like dataset_analytics.
+    """
+    file_hash = _user_datasets(request).filter(pk=pk).values_list('file_hash', flat=True).first()
+    if file_hash is None:
+        raise Http404
+    max_resolution = getattr(settings, 'CHART_MAX_RESOLUTION', 5000)
+    try:
+        resolution = int(request.query_params.get('resolution', 500))
+        bins = int(request.query_params.get('bins', 20))
+    except ValueError:
+        return Response(
+            {'error': 'resolution and bins must be integers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        units, conversions = _display_units(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    resolution = max(10, min(resolution, max_resolution))
+    bins = max(1, min(bins, 200))
+    unit_key = ':'.join(units[m] for m in sorted(units))
+    key = f'chart-data:v{CHART_DATA_SCHEMA_VERSION}:{pk}:{file_hash}:{resolution}:{bins}:{unit_key}'
+    data = cache.get(key)
+    if data is None:
+        data = {**build_chart_data(pk, resolution=resolution, bins=bins, conversions=conversions), 'units': units}
+        cache.set(key, data, getattr(settings, 'ANALYTICS_CACHE_SECONDS', 24 * 3600))
     return Response(data)
 
 
+
+# Bump when the analytics payload shape changes so cached copies are not served
+ANALYTICS_SCHEMA_VERSION = 1
+
+
+def _analytics_bins(request):
+    return max(1, min(int(request.GET.get('bins', 20)), 200))
+
+
+def analytics_etag(request, pk):
+    try:
+        bins = _analytics_bins(request)
+    except ValueError:
+        return None
+    tag = dataset_etag(request, pk)
+    return f'{tag}-analytics-v{ANALYTICS_SCHEMA_VERSION}-b{bins}' if tag else None
+
+
+@etag(analytics_etag)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def dataset_analytics(request, pk):
+    """
+    Correlation matrices, histograms (?bins=20), per-type quantiles and box-plot
+    statistics. Datasets never change, so results are cached per dataset (the
+    same file can back datasets in other namespaces, stored in other units).
+    """
+    file_hash = _user_datasets(request).filter(pk=pk).values_list('file_hash', flat=True).first()
+    if file_hash is None:
+        raise Http404
+    try:
+        bins = _analytics_bins(request)
+    except ValueError:
+        return Response({'error': 'bins must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        units, conversions = _display_units(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    unit_key = ':'.join(units[m] for m in sorted(units))
+    key = f'analytics:v{ANALYTICS_SCHEMA_VERSION}:{pk}:{file_hash}:{bins}:{unit_key}'
+    data = cache.get(key)
+    if data is None:
+        data = {**build_analytics(pk, bins=bins, conversions=conversions), 'units': units}
+        cache.set(key, data, getattr(settings, 'ANALYTICS_CACHE_SECONDS', 24 * 3600))
+    return Response({**data, 'dataset_id': int(pk)})
+
+
 class EquipmentList(generics.ListAPIView):
-    """Paginated list of equipment records for a dataset."""
+    """Paginated list of equipment records for a dataset (readings in ?<metric>_unit= units)."""
     serializer_class = EquipmentSerializer
     permission_classes = [AllowAny]
 
+    def _conversions(self):
+        try:
+            return _display_units(self.request.query_params)[1]
+        except ValueError as e:
+            raise ParseError(str(e))
+
+    def get_serializer_class(self):
+        return DisplayEquipmentSerializer if self._conversions() else EquipmentSerializer
+
     def get_queryset(self):
-        return Equipment.objects.filter(dataset_id=self.kwargs['pk']).order_by('row_number')
+        equipment = Equipment.objects.filter(
+            dataset_id=self.kwargs['pk'], dataset__uploaded_by=_namespace(self.request)
+        ).order_by('row_number')
+        conversions = self._conversions()
+        return with_display_units(equipment, conversions) if conversions else equipment
+
+
+class AnomalyList(generics.ListAPIView):
+    """Paginated readings flagged at ingest for a dataset (?rule= and ?metric= filter)."""
+    serializer_class = AnomalySerializer
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        flagged = Anomaly.objects.filter(
+            dataset_id=self.kwargs['pk'], dataset__uploaded_by=_namespace(self.request)
+        )
+        for param in ('rule', 'metric'):
+            value = self.request.query_params.get(param)
+            if value:
+                flagged = flagged.filter(**{param: value.lower()})
+        return flagged.order_by('row_number', 'metric', 'rule')
+
+
+class TrackedEquipmentList(generics.ListAPIView):
+    """Paginated equipment registry of the caller's namespace (?search= matches names)."""
+    serializer_class = TrackedEquipmentSerializer
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        registry = TrackedEquipment.objects.filter(owner=_namespace(self.request))
+        search = self.request.query_params.get('search')
+        if search:
+            registry = registry.filter(name_key__contains=normalise_equipment_name(search))
+        return registry.order_by('name_key')
+
+
+def _parse_timestamp(value):
+    """ISO 8601 query parameter to an aware datetime (UTC if no offset); ValueError if malformed."""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed.replace(tzinfo=dt_timezone.utc) if timezone.is_naive(parsed) else parsed
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def equipment_history(request):
+    """
+    Measurement history of one or more tracked equipment across uploads:
+    ?name=Pump-A1&name=... (or ?id=), optional ISO ?since= / ?until= and
+    ?points= (max buckets per series; longer histories are downsampled).
+    """
+    names = request.query_params.getlist('name')
+    ids = request.query_params.getlist('id')
+    max_series = getattr(settings, 'HISTORY_MAX_SERIES', 50)
+    if not names and not ids:
+        return Response({'error': 'Pass at least one ?name= or ?id=.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(names) + len(ids) > max_series:
+        return Response(
+            {'error': f'At most {max_series} equipment per request.'}, status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        ids = [int(i) for i in ids]
+        points = int(request.query_params.get('points', 500))
+        since, until = (_parse_timestamp(request.query_params.get(key)) for key in ('since', 'until'))
+    except ValueError:
+        return Response(
+            {'error': 'id and points must be integers; since and until ISO 8601 datetimes.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    points = max(2, min(points, getattr(settings, 'CHART_MAX_RESOLUTION', 5000)))
+
+    registry = TrackedEquipment.objects.filter(owner=_namespace(request))
+    keys = {normalise_equipment_name(name): name for name in names}
+    equipment = list(registry.filter(Q(name_key__in=keys) | Q(id__in=ids)))
+    history = build_equipment_history([e.id for e in equipment], since=since, until=until, points=points)
+    series = [{**TrackedEquipmentSerializer(e).data, **history[e.id]} for e in equipment]
+    found_keys = {e.name_key for e in equipment}
+    found_ids = {e.id for e in equipment}
+    return Response({
+        'points': points,
+        'series': series,
+        'missing': [name for key, name in keys.items() if key not in found_keys]
+        + [str(i) for i in ids if i not in found_ids],
+    })
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@profiled
 def generate_pdf(request, pk):
     """Generate PDF report and return file download."""
-    try:
-        Dataset.objects.get(pk=pk)
-    except Dataset.DoesNotExist:
-        raise Http404
+    dataset = _get_user_dataset(request, pk)
+    events.job_progress(dataset.uploaded_by_id, 'report', pk, 0.0, dataset_id=pk)
     try:
         path = generate_pdf_report(pk)
     except Exception as e:
@@ -197,6 +688,143 @@ def generate_pdf(request, pk):
         )
 
 
+EXPORT_FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+}
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def export_dataset(request, pk):
+    """
+    Stream dataset equipment as CSV or Parquet (?fmt=csv|parquet, ?gzip=1).
+    Rows are read through a server-side cursor so memory stays constant,
+    under ASGI too (see _async_chunks).
+    """
+    dataset = _get_user_dataset(request, pk)
+    fmt = request.query_params.get('fmt', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return Response(
+            {'error': f'Unsupported export format "{fmt}". Use one of: {", ".join(EXPORT_FORMATS)}.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    chunk_size = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    if fmt == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return Response(
+                {'error': 'Parquet export requires pyarrow to be installed on the server.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        stream = iter_equipment_parquet(pk, chunk_size=max(chunk_size, 50000), extra_columns=dataset.extra_columns)
+    else:
+        stream = iter_equipment_csv(pk, chunk_size=chunk_size, extra_columns=dataset.extra_columns)
+
+    content_type, ext = EXPORT_FORMATS[fmt]
+    base_name = dataset.filename.rsplit('.', 1)[0] or f'dataset_{pk}'
+    filename = f'{base_name}{ext}'
+    if request.query_params.get('gzip', '').lower() in ('1', 'true', 'yes'):
+        stream = gzip_stream(stream)
+        content_type = 'application/gzip'
+        filename += '.gz'
+
+    if isinstance(request._request, ASGIRequest):  # DRF wraps the Django request
+        stream = _async_chunks(stream)
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+async def _async_chunks(chunks):
+    """
+    Serve a sync chunk iterator under ASGI one chunk at a time; Django would
+    otherwise collect the whole iterator into a list before sending anything.
+    """
+    chunks = iter(chunks)
+    done = object()
+    # thread_sensitive keeps the server-side cursor on one thread and connection
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while True:
+        chunk = await next_chunk(chunks, done)
+        if chunk is done:
+            return
+        yield chunk
+
+
+def metrics_view(request):
+    """
+    Expose request metrics in Prometheus text format to staff users and to
+    scrapers sending "Authorization: Bearer <METRICS_TOKEN>".
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not (token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')):
+        try:
+            user = _namespace(request)
+        except AuthenticationFailed:
+            user = None  # a scraper token that does not match
+        if user is None or not user.is_staff:
+            return JsonResponse({'error': 'Metrics are restricted to staff.'}, status=status.HTTP_403_FORBIDDEN)
+    from .metrics import REGISTRY
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def event_stream(request):
+    """
+    Server-Sent Events: dataset-created, dataset-pruned, job-progress and
+    report-ready for the caller's namespace. Clients reconnect with
+    Last-Event-ID to receive what they missed. Served from an async iterator
+    under ASGI; under WSGI every open stream holds a worker thread.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    try:
+        user = _namespace(request)
+    except AuthenticationFailed as e:
+        return JsonResponse({'error': str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    namespace = user.id if user else None
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.GET['last_event_id'])
+    except (KeyError, ValueError):
+        last_event_id = None
+    heartbeat = getattr(settings, 'EVENTS_HEARTBEAT_SECONDS', 15)
+    # Bounded so streams whose client vanished are reclaimed; clients just reconnect
+    deadline = time.monotonic() + getattr(settings, 'EVENTS_STREAM_MAX_SECONDS', 300)
+    if isinstance(request, ASGIRequest):
+        stream = _async_event_stream(namespace, last_event_id, heartbeat, deadline)
+    else:
+        stream = _sync_event_stream(namespace, last_event_id, heartbeat, deadline)
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _sync_event_stream(namespace, last_event_id, heartbeat, deadline):
+    subscription = events.BROKER.subscribe(namespace, last_event_id)
+    try:
+        yield f'retry: {events.RETRY_MS}\n\n'
+        while not subscription.overflowed and time.monotonic() < deadline:
+            event = subscription.get(timeout=heartbeat)
+            yield events.format_sse(event) if event else ': keepalive\n\n'
+    finally:
+        subscription.close()
+
+
+async def _async_event_stream(namespace, last_event_id, heartbeat, deadline):
+    subscription = events.BROKER.subscribe(namespace, last_event_id, loop=asyncio.get_running_loop())
+    try:
+        yield f'retry: {events.RETRY_MS}\n\n'
+        while not subscription.overflowed and time.monotonic() < deadline:
+            event = await subscription.aget(timeout=heartbeat)
+            yield events.format_sse(event) if event else ': keepalive\n\n'
+    finally:
+        subscription.close()
+
+
 # Auth views
 @api_view(['POST'])
 @permission_classes([AllowAny])
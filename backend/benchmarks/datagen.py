@@ -0,0 +1,68 @@
+"""
+Synthetic equipment CSV generator for benchmarks.
+"""
+import argparse
+import io
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+BASE_TYPES = ['Centrifugal Pump', 'Batch Reactor', 'Shell and Tube', 'Rotary Compressor', 'Storage Tank']
+NAME_PREFIXES = ['Pump', 'Reactor', 'Heat-Exchanger', 'Compressor', 'Tank']
+
+
+def equipment_types(n_types: int) -> list:
+    """Return n_types distinct type names, extending the sample types with numbered variants."""
+    types = []
+    for i in range(n_types):
+        base = BASE_TYPES[i % len(BASE_TYPES)]
+        types.append(base if i < len(BASE_TYPES) else f'{base} {i // len(BASE_TYPES) + 1}')
+    return types
+
+
+def generate_equipment_frame(rows: int, n_types: int = 5, seed: int = 0) -> pd.DataFrame:
+    """
+    Build a DataFrame with the upload columns and plausible value ranges.
+    Generation is vectorised so a million rows takes about a second.
+    """
+    rng = np.random.default_rng(seed)
+    types = np.array(equipment_types(n_types), dtype=object)
+    type_idx = rng.integers(0, n_types, size=rows)
+    prefixes = np.array(NAME_PREFIXES, dtype=object)[type_idx % len(NAME_PREFIXES)]
+    names = prefixes + '-' + np.arange(1, rows + 1).astype(str).astype(object)
+    return pd.DataFrame({
+        'Equipment Name': names,
+        'Type': types[type_idx],
+        'Flowrate': np.round(rng.uniform(20, 300, size=rows), 1),
+        'Pressure': np.round(rng.uniform(1, 40, size=rows), 1),
+        'Temperature': np.round(rng.uniform(10, 250, size=rows), 1),
+    })
+
+
+def generate_equipment_csv(rows: int, n_types: int = 5, seed: int = 0) -> bytes:
+    """Return a synthetic equipment CSV as UTF-8 bytes."""
+    buf = io.StringIO()
+    generate_equipment_frame(rows, n_types, seed).to_csv(buf, index=False)
+    return buf.getvalue().encode('utf-8')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic equipment CSV.')
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--types', type=int, default=5, help='Number of distinct equipment types')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', '-o', help='Output path (default: stdout)')
+    args = parser.parse_args(argv)
+
+    content = generate_equipment_csv(args.rows, args.types, args.seed)
+    if args.output:
+        with open(args.output, 'wb') as f:
+            f.write(content)
+    else:
+        sys.stdout.buffer.write(content)
+
+
+if __name__ == '__main__':
+    main()
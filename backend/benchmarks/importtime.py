@@ -0,0 +1,19 @@
+"""
+Parser for `python -X importtime` output, used by this suite's import_time
+scenario and by desktop-frontend/benchmarks/startup.py. Standard library
+only, so either benchmark can load it from the repository checkout.
+"""
+
+
+def parse_importtime(stderr):
+    """Return (total, {top-level package: self time}) in ms from -X importtime output."""
+    total_us = 0
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|', 2)
+        total_us += int(self_us)
+        top = name.strip().split('.')[0]
+        packages[top] = packages.get(top, 0) + int(self_us)
+    return total_us / 1000, {k: v / 1000 for k, v in packages.items()}
@@ -0,0 +1,206 @@
+"""
+Benchmark runner for the ingest -> summary -> report pipeline.
+
+Usage (from backend/):
+    python -m benchmarks.run --sizes 1000 100000 --output bench.json
+
+Each scenario records wall time, peak Python memory (tracemalloc) and the
+number/time of SQL queries. The import_time scenario boots Django and the
+URLconf in fresh interpreters under `python -X importtime`, as a worker
+would on a cold start, and reports which heavy libraries were loaded.
+Results are emitted as JSON so runs from different releases can be diffed.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+from benchmarks.importtime import parse_importtime  # noqa: E402
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+SCENARIOS = ['parse_csv', 'summary_stats', 'upload_csv', 'dataset_detail', 'equipment_list', 'generate_pdf',
+             'import_time']
+# Libraries that should only load when a request actually needs them
+HEAVY_MODULES = ['pandas', 'numpy', 'reportlab', 'pyarrow']
+IMPORT_RUNS = 5
+BOOT_SNIPPET = (
+    'import json, sys, django; django.setup(); import config.urls; '
+    f'print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))'
+)
+
+
+class QueryCounter:
+    """DB execute wrapper that counts queries and their time without storing SQL."""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.time += time.perf_counter() - start
+
+
+@contextmanager
+def measure(results, scenario, rows):
+    """Record wall time, peak memory and query stats for the wrapped block."""
+    from django.db import connection
+
+    counter = QueryCounter()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with connection.execute_wrapper(counter):
+        yield
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results.append({
+        'scenario': scenario,
+        'rows': rows,
+        'wall_time_s': round(wall, 4),
+        'peak_memory_bytes': peak,
+        'query_count': counter.count,
+        'query_time_s': round(counter.time, 4),
+    })
+    print(f'  {scenario:<16} rows={rows:<9} {wall:8.3f}s  peak={peak / 1e6:8.1f}MB  queries={counter.count}',
+          file=sys.stderr)
+
+
+def run_import_time(results, runs=IMPORT_RUNS):
+    """Cold-start import cost of django.setup() + the API URLconf, in fresh interpreters."""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='config.settings')
+    totals, per_package, loaded = [], {}, set()
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT_SNIPPET],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        total, packages = parse_importtime(proc.stderr)
+        totals.append(total)
+        for name, ms in packages.items():
+            per_package.setdefault(name, []).append(ms)
+        loaded.update(json.loads(proc.stdout.strip().splitlines()[-1]))
+    top = sorted(((name, statistics.median(v)) for name, v in per_package.items()),
+                 key=lambda item: item[1], reverse=True)[:10]
+    total = statistics.median(totals)
+    results.append({
+        'scenario': 'import_time',
+        'rows': None,
+        'wall_time_s': round(total / 1000, 4),
+        'top_packages_ms': {name: round(ms, 1) for name, ms in top},
+        'heavy_modules_loaded': sorted(loaded),
+    })
+    print(f'  {"import_time":<16} {total / 1000:8.3f}s  heavy modules loaded: {sorted(loaded) or "none"}',
+          file=sys.stderr)
+
+
+def run_size(rows, n_types, scenarios, results):
+    from django.test import Client
+    from api.utils import parse_csv_with_pandas, calculate_summary_stats, generate_pdf_report
+    from benchmarks.datagen import generate_equipment_csv
+
+    content = generate_equipment_csv(rows, n_types, seed=rows)
+    client = Client()
+    df = None
+    dataset_id = None
+
+    if 'parse_csv' in scenarios:
+        with measure(results, 'parse_csv', rows):
+            df = parse_csv_with_pandas(io.BytesIO(content))
+    if 'summary_stats' in scenarios:
+        if df is None:
+            df = parse_csv_with_pandas(io.BytesIO(content))  # setup only; parse_csv was not requested
+        with measure(results, 'summary_stats', rows):
+            calculate_summary_stats(df)
+    df = None
+
+    needs_dataset = {'upload_csv', 'dataset_detail', 'equipment_list', 'generate_pdf'} & set(scenarios)
+    if needs_dataset:
+        upload = io.BytesIO(content)
+        upload.name = f'bench_{rows}.csv'
+        with measure(results, 'upload_csv', rows):
+            response = client.post('/api/upload/', {'file': upload})
+        if response.status_code != 201:
+            raise RuntimeError(f'Upload failed ({response.status_code}): {response.content[:200]!r}')
+        dataset_id = response.json()['dataset_id']
+    if 'dataset_detail' in scenarios:
+        with measure(results, 'dataset_detail', rows):
+            client.get(f'/api/datasets/{dataset_id}/')
+    if 'equipment_list' in scenarios:
+        with measure(results, 'equipment_list', rows):
+            client.get(f'/api/datasets/{dataset_id}/equipment/?page=1')
+    if 'generate_pdf' in scenarios:
+        with measure(results, 'generate_pdf', rows):
+            generate_pdf_report(dataset_id)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the equipment ingest/summary/report pipeline.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Row counts to benchmark')
+    parser.add_argument('--types', type=int, default=5, help='Number of distinct equipment types')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--output', '-o', help='Write JSON results to this path (default: stdout)')
+    args = parser.parse_args(argv)
+
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    media_dir = tempfile.TemporaryDirectory(prefix='bench-media-')
+    settings.MEDIA_ROOT = Path(media_dir.name)
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+    results = []
+    if 'import_time' in args.scenarios:
+        print('Measuring cold-start imports...', file=sys.stderr)
+        run_import_time(results)
+    try:
+        sized = [name for name in args.scenarios if name != 'import_time']
+        for rows in (args.sizes if sized else []):
+            print(f'Benchmarking {rows} rows...', file=sys.stderr)
+            run_size(rows, args.types, sized, results)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        media_dir.cleanup()
+
+    report = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'platform': platform.platform(),
+        'equipment_types': args.types,
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,8 @@
 """
 ASGI config for config project.
+
+Serves /api/events/ (Server-Sent Events) without tying up a thread per
+client. The event broker is in-process, so run a single worker.
 """
 import os
 
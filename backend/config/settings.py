@@ -28,7 +28,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.GZipMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -138,5 +140,61 @@ LOGGING = {
     },
 }
 
-# Max datasets before auto-deletion
+# Max datasets kept per user (anonymous uploads share one quota); the oldest are auto-deleted
 MAX_DATASETS = 5
+
+# Rows per INSERT batch when an upload is ingested
+INGEST_BATCH_SIZE = 2000
+
+# Additional numeric columns kept per upload (beyond the five required ones)
+MAX_EXTRA_COLUMNS = 50
+
+# Equipment history (Measurement rows) older than this many days is deleted after each upload
+# to the same namespace, along with equipment not seen since; 0 keeps history forever
+MEASUREMENT_RETENTION_DAYS = int(os.environ.get('MEASUREMENT_RETENTION_DAYS', '365'))
+
+# Most tracked equipment one /api/equipment/history/ request may ask for
+HISTORY_MAX_SERIES = 50
+
+# Anomaly detection at ingest; keys left out fall back to api.anomalies.DEFAULTS.
+# RANGE_LIMITS maps an equipment type ('*' for any other) to {column: (min, max)}, None for no limit.
+ANOMALY_DETECTION = {
+    'ENABLED': True,
+    'ZSCORE_THRESHOLD': 3.0,
+    'IQR_FACTOR': 1.5,
+    'REJECT_OUT_OF_RANGE': False,
+}
+
+# Rows fetched per database round-trip when streaming dataset exports
+EXPORT_CHUNK_SIZE = 2000
+
+# /api/metrics/ is served to staff users and to scrapers sending "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Requests slower than this are logged with their most expensive SQL statements
+SLOW_REQUEST_THRESHOLD_MS = int(os.environ.get('SLOW_REQUEST_THRESHOLD_MS', '1000'))
+SLOW_REQUEST_TOP_SQL = 5
+
+# Staff users may profile upload/detail/PDF requests with "X-Profile: 1"; output goes to MEDIA_ROOT/profiles
+REQUEST_PROFILING_ENABLED = os.environ.get('REQUEST_PROFILING_ENABLED', 'True').lower() == 'true'
+REQUEST_PROFILE_SUMMARY_LINES = 40
+
+# Upper bound on points per series returned by the chart-data endpoint
+CHART_MAX_RESOLUTION = 5000
+
+# Analytics and chart-data payloads are cached per dataset (per process with the local-memory backend)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+ANALYTICS_CACHE_SECONDS = 24 * 3600
+
+# Resumable chunked uploads (/api/uploads/); chunks must stay below DATA_UPLOAD_MAX_MEMORY_SIZE
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_MAX_BYTES = 512 * 1024 * 1024
+UPLOAD_SESSION_TTL_HOURS = 24
+
+# Server-Sent Events (/api/events/): keepalive comment interval and maximum stream lifetime
+EVENTS_HEARTBEAT_SECONDS = 15
+EVENTS_STREAM_MAX_SECONDS = 300
@@ -0,0 +1,132 @@
+"""
+Import-time and startup benchmark for the desktop client.
+
+Usage (from desktop-frontend/):
+    python -m benchmarks.startup --runs 5 --output startup.json
+
+Every run is a fresh interpreter. The import scenario parses
+`python -X importtime -c "import main"` and reports the total and the self
+time spent per top-level package (numpy, PySide6, matplotlib...). The
+startup scenario measures interpreter start to the main window being shown
+(offscreen); --api-base defaults to an unroutable address so a backend that
+is down cannot hide behind a fast local server.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+DESKTOP_DIR = Path(__file__).resolve().parent.parent
+# The -X importtime parser is shared with the backend benchmarks (backend/benchmarks/importtime.py)
+sys.path.insert(0, str(DESKTOP_DIR.parent / 'backend' / 'benchmarks'))
+from importtime import parse_importtime  # noqa: E402
+
+UNREACHABLE_API = 'http://10.255.255.1:9/api'
+TOP_IMPORTS = 15
+
+STARTUP_PROBE = '''
+import json, os, sys, time
+start = time.perf_counter()
+from PySide6.QtWidgets import QApplication
+app = QApplication(sys.argv)
+from services.api_client import ApiClient
+from ui.main_window import MainWindow
+imported = time.perf_counter()
+win = MainWindow(ApiClient())
+win.show()
+app.processEvents()
+shown = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'window_ms': (shown - imported) * 1000,
+    'in_process_ms': (shown - start) * 1000,
+    'matplotlib_loaded': 'matplotlib' in sys.modules,
+}))
+sys.stdout.flush()
+os._exit(0)  # skip teardown; the history request may still be waiting on the network
+'''
+
+
+def _env(api_base):
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen', API_BASE=api_base)
+    env.pop('PYTHONPROFILEIMPORTTIME', None)
+    return env
+
+
+def run_import(runs, api_base):
+    totals, per_package = [], {}
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import main'],
+            cwd=DESKTOP_DIR, env=_env(api_base), capture_output=True, text=True, check=True,
+        )
+        total, packages = parse_importtime(proc.stderr)
+        totals.append(total)
+        for name, ms in packages.items():
+            per_package.setdefault(name, []).append(ms)
+    top = sorted(((name, statistics.median(v)) for name, v in per_package.items()),
+                 key=lambda item: item[1], reverse=True)[:TOP_IMPORTS]
+    return {
+        'scenario': 'import',
+        'runs': runs,
+        'total_ms_median': round(statistics.median(totals), 1),
+        'total_ms_min': round(min(totals), 1),
+        'top_packages_ms': {name: round(ms, 1) for name, ms in top},
+    }
+
+
+def run_startup(runs, api_base):
+    samples = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, '-c', STARTUP_PROBE],
+            cwd=DESKTOP_DIR, env=_env(api_base), capture_output=True, text=True, check=True,
+        )
+        samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    result = {'scenario': 'startup', 'runs': runs, 'api_base': api_base}
+    for key in ('import_ms', 'window_ms', 'in_process_ms'):
+        values = [s[key] for s in samples]
+        result[f'{key}_median'] = round(statistics.median(values), 1)
+        result[f'{key}_min'] = round(min(values), 1)
+    result['matplotlib_loaded'] = any(s['matplotlib_loaded'] for s in samples)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark desktop client import time and startup.')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per scenario')
+    parser.add_argument('--api-base', default=UNREACHABLE_API,
+                        help='Backend URL used during startup (default: unreachable)')
+    parser.add_argument('--scenarios', nargs='+', choices=['import', 'startup'], default=['import', 'startup'])
+    parser.add_argument('--output', '-o', help='Write JSON results to this path (default: stdout)')
+    args = parser.parse_args(argv)
+
+    results = []
+    if 'import' in args.scenarios:
+        print('Measuring import time...', file=sys.stderr)
+        results.append(run_import(args.runs, args.api_base))
+    if 'startup' in args.scenarios:
+        print('Measuring startup...', file=sys.stderr)
+        results.append(run_startup(args.runs, args.api_base))
+
+    report = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,14 @@
 """
 Chemical Equipment Parameter Visualizer - Desktop Application
 """
+import asyncio
 import sys
 from PySide6.QtWidgets import QApplication
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QFont
 
 from services.api_client import ApiClient
+from services import async_api_client
 from ui.main_window import MainWindow
 
 QSS = """
@@ -27,9 +29,27 @@ def main():
     app.setFont(QFont('Segoe UI', 10))
 
     api = ApiClient()
-    win = MainWindow(api)
+    try:
+        import qasync
+    except ImportError:
+        qasync = None
+
+    if qasync is None or not async_api_client.available():
+        # Without qasync/httpx every request runs on its own QThread worker
+        win = MainWindow(api)
+        win.show()
+        sys.exit(app.exec())
+
+    loop = qasync.QEventLoop(app)
+    asyncio.set_event_loop(loop)
+    async_api = async_api_client.AsyncApiClient(api)
+    win = MainWindow(api, async_client=async_api)
     win.show()
-    sys.exit(app.exec())
+    closed = asyncio.Event()
+    app.aboutToQuit.connect(closed.set)
+    with loop:
+        loop.run_until_complete(closed.wait())
+        loop.run_until_complete(async_api.aclose())
 
 
 if __name__ == '__main__':
@@ -1,19 +1,156 @@
 """
 API client for Chemical Equipment backend.
 """
+import hashlib
+import io
+import json
 import os
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 API_BASE = os.environ.get('API_BASE', 'http://localhost:8000/api')
+CONNECT_TIMEOUT = float(os.environ.get('API_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.environ.get('API_READ_TIMEOUT', '60'))
+GET_RETRIES = int(os.environ.get('API_GET_RETRIES', '3'))
+POOL_SIZE = 10
+READ_CHUNK = 256 * 1024
+UPLOAD_RETRIES = int(os.environ.get('API_UPLOAD_RETRIES', '5'))
+# The event stream sends a keepalive every 15s; three missed ones mean the connection is dead
+EVENTS_READ_TIMEOUT = 45
+
+
+class RequestCancelled(Exception):
+    """Raised inside a worker when its CancelToken was cancelled."""
+
+
+class CancelToken:
+    """
+    Cooperative cancellation handle shared between the GUI and a worker.
+    cancel() also runs registered callbacks, e.g. closing an in-flight response.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def add_callback(self, callback):
+        with self._lock:
+            if not self.cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def check(self):
+        if self.cancelled:
+            raise RequestCancelled()
+
+
+class _ProgressReader(io.BytesIO):
+    """Request body that reports bytes as http.client reads them onto the socket."""
+
+    def __init__(self, data, on_read, cancel=None):
+        super().__init__(data)
+        self._on_read = on_read
+        self._cancel = cancel
+
+    def read(self, size=-1):
+        if self._cancel is not None:
+            self._cancel.check()
+        block = super().read(size)
+        if block:
+            self._on_read(self.tell())
+        return block
+
+
+def file_sha256(filepath, cancel=None, block_size=READ_CHUNK):
+    """Stream a file through SHA-256 (the server's duplicate/integrity hash)."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            if cancel is not None:
+                cancel.check()
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _error_message(r):
+    try:
+        return r.json().get('error') or r.text
+    except Exception:
+        return r.text or f'HTTP {r.status_code}'
+
+
+def _unit_params(units):
+    """{'Pressure': 'psi'} -> {'pressure_unit': 'psi'}, the server's upload parameters."""
+    return {f'{column.lower()}_unit': unit for column, unit in (units or {}).items()}
+
+
+def _accept_encoding():
+    # requests only decodes brotli when a brotli package is installed
+    try:
+        import brotli  # noqa: F401
+        return 'gzip, deflate, br'
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+            return 'gzip, deflate, br'
+        except ImportError:
+            return 'gzip, deflate'
+
+
+def build_session(retries=GET_RETRIES, pool_size=POOL_SIZE):
+    """
+    Shared keep-alive session: one connection pool per host, compressed
+    responses, and retries with exponential backoff for idempotent requests only.
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=0.5,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Accept-Encoding'] = _accept_encoding()
+    return session
 
 
 class ApiClient:
-    def __init__(self, base_url=None):
+    def __init__(self, base_url=None, timeout=None, session=None):
         self.base = base_url or API_BASE
         self.token = None
+        self.refresh_token = None
+        self.timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+        self.session = session or build_session()
+        self._refresh_lock = threading.Lock()
 
-    def set_token(self, token):
+    def set_token(self, token, refresh_token=None):
         self.token = token
+        if refresh_token is not None:
+            self.refresh_token = refresh_token
 
     def _headers(self):
         h = {'Content-Type': 'application/json'}
@@ -21,69 +158,228 @@ class ApiClient:
             h['Authorization'] = f'Bearer {self.token}'
         return h
 
+    def _refresh_access_token(self, stale_token):
+        """Swap the refresh token for a new access token; True if a retry makes sense."""
+        with self._refresh_lock:
+            if self.token != stale_token:
+                return True  # another thread already refreshed
+            if not self.refresh_token:
+                return False
+            r = self.session.post(
+                f'{self.base}/auth/token/refresh/',
+                json={'refresh': self.refresh_token},
+                timeout=self.timeout,
+            )
+            if r.status_code != 200:
+                return False
+            data = r.json()
+            self.set_token(data.get('access'), data.get('refresh'))
+            return True
+
+    def _request(self, method, path, headers=None, cancel=None, **kwargs):
+        """
+        Send a request with the client's timeouts and auth. A 401 triggers one
+        transparent token refresh and retry. With a CancelToken the body is
+        streamed and the connection is closed as soon as the token is cancelled.
+        """
+        if cancel is not None:
+            cancel.check()
+            kwargs['stream'] = True
+        r = self._send(method, path, headers, **kwargs)
+        if cancel is not None:
+            cancel.add_callback(r.close)
+            r._content = self._read_body(r, cancel)
+        return r
+
+    def _read_body(self, r, cancel):
+        chunks = []
+        try:
+            for chunk in r.iter_content(READ_CHUNK):
+                cancel.check()
+                chunks.append(chunk)
+        except RequestCancelled:
+            raise
+        except Exception:
+            if cancel.cancelled:
+                raise RequestCancelled()
+            raise
+        cancel.check()
+        return b''.join(chunks)
+
+    def _send(self, method, path, headers=None, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        used_token = self.token
+        h = self._headers() if headers is None else headers
+        r = self.session.request(method, f'{self.base}{path}', headers=h, **kwargs)
+        if r.status_code == 401 and used_token and self._refresh_access_token(used_token):
+            r.close()
+            h = dict(h)
+            h['Authorization'] = f'Bearer {self.token}'
+            if 'files' in kwargs:
+                for f in kwargs['files'].values():
+                    f[1].seek(0)
+            if hasattr(kwargs.get('data'), 'seek'):
+                kwargs['data'].seek(0)
+            r = self.session.request(method, f'{self.base}{path}', headers=h, **kwargs)
+        return r
+
     def login(self, username, password):
-        r = requests.post(
-            f'{self.base}/auth/login/',
-            json={'username': username, 'password': password},
-        )
+        r = self._request('POST', '/auth/login/', headers={},
+                          json={'username': username, 'password': password})
         r.raise_for_status()
         data = r.json()
-        self.set_token(data.get('access'))
+        self.set_token(data.get('access'), data.get('refresh'))
         return data
 
     def register(self, username, password, email=''):
-        r = requests.post(
-            f'{self.base}/auth/register/',
-            json={'username': username, 'password': password, 'email': email},
-        )
+        r = self._request('POST', '/auth/register/', headers={},
+                          json={'username': username, 'password': password, 'email': email})
         r.raise_for_status()
         data = r.json()
-        self.set_token(data.get('access'))
+        self.set_token(data.get('access'), data.get('refresh'))
         return data
 
-    def upload_csv(self, filepath):
+    def upload_csv(self, filepath, units=None):
+        """units: {'Pressure': 'psi', ...} for columns whose header has no unit suffix."""
         with open(filepath, 'rb') as f:
-            r = requests.post(
-                f'{self.base}/upload/',
-                files={'file': (os.path.basename(filepath), f, 'text/csv')},
+            r = self._request(
+                'POST', '/upload/',
                 headers={'Authorization': f'Bearer {self.token}'} if self.token else {},
+                files={'file': (os.path.basename(filepath), f, 'text/csv')},
+                data=_unit_params(units),
             )
         r.raise_for_status()
         return r.json()
 
-    def get_datasets(self):
-        r = requests.get(f'{self.base}/datasets/', headers=self._headers())
+    def upload_csv_chunked(self, filepath, progress=None, cancel=None, file_hash=None, units=None):
+        """
+        Upload through the resumable chunk protocol. progress(sent, total) is
+        called as bytes are written to the connection. A dropped connection
+        resumes from the server's last acknowledged offset, as does a later
+        call for the same file after the app was closed. units as for upload_csv.
+        """
+        total = os.path.getsize(filepath)
+        report = progress or (lambda sent, total: None)
+        file_hash = file_hash or file_sha256(filepath, cancel)
+        r = self._request('POST', '/uploads/', json={
+            'filename': os.path.basename(filepath), 'size': total, 'sha256': file_hash,
+        })
+        if r.status_code not in (200, 201):
+            raise RuntimeError(_error_message(r))
+        session = r.json()
+        upload_id, chunk_size, offset = session['upload_id'], session['chunk_size'], session['offset']
+        report(offset, total)
+
+        headers = dict(self._headers(), **{'Content-Type': 'application/octet-stream'})
+        failures = 0
+        with open(filepath, 'rb') as f:
+            while offset < total:
+                if cancel is not None:
+                    cancel.check()
+                f.seek(offset)
+                start = offset
+                body = _ProgressReader(f.read(chunk_size), lambda n: report(start + n, total), cancel)
+                try:
+                    r = self._request('PUT', f'/uploads/{upload_id}/chunk/', headers=headers,
+                                      params={'offset': offset}, data=body)
+                except (requests.ConnectionError, requests.Timeout):
+                    failures += 1
+                    if failures > UPLOAD_RETRIES:
+                        raise
+                    time.sleep(min(0.5 * 2 ** failures, 10))
+                    try:
+                        offset = self.get_upload_offset(upload_id)
+                    except (requests.ConnectionError, requests.Timeout):
+                        pass  # keep the last acknowledged offset and try again
+                    report(offset, total)
+                    continue
+                if r.status_code == 409:
+                    offset = r.json()['offset']  # server and client disagree; trust the server
+                elif r.status_code == 200:
+                    offset = r.json()['offset']
+                    failures = 0
+                else:
+                    raise RuntimeError(_error_message(r))
+                report(offset, total)
+
+        r = self._request('POST', f'/uploads/{upload_id}/complete/', json=_unit_params(units))
+        if r.status_code != 201:
+            raise RuntimeError(_error_message(r))
+        return r.json()
+
+    def open_event_stream(self, last_event_id=None):
+        """Open /events/ as a streamed response; see services.event_stream.EventStream."""
+        headers = self._headers()
+        headers['Accept'] = 'text/event-stream'
+        if last_event_id is not None:
+            headers['Last-Event-ID'] = str(last_event_id)
+        return self._send('GET', '/events/', headers, stream=True, timeout=(CONNECT_TIMEOUT, EVENTS_READ_TIMEOUT))
+
+    def get_upload_offset(self, upload_id):
+        r = self._request('GET', f'/uploads/{upload_id}/')
+        r.raise_for_status()
+        return r.json()['offset']
+
+    def get_datasets(self, cancel=None):
+        r = self._request('GET', '/datasets/', cancel=cancel)
         r.raise_for_status()
         return r.json()
 
+    def find_dataset_by_hash(self, file_hash):
+        """The already-uploaded dataset with this SHA-256, or None."""
+        r = self._request('GET', '/datasets/', params={'file_hash': file_hash})
+        r.raise_for_status()
+        matches = r.json()
+        return matches[0] if matches else None
+
     def get_dataset(self, dataset_id):
-        r = requests.get(f'{self.base}/datasets/{dataset_id}/', headers=self._headers())
+        r = self._request('GET', f'/datasets/{dataset_id}/')
         r.raise_for_status()
         return r.json()
 
+    def get_dataset_conditional(self, dataset_id, etag=None, cancel=None):
+        """
+        Fetch a dataset, revalidating a cached copy with If-None-Match.
+        Returns (data, etag); data is None when the server answers 304 Not Modified.
+        """
+        headers = self._headers()
+        if etag:
+            headers['If-None-Match'] = etag
+        r = self._request('GET', f'/datasets/{dataset_id}/', headers=headers, cancel=cancel)
+        if r.status_code == 304:
+            return None, etag
+        r.raise_for_status()
+        return json.loads(r.content), r.headers.get('ETag')
+
     def get_summary(self, dataset_id):
-        r = requests.get(f'{self.base}/datasets/{dataset_id}/summary/', headers=self._headers())
+        r = self._request('GET', f'/datasets/{dataset_id}/summary/')
         r.raise_for_status()
         return r.json()
 
-    def get_equipment(self, dataset_id, page=1):
-        r = requests.get(
-            f'{self.base}/datasets/{dataset_id}/equipment/?page={page}',
-            headers=self._headers(),
+    def get_chart_data(self, dataset_id, resolution=500, bins=20, cancel=None):
+        r = self._request(
+            'GET', f'/datasets/{dataset_id}/chart-data/',
+            params={'resolution': resolution, 'bins': bins}, cancel=cancel,
         )
         r.raise_for_status()
         return r.json()
 
-    def generate_pdf(self, dataset_id):
-        r = requests.post(
-            f'{self.base}/datasets/{dataset_id}/generate-pdf/',
-            headers=self._headers(),
-            stream=True,
-        )
+    def get_analytics(self, dataset_id, bins=20, cancel=None):
+        """Correlation matrices, histograms, quantiles and box-plot statistics."""
+        r = self._request('GET', f'/datasets/{dataset_id}/analytics/', params={'bins': bins}, cancel=cancel)
+        r.raise_for_status()
+        return r.json()
+
+    def get_equipment(self, dataset_id, page=1):
+        r = self._request('GET', f'/datasets/{dataset_id}/equipment/', params={'page': page})
+        r.raise_for_status()
+        return r.json()
+
+    def generate_pdf(self, dataset_id, cancel=None):
+        if cancel is None:
+            r = self._request('POST', f'/datasets/{dataset_id}/generate-pdf/', stream=True)
+        else:
+            r = self._request('POST', f'/datasets/{dataset_id}/generate-pdf/', cancel=cancel)
         if r.status_code != 200:
-            try:
-                err = r.json().get('error', r.text)
-            except Exception:
-                err = r.text or f'HTTP {r.status_code}'
-            raise RuntimeError(err)
+            raise RuntimeError(_error_message(r))
         return r.content
@@ -0,0 +1,122 @@
+"""
+Asyncio API client used alongside ApiClient when httpx is installed.
+
+It shares the synchronous client's base URL and tokens, and is meant to run
+on the Qt event loop via qasync: independent requests are issued
+concurrently instead of one blocking call per QThread.
+"""
+import asyncio
+import json
+
+try:
+    import httpx
+except ImportError:  # optional dependency; the app falls back to QThread workers
+    httpx = None
+
+# Concurrent connections used for background prefetching
+PREFETCH_CONCURRENCY = 2
+
+
+def available():
+    return httpx is not None
+
+
+class AsyncApiClient:
+    def __init__(self, api_client):
+        if httpx is None:
+            raise RuntimeError('httpx is required for AsyncApiClient')
+        self.api_client = api_client
+        connect, read = api_client.timeout
+        self._client = httpx.AsyncClient(
+            base_url=api_client.base,
+            timeout=httpx.Timeout(read, connect=connect),
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            headers={'Accept-Encoding': 'gzip, deflate'},
+        )
+        self._prefetch_slots = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+
+    def _headers(self):
+        return {'Authorization': f'Bearer {self.api_client.token}'} if self.api_client.token else {}
+
+    async def _get(self, path, **kwargs):
+        r = await self._client.get(path, headers=self._headers(), **kwargs)
+        if r.status_code == 401 and self.api_client.token:
+            # Token refresh is shared with (and serialised by) the synchronous client
+            refreshed = await asyncio.to_thread(self.api_client._refresh_access_token, self.api_client.token)
+            if refreshed:
+                r = await self._client.get(path, headers=self._headers(), **kwargs)
+        r.raise_for_status()
+        return r
+
+    async def _get_json(self, path, **kwargs):
+        r = await self._get(path, **kwargs)
+        # Large payloads are decoded off the event loop so the GUI stays responsive
+        if len(r.content) > 256 * 1024:
+            return await asyncio.to_thread(json.loads, r.content)
+        return r.json()
+
+    async def get_summary(self, dataset_id):
+        return await self._get_json(f'/datasets/{dataset_id}/summary/')
+
+    async def get_chart_data(self, dataset_id, resolution=500, bins=20):
+        return await self._get_json(f'/datasets/{dataset_id}/chart-data/',
+                                    params={'resolution': resolution, 'bins': bins})
+
+    async def get_equipment(self, dataset_id, page=1):
+        return await self._get_json(f'/datasets/{dataset_id}/equipment/', params={'page': page})
+
+    async def get_analytics(self, dataset_id, bins=20):
+        return await self._get_json(f'/datasets/{dataset_id}/analytics/', params={'bins': bins})
+
+    async def get_dataset(self, dataset_id):
+        return await self._get_json(f'/datasets/{dataset_id}/')
+
+    async def fetch_overview(self, dataset_id, pages=2):
+        """
+        Fetch summary, chart data (type distribution + series) and the first
+        equipment pages concurrently. Missing pages past the end are ignored.
+        """
+        summary, chart_data, *page_results = await asyncio.gather(
+            self.get_summary(dataset_id),
+            self.get_chart_data(dataset_id),
+            *(self.get_equipment(dataset_id, page) for page in range(1, pages + 1)),
+            return_exceptions=True,
+        )
+        for result in (summary, chart_data):
+            if isinstance(result, BaseException):
+                raise result
+        equipment = []
+        for result in page_results:
+            if isinstance(result, BaseException):
+                break
+            equipment.extend(result.get('results', []))
+        return {'summary': summary, 'chart_data': chart_data, 'equipment': equipment}
+
+    async def prefetch(self, datasets, cache):
+        """
+        Download dataset payloads into the on-disk cache in the background,
+        skipping any already cached under their file_hash.
+        """
+        async def _one(meta):
+            dataset_id, file_hash = meta.get('id'), meta.get('file_hash')
+            cached, _ = await asyncio.to_thread(cache.get, dataset_id, file_hash)
+            if cached is not None:
+                return
+            async with self._prefetch_slots:
+                r = await self._get(f'/datasets/{dataset_id}/')
+                data = await asyncio.to_thread(json.loads, r.content)
+                # Same entries as main_window.fetch_dataset stores, so cached copies render every chart
+                try:
+                    data['chart_data'] = await self.get_chart_data(dataset_id)
+                except httpx.HTTPError:
+                    data['chart_data'] = None
+                try:
+                    data['analytics'] = await self.get_analytics(dataset_id)
+                except httpx.HTTPError:
+                    data['analytics'] = None
+                await asyncio.to_thread(cache.put, dataset_id, data, r.headers.get('ETag'))
+
+        await asyncio.gather(*(_one(m) for m in datasets), return_exceptions=True)
+
+    async def aclose(self):
+        await self._client.aclose()
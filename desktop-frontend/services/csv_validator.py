@@ -0,0 +1,108 @@
+"""
+Local pre-upload validation for CSV files.
+
+The file is streamed once: every line feeds the SHA-256 the server uses for
+duplicate detection and a csv.reader that applies the server's column and
+numeric rules (services.csv_schema), accumulating the same summary stats
+the server would compute. Nothing is held in memory beyond the running totals.
+Stats are reported in canonical units, as the server stores them; the
+conversion is linear, so it is applied to the totals rather than per row.
+"""
+import csv
+import hashlib
+import os
+
+from .csv_schema import UNITS, NUMERIC_COLUMNS, non_numeric_error, parse_numeric, resolve_columns, resolve_units
+
+# Rows between progress callbacks / cancellation checks
+PROGRESS_EVERY = 20000
+
+
+def _lines(f, digest, on_bytes):
+    read = 0
+    for raw in f:
+        digest.update(raw)
+        read += len(raw)
+        on_bytes(read)
+        yield raw.decode('utf-8')
+
+
+def validate_csv(filepath, progress=None, cancel=None, units=None):
+    """
+    Validate a CSV and summarise it. Returns a dict with 'sha256', 'size',
+    'summary' (total_count, avg/min/max per metric), 'type_distribution' and
+    'units' (the file's unit per numeric column; `units` as for ApiClient.upload_csv).
+    Raises ValueError with the message the server would return.
+    progress(bytes_read, total_bytes) is called every PROGRESS_EVERY rows.
+    """
+    size = os.path.getsize(filepath)
+    digest = hashlib.sha256()
+    position = [0]
+    with open(filepath, 'rb') as f:
+        try:
+            reader = csv.reader(_lines(f, digest, lambda n: position.__setitem__(0, n)))
+            header = next(reader, None)
+            if header is None:
+                raise ValueError('Invalid CSV format: No columns to parse from file')
+            rename = resolve_columns(header)
+            source_units = resolve_units(header, units)
+            stripped = [h.strip() for h in header]
+            index = {rename[h]: stripped.index(h) for h in rename}
+
+            totals = {col: 0.0 for col in NUMERIC_COLUMNS}
+            minima = {col: None for col in NUMERIC_COLUMNS}
+            maxima = {col: None for col in NUMERIC_COLUMNS}
+            types = {}
+            count = 0
+            for row in reader:
+                if not row:
+                    continue  # pandas skips blank lines
+                if len(row) > len(header):
+                    raise ValueError(
+                        f'Invalid CSV format: Error tokenizing data. C error: Expected {len(header)} fields '
+                        f'in line {reader.line_num}, saw {len(row)}'
+                    )
+                for col in NUMERIC_COLUMNS:
+                    i = index[col]
+                    try:
+                        value = parse_numeric(row[i] if i < len(row) else '')
+                    except ValueError:
+                        raise ValueError(f'{non_numeric_error(col)} (line {reader.line_num})')
+                    totals[col] += value
+                    if minima[col] is None or value < minima[col]:
+                        minima[col] = value
+                    if maxima[col] is None or value > maxima[col]:
+                        maxima[col] = value
+                i = index['Type']
+                eq_type = row[i] if i < len(row) else ''
+                types[eq_type] = types.get(eq_type, 0) + 1
+                count += 1
+                if count % PROGRESS_EVERY == 0:
+                    if cancel is not None:
+                        cancel.check()
+                    if progress:
+                        progress(position[0], size)
+        except UnicodeDecodeError as e:
+            raise ValueError(f'Invalid CSV format: {e}')
+        except csv.Error as e:
+            raise ValueError(f'Invalid CSV format: {e}')
+        # Anything after the last parsed row (e.g. trailing newlines) still belongs to the hash
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+
+    summary = {'total_count': count}
+    for col in NUMERIC_COLUMNS:
+        key = col.lower()
+        factor, offset = UNITS[col][source_units[col]]
+        summary[f'avg_{key}'] = totals[col] / count * factor + offset if count else 0
+        summary[f'min_{key}'] = minima[col] * factor + offset if minima[col] is not None else None
+        summary[f'max_{key}'] = maxima[col] * factor + offset if maxima[col] is not None else None
+    if progress:
+        progress(size, size)
+    return {
+        'sha256': digest.hexdigest(),
+        'size': size,
+        'summary': summary,
+        'type_distribution': dict(sorted(types.items())),
+        'units': source_units,
+    }
@@ -0,0 +1,136 @@
+"""
+Persistent on-disk cache of dataset payloads for the desktop client.
+
+Datasets never change after upload, so an entry keyed by dataset id and
+file_hash stays valid forever; the server's ETag is kept for revalidation
+when the expected hash is unknown. Entries are zlib-compressed JSON with a
+small metadata sidecar, evicted least-recently-used once the cache exceeds
+its size limit.
+"""
+import json
+import os
+import sys
+import tempfile
+import zlib
+from pathlib import Path
+
+APP_NAME = 'chemical-equipment-visualizer'
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+META_FIELDS = ['id', 'filename', 'upload_timestamp', 'total_equipment_count',
+               'avg_flowrate', 'avg_pressure', 'avg_temperature', 'file_hash']
+
+
+def default_cache_dir():
+    """Platform user cache dir (override with CHEMVIZ_CACHE_DIR)."""
+    override = os.environ.get('CHEMVIZ_CACHE_DIR')
+    if override:
+        return Path(override)
+    if sys.platform == 'win32':
+        base = Path(os.environ.get('LOCALAPPDATA', Path.home() / 'AppData' / 'Local'))
+    elif sys.platform == 'darwin':
+        base = Path.home() / 'Library' / 'Caches'
+    else:
+        base = Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache'))
+    return base / APP_NAME / 'datasets'
+
+
+class DatasetCache:
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = Path(directory) if directory else default_cache_dir()
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.environ.get('CHEMVIZ_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+        )
+
+    def _stem(self, dataset_id, file_hash):
+        return f'{int(dataset_id)}-{file_hash[:32]}'
+
+    def _find(self, dataset_id, file_hash=None):
+        if not self.directory.is_dir():
+            return None
+        if file_hash:
+            path = self.directory / f'{self._stem(dataset_id, file_hash)}.json.z'
+            return path if path.exists() else None
+        matches = sorted(self.directory.glob(f'{int(dataset_id)}-*.json.z'),
+                         key=lambda p: p.stat().st_mtime, reverse=True)
+        return matches[0] if matches else None
+
+    def contains(self, dataset_id, file_hash):
+        """Whether an entry for exactly this dataset and file_hash exists (nothing is read)."""
+        return bool(file_hash) and self._find(dataset_id, file_hash) is not None
+
+    def get(self, dataset_id, file_hash=None):
+        """
+        Return (payload, etag) for a cached dataset, or (None, None).
+        With file_hash the entry must match it exactly.
+        """
+        path = self._find(dataset_id, file_hash)
+        if path is None:
+            return None, None
+        try:
+            payload = json.loads(zlib.decompress(path.read_bytes()))
+        except (OSError, ValueError, zlib.error):
+            self._remove(path)
+            return None, None
+        if file_hash and payload.get('file_hash') != file_hash:
+            return None, None
+        os.utime(path)  # mark as recently used for LRU eviction
+        return payload, payload.pop('_etag', None)
+
+    def put(self, dataset_id, payload, etag=None):
+        """Store a dataset payload (must include file_hash); non-JSON extras are dropped."""
+        file_hash = payload.get('file_hash')
+        if not file_hash:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        record = {k: v for k, v in payload.items() if k != 'prepared'}
+        record['_etag'] = etag
+        stem = self._stem(dataset_id, file_hash)
+        self._write_atomic(self.directory / f'{stem}.json.z',
+                           zlib.compress(json.dumps(record, separators=(',', ':')).encode('utf-8'), 6))
+        meta = {k: payload.get(k) for k in META_FIELDS}
+        self._write_atomic(self.directory / f'{stem}.meta.json', json.dumps(meta).encode('utf-8'))
+        self.evict()
+
+    def entries(self):
+        """Metadata of cached datasets, newest upload first (for offline history)."""
+        if not self.directory.is_dir():
+            return []
+        entries = []
+        for meta_path in self.directory.glob('*.meta.json'):
+            try:
+                entries.append(json.loads(meta_path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return sorted(entries, key=lambda m: m.get('upload_timestamp') or '', reverse=True)
+
+    def evict(self):
+        """Delete least-recently-used entries until the cache fits in max_bytes."""
+        if not self.directory.is_dir():
+            return
+        files = [(p, p.stat()) for p in self.directory.glob('*.json.z')]
+        total = sum(st.st_size for _, st in files)
+        for path, st in sorted(files, key=lambda item: item[1].st_mtime):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= st.st_size
+
+    def _remove(self, path):
+        for p in (path, path.with_name(path.name.replace('.json.z', '.meta.json'))):
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _write_atomic(self, path, data):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
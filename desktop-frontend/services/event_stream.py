@@ -0,0 +1,125 @@
+"""
+Client for the backend's Server-Sent Events endpoint (/api/events/).
+"""
+import json
+import socket
+import threading
+
+from .api_client import RequestCancelled, CancelToken, READ_CHUNK
+
+RESYNC = 'resync'
+# Pseudo-event yielded whenever a connection is (re)established
+OPEN = 'open'
+MAX_BACKOFF = 30.0
+
+
+def _iter_chunks(response):
+    """Yield bytes as soon as they arrive; iter_content() waits for a full block."""
+    read1 = getattr(response.raw, 'read1', None)
+    if read1 is None:  # urllib3 < 2
+        yield from response.iter_content(chunk_size=1)
+        return
+    while True:
+        block = read1(READ_CHUNK, decode_content=True)
+        if not block:
+            return
+        yield block
+
+
+def _socket_of(response):
+    sock = getattr(getattr(response.raw, 'connection', None), 'sock', None)
+    if sock is None:
+        # "Connection: close" responses detach the socket from the connection; reach it via the reader
+        fp = getattr(getattr(response.raw, '_fp', None), 'fp', None)
+        sock = getattr(getattr(fp, 'raw', None), '_sock', None)
+    return sock
+
+
+class EventStream:
+    """
+    Iterate server events as (event_type, data) pairs, reconnecting with
+    Last-Event-ID and exponential backoff until the CancelToken is cancelled.
+    A 'resync' event means the server could not replay what was missed and
+    local state should be reloaded; the server's initial 'hello' event gives
+    the stream an id to resume from even when nothing else is published.
+    """
+
+    def __init__(self, api_client, cancel=None, last_event_id=None):
+        self.api_client = api_client
+        self.cancel = cancel or CancelToken()
+        self.last_event_id = last_event_id
+        self.retry = 3.0
+        self._response = None
+        self._wake = threading.Event()
+        self.cancel.add_callback(self.reconnect)
+
+    def reconnect(self):
+        """Drop the connection and reconnect now, e.g. after a login changed the user's namespace."""
+        self._wake.set()
+        response = self._response
+        if response is not None:
+            # close() alone does not wake a thread blocked in recv(); shut the socket down first
+            sock = _socket_of(response)
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            response.close()
+
+    def __iter__(self):
+        backoff = self.retry
+        while True:
+            self.cancel.check()
+            try:
+                self._response = self.api_client.open_event_stream(self.last_event_id)
+                if self.cancel.cancelled:
+                    self._response.close()
+                    raise RequestCancelled()
+                self._response.raise_for_status()
+                backoff = self.retry
+                yield OPEN, {}
+                yield from self._read(self._response)
+                backoff = self.retry
+            except RequestCancelled:
+                raise
+            except Exception:
+                if self.cancel.cancelled:
+                    raise RequestCancelled()
+                backoff = min(backoff * 2, MAX_BACKOFF)
+            finally:
+                if self._response is not None:
+                    self._response.close()
+                    self._response = None
+            # The server ends streams periodically; wait `retry` (longer after failures) and reconnect
+            if self._wake.wait(backoff):
+                self.cancel.check()
+                self._wake.clear()
+
+    def _read(self, response):
+        buffer = b''
+        event_type, data, event_id = 'message', [], None
+        for chunk in _iter_chunks(response):
+            buffer += chunk
+            *lines, buffer = buffer.split(b'\n')
+            for raw in lines:
+                line = raw.rstrip(b'\r').decode('utf-8')
+                if not line:
+                    if data:
+                        if event_id is not None:
+                            self.last_event_id = event_id
+                        yield event_type, json.loads('\n'.join(data))
+                    event_type, data, event_id = 'message', [], None
+                    continue
+                if line.startswith(':'):
+                    continue  # keepalive comment
+                field, _, value = line.partition(':')
+                value = value[1:] if value.startswith(' ') else value
+                if field == 'event':
+                    event_type = value
+                elif field == 'data':
+                    data.append(value)
+                elif field == 'id':
+                    event_id = int(value) if value.isdigit() else None
+                elif field == 'retry' and value.isdigit():
+                    self.retry = int(value) / 1000
@@ -0,0 +1,36 @@
+import os
+import unittest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PySide6.QtWidgets import QApplication
+
+from ui.chart_canvas import SeriesCanvas
+
+
+class SeriesCanvasTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def test_new_dataset_after_zoom_is_shown_in_full(self):
+        canvas = SeriesCanvas()
+        canvas.resize(600, 400)
+        values = [float(i) for i in range(100)]
+        canvas.set_full_series(values, [str(i) for i in range(100)])
+        canvas.plot_line([str(i) for i in range(100)], values)
+        canvas._show_range((10, 20))
+        # The next dataset reuses the line artist; the view must cover it again
+        values = [1000.0 + i for i in range(300)]
+        canvas.set_full_series(values, [str(i) for i in range(300)])
+        canvas.plot_line([str(i) for i in range(300)], values)
+        lo, hi = canvas.ax.get_xlim()
+        self.assertLessEqual(lo, 0)
+        self.assertGreaterEqual(hi, 299)
+        lo, hi = canvas.ax.get_ylim()
+        self.assertLessEqual(lo, 1000)
+        self.assertGreaterEqual(hi, 1299)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import unittest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QApplication
+
+from ui.data_table_widget import DataTableWidget
+
+
+def rows(flowrates):
+    return [
+        {'equipment_name': f'P{i}', 'equipment_type': 'Pump', 'flowrate': f, 'pressure': 1.0, 'temperature': 2.0}
+        for i, f in enumerate(flowrates)
+    ]
+
+
+class DataTableWidgetTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def _flowrates(self, widget):
+        model = widget.model
+        return [model.data(model.index(row, 2)) for row in range(model.rowCount())]
+
+    def test_new_data_keeps_the_header_sort(self):
+        widget = DataTableWidget()
+        widget.set_data(rows([3.0, 1.0, 2.0]))
+        widget.table.sortByColumn(2, Qt.DescendingOrder)
+        self.assertEqual(self._flowrates(widget), ['3.00', '2.00', '1.00'])
+        widget.set_data(rows([5.0, 9.0, 7.0, 8.0]))
+        header = widget.table.horizontalHeader()
+        self.assertEqual((header.sortIndicatorSection(), header.sortIndicatorOrder()), (2, Qt.DescendingOrder))
+        self.assertEqual(self._flowrates(widget), ['9.00', '8.00', '7.00', '5.00'])
+
+
+if __name__ == '__main__':
+    unittest.main()
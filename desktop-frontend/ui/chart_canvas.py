@@ -0,0 +1,260 @@
+"""
+Matplotlib canvases for the charts panel.
+
+Importing this module loads matplotlib and its QtAgg backend, so ChartWidget
+only imports it when the Charts tab is first shown.
+"""
+import matplotlib
+matplotlib.use('qtagg')
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+import numpy as np
+
+from .chart_prep import minmax_decimate
+
+MAX_TICK_LABELS = 20
+MAX_MARKERS = 200
+PIE_COLORS = ['#2563eb', '#22c55e', '#eab308', '#ef4444', '#a855f7', '#ec4899']
+
+
+class ChartCanvas(FigureCanvasQTAgg):
+    """
+    Matplotlib canvas that keeps its axes and artists between datasets.
+    Re-plotting identical data is a no-op; new data updates existing artists
+    where the shape allows it instead of clearing the figure.
+    """
+
+    def __init__(self, parent=None):
+        self.fig = Figure(figsize=(6, 4), dpi=100)
+        super().__init__(self.fig)
+        self.ax = None
+        self._artists = None
+        self._data_key = None
+
+    def _unchanged(self, kind, *data):
+        key = (kind, hash(tuple(tuple(d) for d in data)))
+        if key == self._data_key:
+            return True
+        self._data_key = key
+        return False
+
+    def _reset_axes(self):
+        self.fig.clear()
+        self.ax = self.fig.add_subplot(111)
+        self._artists = None
+        return self.ax
+
+    def clear_chart(self):
+        """Blank the canvas, e.g. when the next dataset has nothing to show in this chart."""
+        if self._data_key is None and self.ax is None:
+            return
+        self.fig.clear()
+        self.ax = None
+        self._artists = None
+        self._data_key = None
+        self.draw_idle()
+
+    def plot_bar(self, labels, values):
+        if self._unchanged('bar', labels, values):
+            return
+        bars = self._artists if self._artists and self._artists[0] == 'bar' else None
+        if bars and len(bars[1]) == len(values):
+            ax = self.ax
+            for rect, value in zip(bars[1], values):
+                rect.set_height(value)
+            ax.set_xticks(range(len(labels)))
+            ax.set_xticklabels(labels)
+            ax.set_autoscale_on(True)  # a zoom on the previous data turned it off
+            ax.relim()
+            ax.autoscale_view()
+        else:
+            ax = self._reset_axes()
+            container = ax.bar(range(len(labels)), values, color='#2563eb', alpha=0.8)
+            ax.set_xticks(range(len(labels)))
+            ax.set_xticklabels(labels)
+            ax.set_xlabel('Equipment Type')
+            ax.set_ylabel('Count')
+            ax.set_title('Equipment Type Distribution')
+            self._artists = ('bar', list(container.patches))
+        for label in ax.xaxis.get_majorticklabels():
+            label.set_rotation(45)
+            label.set_horizontalalignment('right')
+        self.draw_idle()
+
+    def plot_line(self, labels, values, x=None):
+        x = list(range(len(values))) if x is None else list(x)
+        if self._unchanged('line', labels, values, x):
+            return
+        style = 'o-' if len(values) <= MAX_MARKERS else '-'
+        if self._artists and self._artists[0] == 'line':
+            ax = self.ax
+            line = self._artists[1]
+            line.set_data(x, values)
+            line.set_marker('o' if style == 'o-' else 'None')
+            line.set_linewidth(2 if style == 'o-' else 1)
+            ax.set_autoscale_on(True)  # a zoom on the previous data turned it off
+            ax.relim()
+            ax.autoscale_view()
+        else:
+            ax = self._reset_axes()
+            line, = ax.plot(x, values, style, color='#22c55e', linewidth=2 if style == 'o-' else 1)
+            ax.set_xlabel('Equipment')
+            ax.set_ylabel('Flowrate')
+            ax.set_title('Flowrate Trends')
+            self._artists = ('line', line)
+        # Label at most MAX_TICK_LABELS evenly spaced points so large series stay readable
+        step = max(1, len(labels) // MAX_TICK_LABELS)
+        ax.set_xticks(x[::step])
+        ax.set_xticklabels(labels[::step], rotation=45, ha='right')
+        self.draw_idle()
+
+    def plot_pie(self, labels, values):
+        if self._unchanged('pie', labels, values):
+            return
+        # Wedge geometry depends on every value, so a pie is rebuilt (it has only a handful of artists)
+        ax = self._reset_axes()
+        ax.pie(values, labels=labels, autopct='%1.1f%%', colors=PIE_COLORS[:len(labels)], startangle=90)
+        ax.set_title('Type Percentages')
+        self._artists = ('pie', None)
+        self.draw_idle()
+
+    def plot_heatmap(self, labels, matrix):
+        """Correlation matrix with values in [-1, 1]; None (undefined) cells are left blank."""
+        values = np.array([[np.nan if v is None else v for v in row] for row in matrix], dtype=np.float64)
+        if self._unchanged('heatmap', labels, values.ravel()):
+            return
+        ax = self._reset_axes()
+        image = ax.imshow(values, cmap='coolwarm', vmin=-1, vmax=1)
+        ax.set_xticks(range(len(labels)))
+        ax.set_xticklabels(labels)
+        ax.set_yticks(range(len(labels)))
+        ax.set_yticklabels(labels)
+        for (i, j), v in np.ndenumerate(values):
+            if np.isfinite(v):
+                ax.text(j, i, f'{v:.2f}', ha='center', va='center', color='white' if abs(v) > 0.5 else 'black')
+        self.fig.colorbar(image, ax=ax)
+        ax.set_title('Correlation (Pearson)')
+        self._artists = ('heatmap', image)
+        self.draw_idle()
+
+    def plot_box(self, labels, boxes):
+        """One box plot panel per metric from precomputed statistics (matplotlib bxp() dicts)."""
+        key = [(b['label'], b['q1'], b['med'], b['q3'], b['whislo'], b['whishi']) for panel in boxes for b in panel]
+        if self._unchanged('box', labels, key):
+            return
+        self.fig.clear()
+        axes = self.fig.subplots(1, len(boxes), squeeze=False)[0]
+        for ax, label, stats in zip(axes, labels, boxes):
+            stats = [dict(s, fliers=[]) for s in stats if s['med'] is not None]
+            ax.bxp(stats, showfliers=False)
+            ax.set_title(label)
+            for tick in ax.xaxis.get_majorticklabels():
+                tick.set_rotation(45)
+                tick.set_horizontalalignment('right')
+        self.ax = axes[0]
+        self._artists = ('box', None)
+        self.fig.tight_layout()
+        self.draw_idle()
+
+
+class SeriesCanvas(ChartCanvas):
+    """
+    Line canvas with interactive zoom (left-drag), pan (right-drag) and reset
+    (double-click). While dragging, only the band or the shifted line is
+    blitted over a cached background; the full redraw happens on release,
+    when the visible range is re-decimated from the full-resolution series.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._full = None
+        self._drag = None
+        self.mpl_connect('button_press_event', self._on_press)
+        self.mpl_connect('motion_notify_event', self._on_motion)
+        self.mpl_connect('button_release_event', self._on_release)
+
+    def set_full_series(self, y, names):
+        """Full-resolution values used to re-decimate the zoomed range."""
+        self._full = (np.asarray(y, dtype=np.float64), names) if y is not None and len(y) else None
+
+    def _line(self):
+        return self._artists[1] if self._artists and self._artists[0] == 'line' else None
+
+    def _on_press(self, event):
+        line = self._line()
+        if line is None or event.inaxes is not self.ax or event.xdata is None:
+            return
+        if event.dblclick:
+            self._drag = None
+            self._show_range(None)
+            return
+        if event.button == 1:
+            band = Rectangle((event.xdata, 0), 0, 1, transform=self.ax.get_xaxis_transform(),
+                             facecolor='#2563eb', alpha=0.15, animated=True)
+            self.ax.add_patch(band)
+            self._drag = {'mode': 'zoom', 'x0': event.xdata, 'band': band,
+                          'background': self.copy_from_bbox(self.ax.bbox)}
+        elif event.button == 3:
+            line.set_animated(True)
+            self.draw()  # background without the line
+            self._drag = {'mode': 'pan', 'x0': event.xdata, 'xdata': np.asarray(line.get_xdata()),
+                          'background': self.copy_from_bbox(self.ax.bbox)}
+
+    def _on_motion(self, event):
+        if not self._drag or event.inaxes is not self.ax or event.xdata is None:
+            return
+        self.restore_region(self._drag['background'])
+        if self._drag['mode'] == 'zoom':
+            band = self._drag['band']
+            band.set_x(min(self._drag['x0'], event.xdata))
+            band.set_width(abs(event.xdata - self._drag['x0']))
+            self.ax.draw_artist(band)
+        else:
+            line = self._line()
+            line.set_xdata(self._drag['xdata'] + (event.xdata - self._drag['x0']))
+            self.ax.draw_artist(line)
+        self.blit(self.ax.bbox)
+
+    def _on_release(self, event):
+        drag, self._drag = self._drag, None
+        if not drag:
+            return
+        x1 = event.xdata if event.xdata is not None else drag['x0']
+        if drag['mode'] == 'zoom':
+            drag['band'].remove()
+            lo, hi = sorted((drag['x0'], x1))
+            if hi - lo >= 1:
+                self._show_range((lo, hi))
+            else:
+                self.draw_idle()
+        else:
+            line = self._line()
+            line.set_xdata(drag['xdata'])
+            line.set_animated(False)
+            lo, hi = self.ax.get_xlim()
+            shift = x1 - drag['x0']
+            self._show_range((lo - shift, hi - shift))
+
+    def _show_range(self, xlim):
+        """Show xlim (None = everything), re-decimating from the full series if available."""
+        line = self._line()
+        if self._full is not None:
+            y, names = self._full
+            lo, hi = (0, len(y)) if xlim is None else (max(0, int(xlim[0])), min(len(y), int(np.ceil(xlim[1])) + 1))
+            if hi > lo:
+                max_points = max(200, 2 * int(self.ax.bbox.width))
+                idx = minmax_decimate(y[lo:hi], max_points, start=lo)
+                line.set_data(idx, y[idx])
+                step = max(1, len(idx) // MAX_TICK_LABELS)
+                self.ax.set_xticks(idx[::step])
+                self.ax.set_xticklabels([names[i] for i in idx[::step]], rotation=45, ha='right')
+        if xlim is None:
+            self.ax.set_autoscale_on(True)
+            self.ax.relim()
+            self.ax.autoscale_view()
+        else:
+            self.ax.set_xlim(*xlim)
+            self.ax.relim(visible_only=True)
+            self.ax.autoscale_view(scalex=False)
+        self.draw_idle()
@@ -0,0 +1,109 @@
+"""
+Chart/summary data preparation that is safe to run off the GUI thread.
+
+Only NumPy is used here (no Qt widgets, no matplotlib), so fetch_dataset() can
+call prepare_dataset() in its thread and hand finished arrays to the UI.
+"""
+import numpy as np
+
+# Points plotted for a line series before min/max decimation kicks in
+LINE_POINTS = 2000
+
+
+# Fields of the data table, in column order (see data_table_widget.COLUMNS)
+TABLE_TEXT_KEYS = ['equipment_name', 'equipment_type']
+TABLE_NUMERIC_KEYS = ['flowrate', 'pressure', 'temperature']
+
+
+def _float_column(equipment, key):
+    def _value(e):
+        try:
+            return float(e.get(key))
+        except (TypeError, ValueError):
+            return np.nan  # missing or non-numeric readings
+    return np.fromiter((_value(e) for e in equipment), dtype=np.float64, count=len(equipment))
+
+
+def table_columns(equipment):
+    """
+    {field: array} backing the data table: str arrays for names and types,
+    float64 (NaN for missing) for readings.
+    """
+    columns = {key: np.asarray([str(e.get(key, '')) for e in equipment], dtype=str) for key in TABLE_TEXT_KEYS}
+    for key in TABLE_NUMERIC_KEYS:
+        columns[key] = _float_column(equipment, key)
+    return columns
+
+
+def minmax_decimate(y, max_points, start=0):
+    """
+    Keep the min and max of each of max_points // 2 equal buckets, preserving
+    order, so peaks survive decimation. Returns indices into y (offset by start).
+    """
+    n = len(y)
+    if n <= max_points:
+        return np.arange(start, start + n)
+    buckets = max(1, max_points // 2)
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    rows = padded.reshape(buckets, size)
+    base = np.arange(buckets) * size
+    lo = base + np.argmin(np.where(np.isnan(rows), np.inf, rows), axis=1)
+    hi = base + np.argmax(np.where(np.isnan(rows), -np.inf, rows), axis=1)
+    idx = np.unique(np.concatenate([lo, hi]))
+    return idx[idx < n] + start
+
+
+def prepare_dataset(data):
+    """
+    Convert a dataset_detail payload into plot-ready arrays and summary values.
+    Returns a dict with 'summary', 'types', 'line', the full 'flowrate'/'names'
+    series and the data table's column arrays ('table', see table_columns).
+    """
+    equipment = data.get('equipment_list') or []
+    type_summaries = data.get('type_summaries') or []
+    chart_data = data.get('chart_data') or {}
+
+    summary = {
+        'total_count': data.get('total_equipment_count') or len(equipment),
+        'avg_flowrate': data.get('avg_flowrate'),
+        'avg_pressure': data.get('avg_pressure'),
+        'avg_temperature': data.get('avg_temperature'),
+    }
+    # Converted once here for the table, the line chart and the fallback averages
+    table = table_columns(equipment)
+    flowrate = table['flowrate']
+    names = [e.get('equipment_name', f'#{i + 1}') for i, e in enumerate(equipment)]
+    # Compute from equipment if dataset-level stats are missing
+    if equipment:
+        for key in TABLE_NUMERIC_KEYS:
+            if summary[f'avg_{key}'] is None:
+                summary[f'avg_{key}'] = float(np.nanmean(table[key]))
+
+    dist = chart_data.get('type_distribution') or {}
+    if dist.get('labels'):
+        types = {'labels': list(dist['labels']), 'counts': list(dist['counts'])}
+    else:
+        types = {
+            'labels': [t['equipment_type'] for t in type_summaries],
+            'counts': [t['count'] for t in type_summaries],
+        }
+
+    lttb = ((chart_data.get('metrics') or {}).get('flowrate') or {}).get('lttb') or {}
+    if lttb.get('x'):
+        line = {'x': list(lttb['x']), 'y': list(lttb['y']), 'names': list(lttb['names'])}
+    elif len(flowrate):
+        idx = minmax_decimate(flowrate, LINE_POINTS)
+        line = {'x': idx.tolist(), 'y': flowrate[idx].tolist(), 'names': [names[i] for i in idx]}
+    else:
+        line = None
+
+    return {
+        'summary': summary,
+        'types': types,
+        'line': line,
+        'flowrate': flowrate,
+        'names': names,
+        'table': table,
+    }
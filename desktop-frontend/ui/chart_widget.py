@@ -1,75 +1,97 @@
 """Charts panel with Matplotlib."""
-import matplotlib
-matplotlib.use('qtagg')
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QTabWidget, QLabel
 
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QTabWidget
+from .chart_prep import prepare_dataset
 
-
-class ChartCanvas(FigureCanvasQTAgg):
-    def __init__(self, parent=None):
-        self.fig = Figure(figsize=(6, 4), dpi=100)
-        super().__init__(self.fig)
-
-    def plot_bar(self, labels, values):
-        self.fig.clear()
-        ax = self.fig.add_subplot(111)
-        ax.bar(labels, values, color='#2563eb', alpha=0.8)
-        ax.set_xlabel('Equipment Type')
-        ax.set_ylabel('Count')
-        ax.set_title('Equipment Type Distribution')
-        plt.setp(ax.xaxis.get_majorticklabels(), rotation=45, ha='right')
-        self.draw()
-
-    def plot_line(self, labels, values):
-        self.fig.clear()
-        ax = self.fig.add_subplot(111)
-        ax.plot(range(len(values)), values, 'o-', color='#22c55e', linewidth=2)
-        ax.set_xticks(range(len(labels)))
-        ax.set_xticklabels(labels, rotation=45, ha='right')
-        ax.set_xlabel('Equipment')
-        ax.set_ylabel('Flowrate')
-        ax.set_title('Flowrate Trends')
-        self.draw()
-
-    def plot_pie(self, labels, values):
-        self.fig.clear()
-        ax = self.fig.add_subplot(111)
-        colors = ['#2563eb', '#22c55e', '#eab308', '#ef4444', '#a855f7', '#ec4899']
-        ax.pie(values, labels=labels, autopct='%1.1f%%', colors=colors[:len(labels)], startangle=90)
-        ax.set_title('Type Percentages')
-        self.draw()
+CHART_TABS = [
+    ('bar', 'Type Distribution'), ('line', 'Flowrate Trends'), ('pie', 'Type %'),
+    ('heatmap', 'Correlation'), ('box', 'By Type'),
+]
 
 
 class ChartWidget(QWidget):
+    """
+    Tabbed charts that render lazily: set_data only records what each chart
+    should show, and a chart is drawn when its tab is (or becomes) visible.
+    matplotlib itself is imported the first time the widget is shown.
+    """
+
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._pending = {}
+        self._series = None
+        self.canvases = {}
+        self.tabs = None
         self._build_ui()
 
     def _build_ui(self):
-        layout = QVBoxLayout(self)
+        self._layout = QVBoxLayout(self)
+        self._placeholder = QLabel('Loading charts...')
+        self._placeholder.setAlignment(Qt.AlignCenter)
+        self._layout.addWidget(self._placeholder)
+
+    def _ensure_canvases(self):
+        if self.tabs is not None:
+            return
+        from .chart_canvas import ChartCanvas, SeriesCanvas
+
         self.tabs = QTabWidget()
-        self.bar_canvas = ChartCanvas()
-        self.line_canvas = ChartCanvas()
-        self.pie_canvas = ChartCanvas()
-        self.tabs.addTab(self.bar_canvas, 'Type Distribution')
-        self.tabs.addTab(self.line_canvas, 'Flowrate Trends')
-        self.tabs.addTab(self.pie_canvas, 'Type %')
-        layout.addWidget(self.tabs)
+        for key, title in CHART_TABS:
+            canvas = SeriesCanvas() if key == 'line' else ChartCanvas()
+            self.canvases[key] = canvas
+            self.tabs.addTab(canvas, title)
+        self.bar_canvas, self.line_canvas, self.pie_canvas = (self.canvases[k] for k in ('bar', 'line', 'pie'))
+        self.tabs.currentChanged.connect(lambda _: self._render_visible())
+        self._layout.replaceWidget(self._placeholder, self.tabs)
+        self._placeholder.deleteLater()
 
     def set_data(self, dataset):
-        equipment = dataset.get('equipment_list', []) or []
-        type_summaries = dataset.get('type_summaries', []) or []
+        """
+        Queue charts for a dataset. Pass a payload with a 'prepared' entry
+        (from chart_prep.prepare_dataset, built off the GUI thread) to avoid
+        per-row conversion here.
+        """
+        prepared = dataset.get('prepared') or prepare_dataset(dataset)
+        # Charts this dataset has no data for are blanked rather than left showing the previous one
+        self._pending = {key: ('clear_chart', (), {}) for key, _ in CHART_TABS}
+        self._series = None
+        types = prepared['types']
+        if types['labels']:
+            args = (types['labels'], types['counts'])
+            self._pending['bar'] = ('plot_bar', args, {})
+            self._pending['pie'] = ('plot_pie', args, {})
+
+        line = prepared['line']
+        if line:
+            self._series = (prepared['flowrate'], prepared['names'])
+            self._pending['line'] = ('plot_line', (line['names'], line['y']), {'x': line['x']})
+
+        # Server-side analytics (/analytics/) are already in plot form
+        analytics = dataset.get('analytics')
+        if analytics and analytics.get('total_count'):
+            labels = [m.title() for m in analytics['metrics']]
+            self._pending['heatmap'] = ('plot_heatmap', (labels, analytics['correlation']['pearson']), {})
+            self._pending['box'] = ('plot_box', (labels, [analytics['box'][m] for m in analytics['metrics']]), {})
+        self._render_visible()
+
+    def set_chart_data(self, chart_data):
+        """Render from the server's precomputed chart-data payload (O(resolution))."""
+        self.set_data({'chart_data': chart_data})
 
-        if type_summaries:
-            labels = [t['equipment_type'] for t in type_summaries]
-            values = [t['count'] for t in type_summaries]
-            self.bar_canvas.plot_bar(labels, values)
-            self.pie_canvas.plot_pie(labels, values)
+    def _render_visible(self):
+        if not self.isVisible():
+            return
+        self._ensure_canvases()
+        key = next(k for k, c in self.canvases.items() if c is self.tabs.currentWidget())
+        job = self._pending.pop(key, None)
+        if job:
+            method, args, kwargs = job
+            canvas = self.canvases[key]
+            if key == 'line':
+                canvas.set_full_series(*(self._series or (None, None)))
+            getattr(canvas, method)(*args, **kwargs)
 
-        if equipment:
-            names = [e.get('equipment_name', f'#{i+1}') for i, e in enumerate(equipment)]
-            flowrates = [float(e.get('flowrate', 0)) for e in equipment]
-            self.line_canvas.plot_line(names, flowrates)
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._render_visible()
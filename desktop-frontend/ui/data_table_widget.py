@@ -1,14 +1,156 @@
 """Data table widget with sorting and search."""
+import numpy as np
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QTableWidget, QTableWidgetItem,
+    QWidget, QVBoxLayout, QTableView,
     QLineEdit, QHBoxLayout, QLabel, QHeaderView,
 )
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QThread, QTimer, Signal
+
+from .chart_prep import table_columns
+from .search_index import SearchIndex
+
+COLUMNS = [
+    ('Name', 'equipment_name'),
+    ('Type', 'equipment_type'),
+    ('Flowrate', 'flowrate'),
+    ('Pressure', 'pressure'),
+    ('Temperature', 'temperature'),
+]
+NUMERIC_KEYS = {'flowrate', 'pressure', 'temperature'}
+SEARCH_DEBOUNCE_MS = 200
+# Tables with more rows than this build their index and run searches off the GUI thread
+OFF_THREAD_ROWS = 20000
+
+
+class EquipmentTableModel(QAbstractTableModel):
+    """
+    Column-array-backed table model. Rows are only formatted when the view
+    asks for them; sorting and filtering work on NumPy index arrays.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._columns = [np.empty(0, dtype=str) for _ in COLUMNS]
+        self._size = 0
+        self._mask = None
+        self._sort_perm = None
+        self._sort_cache = {}
+        self._sort_key = None  # (column, order) of the header's sort indicator
+        self._order = np.empty(0, dtype=np.int64)
+
+    def set_equipment(self, equipment, columns=None):
+        """
+        Show equipment rows, sorted like the previous ones. Pass `columns`
+        (chart_prep.table_columns, built off the GUI thread) to skip converting
+        every row here.
+        """
+        equipment = equipment or []
+        if columns is None:
+            columns = table_columns(equipment)
+        self.beginResetModel()
+        self._columns = [columns[key] for _, key in COLUMNS]
+        self._size = len(self._columns[0])
+        self._mask = None
+        self._sort_cache = {}
+        self._sort_perm = self._sorted_perm(*self._sort_key) if self._sort_key else None
+        self._rebuild_order()
+        self.endResetModel()
+
+    def column_array(self, key):
+        """Return the full (unfiltered, unsorted) array for a field name."""
+        return self._columns[[k for _, k in COLUMNS].index(key)]
+
+    def set_filter_mask(self, mask):
+        """Show only rows where mask is True (None shows everything)."""
+        self.beginResetModel()
+        self._mask = mask
+        self._rebuild_order()
+        self.endResetModel()
+
+    def _rebuild_order(self):
+        order = self._sort_perm if self._sort_perm is not None else np.arange(self._size)
+        if self._mask is not None:
+            order = order[self._mask[order]]
+        self._order = order
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._order)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        key = COLUMNS[index.column()][1]
+        if role == Qt.DisplayRole:
+            value = self._columns[index.column()][self._order[index.row()]]
+            if key in NUMERIC_KEYS:
+                return '' if np.isnan(value) else f'{value:.2f}'
+            return str(value)
+        if role == Qt.TextAlignmentRole and key in NUMERIC_KEYS:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return COLUMNS[section][0]
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if column < 0 or column >= len(COLUMNS):
+            return
+        self.layoutAboutToBeChanged.emit()
+        self._sort_key = (column, order)
+        self._sort_perm = self._sorted_perm(column, order)
+        self._rebuild_order()
+        self.layoutChanged.emit()
+
+    def _sorted_perm(self, column, order):
+        perm = self._sort_cache.get(column)
+        if perm is None:
+            perm = np.argsort(self._columns[column], kind='stable')
+            self._sort_cache[column] = perm
+        return perm if order == Qt.AscendingOrder else perm[::-1]
+
+
+class IndexWorker(QThread):
+    finished = Signal(int, object)
+
+    def __init__(self, generation, names, types):
+        super().__init__()
+        self.generation = generation
+        self.names = names
+        self.types = types
+
+    def run(self):
+        self.finished.emit(self.generation, SearchIndex(self.names, self.types))
+
+
+class SearchWorker(QThread):
+    finished = Signal(int, str, object)
+
+    def __init__(self, generation, index, query, within):
+        super().__init__()
+        self.generation = generation
+        self.index = index
+        self.query = query
+        self.within = within
+
+    def run(self):
+        self.finished.emit(self.generation, self.query, self.index.search(self.query, self.within))
 
 
 class DataTableWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._index = None
+        self._generation = 0
+        self._last_query = ''
+        self._last_rows = None
+        self._workers = set()
         self._build_ui()
 
     def _build_ui(self):
@@ -17,37 +159,77 @@ class DataTableWidget(QWidget):
         search_layout.addWidget(QLabel('Search:'))
         self.search = QLineEdit()
         self.search.setPlaceholderText('Filter by name or type...')
-        self.search.textChanged.connect(self._apply_filter)
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(SEARCH_DEBOUNCE_MS)
+        self._debounce.timeout.connect(self._apply_filter)
+        self.search.textChanged.connect(self._debounce.start)
         search_layout.addWidget(self.search)
         layout.addLayout(search_layout)
 
-        self.table = QTableWidget()
+        self.model = EquipmentTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.setSortingEnabled(True)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(24)
         layout.addWidget(self.table)
 
-    def set_data(self, equipment):
-        self._raw_data = equipment or []
+    def set_data(self, equipment, columns=None):
+        self.model.set_equipment(equipment, columns)
+        self._generation += 1
+        self._index = None
+        self._last_query = ''
+        self._last_rows = None
+        names = self.model.column_array('equipment_name')
+        types = self.model.column_array('equipment_type')
+        if len(names) > OFF_THREAD_ROWS:
+            self._start_worker(IndexWorker(self._generation, names, types), self._on_index_ready)
+        else:
+            self._on_index_ready(self._generation, SearchIndex(names, types))
+
+    def _start_worker(self, worker, slot):
+        # Keep a reference until the thread ends; stale results are dropped by generation/query checks
+        self._workers.add(worker)
+        worker.finished.connect(slot)
+        worker.finished.connect(lambda *_: self._workers.discard(worker))
+        worker.start()
+
+    def _on_index_ready(self, generation, index):
+        if generation != self._generation:
+            return
+        self._index = index
         self._apply_filter()
 
+    def _current_query(self):
+        return self.search.text().lower().strip()
+
     def _apply_filter(self):
-        filter_text = self.search.text().lower().strip()
-        if filter_text:
-            data = [
-                e for e in self._raw_data
-                if filter_text in str(e.get('equipment_name', '')).lower()
-                or filter_text in str(e.get('equipment_type', '')).lower()
-            ]
+        query = self._current_query()
+        if not query:
+            self._last_query, self._last_rows = '', None
+            self.model.set_filter_mask(None)
+            return
+        if self._index is None:
+            return  # applied once the index is ready
+        # A query that contains the previous one can only match a subset of its rows
+        within = self._last_rows if self._last_query and self._last_query in query else None
+        if self._index.size > OFF_THREAD_ROWS:
+            worker = SearchWorker(self._generation, self._index, query, within)
+            self._start_worker(worker, self._on_search_done)
         else:
-            data = self._raw_data
-
-        self.table.setRowCount(len(data))
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(['Name', 'Type', 'Flowrate', 'Pressure', 'Temperature'])
-        for i, e in enumerate(data):
-            self.table.setItem(i, 0, QTableWidgetItem(str(e.get('equipment_name', ''))))
-            self.table.setItem(i, 1, QTableWidgetItem(str(e.get('equipment_type', ''))))
-            self.table.setItem(i, 2, QTableWidgetItem(str(e.get('flowrate', ''))))
-            self.table.setItem(i, 3, QTableWidgetItem(str(e.get('pressure', ''))))
-            self.table.setItem(i, 4, QTableWidgetItem(str(e.get('temperature', ''))))
-        self.table.setSortingEnabled(True)
+            self._on_search_done(self._generation, query, self._index.search(query, within))
+
+    def _on_search_done(self, generation, query, rows):
+        if generation != self._generation or query != self._current_query():
+            return
+        self._last_query, self._last_rows = query, rows
+        mask = np.zeros(self._index.size, dtype=bool)
+        mask[rows] = True
+        self.model.set_filter_mask(mask)
+
+    def shutdown(self):
+        """Wait for background index/search threads (call before the widget is destroyed)."""
+        for worker in list(self._workers):
+            worker.wait(3000)
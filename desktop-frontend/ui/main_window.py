@@ -1,49 +1,94 @@
 """Main application window."""
+import asyncio
+
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QTabWidget,
     QLabel, QPushButton, QMenu, QMessageBox, QFileDialog,
     QStatusBar, QToolBar, QComboBox, QFrame, QGridLayout, QApplication,
 )
-from PySide6.QtCore import Qt, QThread, Signal
+from PySide6.QtCore import Qt, QTimer, QThread, Signal
 from PySide6.QtGui import QFont, QAction
+import requests
 
+from services.api_client import CancelToken, RequestCancelled
+from services.dataset_cache import DatasetCache
+from services.event_stream import EventStream, OPEN, RESYNC
 from .upload_dialog import UploadDialog
 from .data_table_widget import DataTableWidget
 from .chart_widget import ChartWidget
-
-
-class FetchWorker(QThread):
-    finished = Signal(dict)
-    error = Signal(str)
-
-    def __init__(self, api_client, dataset_id):
-        super().__init__()
-        self.api_client = api_client
-        self.dataset_id = dataset_id
-
-    def run(self):
+from .chart_prep import prepare_dataset
+from .task_scheduler import TaskScheduler
+
+# History entries around the current dataset that are prefetched into the cache
+PREFETCH_AHEAD = 2
+# How long to wait for the dataset-created event after an upload before refetching the history
+UPLOAD_EVENT_GRACE_MS = 2000
+
+
+def fetch_dataset(api_client, dataset_id, cache=None, file_hash=None, cancel=None, chart_data=None):
+    """
+    Load a dataset from the disk cache or the server and prepare it for
+    display. Runs on the TaskScheduler pool; cancel aborts in-flight reads.
+    chart_data already fetched (by the overview) is reused instead of requested again.
+    """
+    cached, cached_etag = cache.get(dataset_id, file_hash) if cache else (None, None)
+    if cached is not None and file_hash:
+        data = cached  # content hash matches the history entry; datasets never change
+    else:
         try:
-            data = self.api_client.get_dataset(self.dataset_id)
-            self.finished.emit(data)
-        except Exception as e:
-            self.error.emit(str(e))
+            data, etag = api_client.get_dataset_conditional(
+                dataset_id, cached_etag if cached is not None else None, cancel=cancel
+            )
+        except (requests.ConnectionError, requests.Timeout):
+            if cached is None or (cancel and cancel.cancelled):
+                raise
+            data, etag = cached, None  # offline: serve the last known copy
+        if data is None:
+            data = cached
+        elif data is not cached:
+            try:
+                data['chart_data'] = chart_data or api_client.get_chart_data(dataset_id, cancel=cancel)
+            except RequestCancelled:
+                raise
+            except Exception:
+                data['chart_data'] = None  # ChartWidget falls back to the raw equipment list
+            try:
+                data['analytics'] = api_client.get_analytics(dataset_id, cancel=cancel)
+            except RequestCancelled:
+                raise
+            except Exception:
+                data['analytics'] = None  # the correlation and box plot tabs stay empty
+            if cache:
+                try:
+                    cache.put(dataset_id, data, etag)
+                except OSError:
+                    pass  # a cache write failure must not fail the load
+    if cancel:
+        cancel.check()
+    # Float conversion, averages and decimation happen here, not on the GUI thread
+    data['prepared'] = prepare_dataset(data)
+    return data
 
 
-class PDFWorker(QThread):
-    finished = Signal(bytes)
-    error = Signal(str)
+class EventListener(QThread):
+    """Relays /api/events/ to the GUI thread; reconnects on its own until stopped."""
+    event = Signal(str, object)
 
-    def __init__(self, api_client, dataset_id):
-        super().__init__()
-        self.api_client = api_client
-        self.dataset_id = dataset_id
+    def __init__(self, api_client, parent=None):
+        super().__init__(parent)
+        self.cancel_token = CancelToken()
+        self.stream = EventStream(api_client, self.cancel_token)
 
     def run(self):
         try:
-            content = self.api_client.generate_pdf(self.dataset_id)
-            self.finished.emit(content)
-        except Exception as e:
-            self.error.emit(str(e))
+            for event_type, data in self.stream:
+                self.event.emit(event_type, data)
+        except RequestCancelled:
+            pass
+
+    def stop(self, timeout_ms=3000):
+        self.cancel_token.cancel()
+        self.wait(timeout_ms)
 
 
 class SummaryTab(QFrame):
@@ -92,6 +137,8 @@ class SummaryTab(QFrame):
 
 
 class LoginDialog(QWidget):
+    logged_in = Signal()
+
     def __init__(self, api_client, parent=None):
         super().__init__(parent)
         self.api_client = api_client
@@ -117,6 +164,7 @@ class LoginDialog(QWidget):
                 self.password.text().strip(),
             )
             self.status.setText('Logged in')
+            self.logged_in.emit()
             self.close()
         except Exception as e:
             self.status.setText(str(e))
@@ -124,20 +172,28 @@ class LoginDialog(QWidget):
 
 
 class MainWindow(QMainWindow):
-    def __init__(self, api_client):
+    def __init__(self, api_client, dataset_cache=None, async_client=None):
         super().__init__()
         self.api_client = api_client
+        self.dataset_cache = dataset_cache or DatasetCache()
+        self.async_client = async_client
         self.current_dataset_id = None
         self.datasets = []
-        self.worker = None
-        self.pdf_worker = None
+        self._history_actions = {}
+        self._offline = False
+        self._pending_select = None
+        self.scheduler = TaskScheduler(self)
+        self.events = EventListener(api_client, self)
+        self.events.event.connect(self._on_server_event)
+        self._overview_task = None
+        self._prefetch_task = None
         self.setWindowTitle('Chemical Equipment Parameter Visualizer')
         self.setMinimumSize(900, 600)
         self.resize(1100, 700)
         self._build_ui()
         self._build_menu()
         self._build_toolbar()
-        self._load_history()
+        self._history_requested = False
 
     def _build_ui(self):
         central = QWidget()
@@ -183,36 +239,129 @@ class MainWindow(QMainWindow):
         login_btn.clicked.connect(self._show_login)
         toolbar.addWidget(login_btn)
 
-    def _load_history(self):
-        try:
-            self.datasets = self.api_client.get_datasets()
-        except Exception:
-            self.datasets = []
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._history_requested:
+            # Fetch history after the first paint so a slow or down backend never delays the window
+            self._history_requested = True
+            QTimer.singleShot(0, self._load_history)
+            self.events.start()
+
+    def _load_history(self, select_id=None):
+        self.statusBar().showMessage('Loading history...')
+        self.scheduler.submit(
+            'history',
+            lambda cancel: self.api_client.get_datasets(cancel=cancel),
+            lambda datasets: self._on_history_loaded(datasets, select_id),
+            lambda msg: self._on_history_loaded(None, select_id),
+            coalesce=False,
+        )
+
+    def _on_history_loaded(self, datasets, select_id=None):
+        if datasets is None:
+            # Offline: offer the datasets we have cached locally
+            datasets = self.dataset_cache.entries()
+            self._offline = True
+            self.statusBar().showMessage('Offline: showing cached datasets')
+        else:
+            self._offline = False
+            self.statusBar().showMessage('Ready')
+        self.datasets = datasets
         self._refresh_combo()
+        if select_id:
+            self._select_dataset(select_id)
 
     def _refresh_combo(self):
         self.dataset_combo.blockSignals(True)
         self.dataset_combo.clear()
         self.dataset_combo.addItem('— Select dataset —', None)
         for d in self.datasets:
-            ts = d.get('upload_timestamp', '')[:10] if d.get('upload_timestamp') else ''
-            label = f"{d.get('filename', '')} ({ts})"
-            self.dataset_combo.addItem(label, d.get('id'))
+            self.dataset_combo.addItem(self._combo_label(d), d.get('id'))
+        # Keep the open dataset selected without reloading it
+        self.dataset_combo.setCurrentIndex(max(self.dataset_combo.findData(self.current_dataset_id), 0))
         self.dataset_combo.blockSignals(False)
         self._populate_history_menu()
 
+    @staticmethod
+    def _combo_label(d):
+        ts = d.get('upload_timestamp', '')[:10] if d.get('upload_timestamp') else ''
+        return f"{d.get('filename', '')} ({ts})"
+
+    def _history_action(self, d):
+        act = QAction(f"{d.get('filename', '')} - {(d.get('upload_timestamp') or '')[:16]}", self.history_menu)
+        did = d.get('id')
+        act.triggered.connect(lambda checked, x=did: self._select_dataset(x))
+        self._history_actions[did] = act
+        return act
+
     def _populate_history_menu(self):
         self.history_menu.clear()
+        self._history_actions = {}
         for d in self.datasets:
-            act = QAction(f"{d.get('filename', '')} - {d.get('upload_timestamp', '')[:16]}", self)
-            did = d.get('id')
-            act.triggered.connect(lambda checked, x=did: self._select_dataset(x))
-            self.history_menu.addAction(act)
+            self.history_menu.addAction(self._history_action(d))
         if not self.datasets:
-            act = QAction('(No datasets)', self)
+            act = QAction('(No datasets)', self.history_menu)
             act.setEnabled(False)
             self.history_menu.addAction(act)
 
+    def _on_server_event(self, event_type, data):
+        """Apply a pushed server event to the history in place instead of refetching it."""
+        if event_type == OPEN:
+            if self._offline:
+                self._load_history(select_id=self.current_dataset_id)  # the backend is back
+        elif event_type == RESYNC:
+            self._load_history()  # events were lost; the open dataset itself is unaffected
+        elif event_type == 'dataset-created':
+            self._add_dataset(data['dataset'])
+        elif event_type == 'dataset-pruned':
+            for dataset_id in data['ids']:
+                self._remove_dataset(dataset_id)
+        elif event_type == 'job-progress':
+            name = data.get('filename') or f"dataset {data.get('dataset_id', '')}"
+            self.statusBar().showMessage(f"Server {data['job']}: {name} ({data['progress']:.0%})", 3000)
+        elif event_type == 'report-ready':
+            self.statusBar().showMessage(f"Report ready for dataset {data['dataset_id']}", 3000)
+
+    def _add_dataset(self, d):
+        dataset_id = d.get('id')
+        if any(x.get('id') == dataset_id for x in self.datasets):
+            return
+        self.datasets.insert(0, d)
+        self.dataset_combo.blockSignals(True)
+        self.dataset_combo.insertItem(1, self._combo_label(d), dataset_id)
+        self.dataset_combo.blockSignals(False)
+        if not self._history_actions:
+            self.history_menu.clear()  # drop the "(No datasets)" placeholder
+        actions = self.history_menu.actions()
+        act = self._history_action(d)
+        if actions:
+            self.history_menu.insertAction(actions[0], act)
+        else:
+            self.history_menu.addAction(act)
+        if self._pending_select == dataset_id:
+            self._pending_select = None
+            self._select_dataset(dataset_id)
+
+    def _remove_dataset(self, dataset_id):
+        self.datasets = [d for d in self.datasets if d.get('id') != dataset_id]
+        idx = self.dataset_combo.findData(dataset_id)
+        if idx > 0:
+            was_current = idx == self.dataset_combo.currentIndex()
+            self.dataset_combo.blockSignals(True)
+            self.dataset_combo.removeItem(idx)
+            if was_current:
+                self.dataset_combo.setCurrentIndex(0)
+            self.dataset_combo.blockSignals(False)
+        act = self._history_actions.pop(dataset_id, None)
+        if act is not None:
+            self.history_menu.removeAction(act)
+            act.deleteLater()
+        if not self.datasets:
+            self._populate_history_menu()
+        if dataset_id == self.current_dataset_id:
+            self.current_dataset_id = None
+            self.statusBar().showMessage('The displayed dataset was removed from the server')
+
     def _select_dataset(self, dataset_id):
         self.current_dataset_id = dataset_id
         idx = self.dataset_combo.findData(dataset_id)
@@ -224,13 +373,20 @@ class MainWindow(QMainWindow):
         dlg = UploadDialog(self.api_client, self)
         dlg.exec()
         if dlg.result:
-            self._load_history()
-            self.current_dataset_id = dlg.result.get('dataset_id')
-            self._refresh_combo()
-            idx = self.dataset_combo.findData(self.current_dataset_id)
-            if idx >= 0:
-                self.dataset_combo.setCurrentIndex(idx)
-            self._load_dataset()
+            self._show_uploaded(dlg.result.get('dataset_id'))
+
+    def _show_uploaded(self, dataset_id):
+        if any(d.get('id') == dataset_id for d in self.datasets):
+            self._select_dataset(dataset_id)
+            return
+        # The dataset-created event normally arrives first; refetch if the event stream is down
+        self._pending_select = dataset_id
+        QTimer.singleShot(UPLOAD_EVENT_GRACE_MS, self._select_pending_upload)
+
+    def _select_pending_upload(self):
+        if self._pending_select:
+            dataset_id, self._pending_select = self._pending_select, None
+            self._load_history(select_id=dataset_id)
 
     def _on_combo_change(self, idx):
         dataset_id = self.dataset_combo.itemData(idx)
@@ -241,36 +397,72 @@ class MainWindow(QMainWindow):
     def _load_dataset(self):
         if not self.current_dataset_id:
             return
-        if self.worker and self.worker.isRunning():
-            self.worker.wait()
         self.statusBar().showMessage('Loading...')
-        self.worker = FetchWorker(self.api_client, self.current_dataset_id)
-        self.worker.finished.connect(self._on_data_loaded)
-        self.worker.error.connect(self._on_load_error)
-        self.worker.start()
+        dataset_id = self.current_dataset_id
+        file_hash = next(
+            (d.get('file_hash') for d in self.datasets if d.get('id') == dataset_id), None
+        )
+        if self._overview_task:
+            self._overview_task.cancel()
+            self._overview_task = None
+        # A cached dataset loads from disk at once; an overview would only cost the server extra passes
+        if self.async_client and not self.dataset_cache.contains(dataset_id, file_hash):
+            self.scheduler.cancel('dataset')  # a superseded full load must not land after this one
+            self._overview_task = asyncio.ensure_future(self._load_overview(dataset_id, file_hash))
+        else:
+            self._fetch_dataset(dataset_id, file_hash)
+
+    def _fetch_dataset(self, dataset_id, file_hash, chart_data=None):
+        # Rapid combo/history changes coalesce; a superseded load is cancelled, not waited for
+        self.scheduler.submit(
+            'dataset',
+            lambda cancel: fetch_dataset(
+                self.api_client, dataset_id, self.dataset_cache, file_hash, cancel, chart_data=chart_data
+            ),
+            self._on_data_loaded, self._on_load_error,
+        )
+
+    async def _load_overview(self, dataset_id, file_hash):
+        """
+        Show summary, charts and the first table pages, then download the full
+        dataset, reusing the overview's chart data.
+        """
+        try:
+            overview = await self.async_client.fetch_overview(dataset_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            overview = None  # the full fetch still runs and reports errors
+        if dataset_id != self.current_dataset_id:
+            return
+        self._overview_task = None
+        if overview:
+            self.summary_tab.set_data(overview['summary'])
+            self.chart_widget.set_chart_data(overview['chart_data'])
+            self.data_table.set_data(overview['equipment'])
+            self.statusBar().showMessage('Loading full dataset...')
+        self._fetch_dataset(dataset_id, file_hash, overview and overview['chart_data'])
 
     def _on_data_loaded(self, data):
         self.statusBar().showMessage('Loaded')
-        self.data_table.set_data(data.get('equipment_list', []))
+        self.data_table.set_data(data.get('equipment_list', []), data['prepared']['table'])
         self.chart_widget.set_data(data)
-        equipment = data.get('equipment_list', [])
-        summary = {
-            'total_count': data.get('total_equipment_count') or len(equipment),
-            'avg_flowrate': data.get('avg_flowrate'),
-            'avg_pressure': data.get('avg_pressure'),
-            'avg_temperature': data.get('avg_temperature'),
-        }
-        # Compute from equipment if dataset-level stats are missing
-        if summary['avg_flowrate'] is None and equipment:
-            flowrates = [float(e.get('flowrate', 0)) for e in equipment]
-            summary['avg_flowrate'] = sum(flowrates) / len(flowrates) if flowrates else None
-        if summary['avg_pressure'] is None and equipment:
-            pressures = [float(e.get('pressure', 0)) for e in equipment]
-            summary['avg_pressure'] = sum(pressures) / len(pressures) if pressures else None
-        if summary['avg_temperature'] is None and equipment:
-            temps = [float(e.get('temperature', 0)) for e in equipment]
-            summary['avg_temperature'] = sum(temps) / len(temps) if temps else None
+        summary = data['prepared']['summary']
         self.summary_tab.set_data(summary)
+        self._schedule_prefetch()
+
+    def _schedule_prefetch(self):
+        """Warm the disk cache with the history entries the user is likely to open next."""
+        if not self.async_client or not self.datasets:
+            return
+        ids = [d.get('id') for d in self.datasets]
+        idx = ids.index(self.current_dataset_id) if self.current_dataset_id in ids else -1
+        neighbours = self.datasets[idx + 1:idx + 1 + PREFETCH_AHEAD]
+        if idx > 0:
+            neighbours.append(self.datasets[idx - 1])
+        if self._prefetch_task and not self._prefetch_task.done():
+            self._prefetch_task.cancel()
+        self._prefetch_task = asyncio.ensure_future(self.async_client.prefetch(neighbours, self.dataset_cache))
 
     def _on_load_error(self, msg):
         self.statusBar().showMessage('Error')
@@ -285,13 +477,14 @@ class MainWindow(QMainWindow):
         )
         if not path:
             return
-        if self.pdf_worker and self.pdf_worker.isRunning():
-            self.pdf_worker.wait()
         self.statusBar().showMessage('Generating PDF...')
-        self.pdf_worker = PDFWorker(self.api_client, self.current_dataset_id)
-        self.pdf_worker.finished.connect(lambda c: self._save_pdf(c, path))
-        self.pdf_worker.error.connect(self._on_pdf_error)
-        self.pdf_worker.start()
+        dataset_id = self.current_dataset_id
+        self.scheduler.submit(
+            'pdf',
+            lambda cancel: self.api_client.generate_pdf(dataset_id, cancel=cancel),
+            lambda content: self._save_pdf(content, path), self._on_pdf_error,
+            coalesce=False,
+        )
 
     def _save_pdf(self, content, path):
         with open(path, 'wb') as f:
@@ -305,11 +498,20 @@ class MainWindow(QMainWindow):
 
     def _show_login(self):
         dlg = LoginDialog(self.api_client, self)
+        dlg.logged_in.connect(self._on_logged_in)
         dlg.show()
 
+    def _on_logged_in(self):
+        # Datasets are per user: switch the history and the event stream to the new namespace
+        self.current_dataset_id = None
+        self._load_history()
+        self.events.stream.reconnect()
+
     def closeEvent(self, event):
-        if self.worker and self.worker.isRunning():
-            self.worker.wait(3000)
-        if self.pdf_worker and self.pdf_worker.isRunning():
-            self.pdf_worker.wait(3000)
+        for task in (self._overview_task, self._prefetch_task):
+            if task and not task.done():
+                task.cancel()
+        self.data_table.shutdown()
+        self.scheduler.shutdown()
+        self.events.stop()
         event.accept()
@@ -0,0 +1,100 @@
+"""Prebuilt lowercase + trigram index for substring search over equipment rows."""
+import numpy as np
+
+# Only the first MAX_INDEXED_CHARS characters of a name feed the trigram index;
+# longer names are always kept as candidates and verified by a direct scan.
+MAX_INDEXED_CHARS = 32
+
+
+def _trigram_keys(codes):
+    """Pack three UCS-4 code points (< 2**21 each) into one uint64 key."""
+    codes = codes.astype(np.uint64)
+    return (codes[..., 0] << np.uint64(42)) | (codes[..., 1] << np.uint64(21)) | codes[..., 2]
+
+
+class SearchIndex:
+    """
+    Case-insensitive substring search on equipment name or type.
+
+    Built once per dataset: names are lowercased into a fixed-width array and
+    indexed by trigram (sorted keys + row postings); types are reduced to their
+    distinct values so a type match is a lookup, not a scan.
+    """
+
+    def __init__(self, names, types):
+        self.size = len(names)
+        self.names = np.char.lower(np.asarray(names, dtype=str))
+        type_values, self.type_codes = np.unique(
+            np.char.lower(np.asarray(types, dtype=str)), return_inverse=True
+        )
+        self.type_values = type_values
+        self._build_trigrams()
+
+    def _build_trigrams(self):
+        n = self.size
+        width = self.names.dtype.itemsize // 4
+        self._long_rows = np.empty(0, dtype=np.int64)
+        if n == 0 or width < 3:
+            self._keys = np.empty(0, dtype=np.uint64)
+            self._rows = np.empty(0, dtype=np.int64)
+            return
+        codes = np.ascontiguousarray(self.names).view(np.uint32).reshape(n, width)
+        if width > MAX_INDEXED_CHARS:
+            self._long_rows = np.flatnonzero(codes[:, MAX_INDEXED_CHARS] != 0)
+            codes = codes[:, :MAX_INDEXED_CHARS]
+            width = MAX_INDEXED_CHARS
+        windows = np.lib.stride_tricks.sliding_window_view(codes, 3, axis=1)
+        keys = _trigram_keys(windows)
+        valid = windows[..., 2] != 0
+        rows = np.broadcast_to(np.arange(n, dtype=np.int64)[:, None], keys.shape)
+        keys, rows = keys[valid], rows[valid]
+        # Stable sort keeps rows ascending within each key; then drop repeated (key, row) pairs
+        order = np.argsort(keys, kind='stable')
+        keys, rows = keys[order], rows[order]
+        if len(keys):
+            distinct = np.ones(len(keys), dtype=bool)
+            distinct[1:] = (keys[1:] != keys[:-1]) | (rows[1:] != rows[:-1])
+            keys, rows = keys[distinct], rows[distinct]
+        self._keys = keys
+        self._rows = rows
+
+    def _name_candidates(self, query):
+        """Rows whose indexed name prefix contains every trigram of the query."""
+        codes = np.frombuffer(query.encode('utf-32-le'), dtype=np.uint32)
+        grams = np.unique(_trigram_keys(np.lib.stride_tricks.sliding_window_view(codes, 3)))
+        postings = []
+        for gram in grams:
+            lo = np.searchsorted(self._keys, gram, side='left')
+            hi = np.searchsorted(self._keys, gram, side='right')
+            postings.append(self._rows[lo:hi])
+        postings.sort(key=len)
+        candidates = postings[0]
+        for rows in postings[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, rows, assume_unique=True)
+        if len(self._long_rows):
+            candidates = np.union1d(candidates, self._long_rows)
+        return candidates
+
+    def search(self, query, within=None):
+        """
+        Return sorted row indices whose name or type contains `query`.
+        If `within` is given (results of a shorter query this one extends),
+        only those rows are examined.
+        """
+        query = query.lower()
+        if not query:
+            return np.arange(self.size)
+        type_hit = np.char.find(self.type_values, query) >= 0
+        if within is not None:
+            rows = within
+        elif len(query) >= 3 and len(self._keys):
+            rows = self._name_candidates(query)
+            type_rows = np.flatnonzero(type_hit[self.type_codes]) if type_hit.any() else rows[:0]
+            name_hit = np.char.find(self.names[rows], query) >= 0
+            return np.union1d(rows[name_hit], type_rows)
+        else:
+            rows = np.arange(self.size)
+        hit = (np.char.find(self.names[rows], query) >= 0) | type_hit[self.type_codes[rows]]
+        return rows[hit]
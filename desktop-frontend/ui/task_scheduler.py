@@ -0,0 +1,124 @@
+"""
+Central QThreadPool-backed scheduler for background work in the main window.
+
+Tasks are submitted under a key ("dataset", "pdf", ...). A new submission
+for a key cancels the previous one (its HTTP response is closed via the
+CancelToken), submissions arriving within the coalescing window collapse
+into the last one, and results from anything but the latest task for a key
+are dropped. Nothing here ever waits on the GUI thread.
+"""
+import itertools
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal, Slot
+
+from services.api_client import CancelToken, RequestCancelled
+
+
+class _TaskSignals(QObject):
+    done = Signal(int, object)
+    failed = Signal(int, str)
+
+
+class _Runnable(QRunnable):
+    def __init__(self, task_id, fn, token, signals):
+        super().__init__()
+        self.task_id = task_id
+        self.fn = fn
+        self.token = token
+        self.signals = signals
+
+    def run(self):
+        try:
+            result = self.fn(self.token)
+        except RequestCancelled:
+            return
+        except Exception as e:
+            if not self.token.cancelled:
+                self.signals.failed.emit(self.task_id, str(e))
+            return
+        if not self.token.cancelled:
+            self.signals.done.emit(self.task_id, result)
+
+
+class TaskScheduler(QObject):
+    def __init__(self, parent=None, max_threads=4, coalesce_ms=120):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_threads)
+        self._coalesce_ms = coalesce_ms
+        self._ids = itertools.count(1)
+        self._signals = _TaskSignals()
+        self._signals.done.connect(self._on_done)
+        self._signals.failed.connect(self._on_failed)
+        self._latest = {}    # key -> task id of the task whose result is wanted
+        self._tasks = {}     # task id -> (key, token, on_done, on_error)
+        self._pending = {}   # key -> (fn, on_done, on_error) waiting for the coalescing timer
+        self._timers = {}
+
+    def submit(self, key, fn, on_done, on_error=None, coalesce=True):
+        """
+        Run fn(cancel_token) on the pool. on_done(result) / on_error(message)
+        are called on the GUI thread, and only if this is still the latest task for key.
+        """
+        self.cancel(key)
+        if not coalesce or not self._coalesce_ms:
+            self._start(key, fn, on_done, on_error)
+            return
+        self._pending[key] = (fn, on_done, on_error)
+        timer = self._timers.get(key)
+        if timer is None:
+            timer = self._timers[key] = QTimer(self)
+            timer.setSingleShot(True)
+            timer.timeout.connect(lambda k=key: self._start_pending(k))
+        timer.start(self._coalesce_ms)
+
+    def _start_pending(self, key):
+        job = self._pending.pop(key, None)
+        if job:
+            self._start(key, *job)
+
+    def _start(self, key, fn, on_done, on_error):
+        task_id = next(self._ids)
+        token = CancelToken()
+        self._latest[key] = task_id
+        self._tasks[task_id] = (key, token, on_done, on_error)
+        self._pool.start(_Runnable(task_id, fn, token, self._signals))
+
+    def cancel(self, key):
+        """Cancel the pending and running task for key (running HTTP reads are aborted)."""
+        self._pending.pop(key, None)
+        timer = self._timers.get(key)
+        if timer:
+            timer.stop()
+        task_id = self._latest.pop(key, None)
+        entry = self._tasks.pop(task_id, None) if task_id else None
+        if entry:
+            entry[1].cancel()
+
+    def is_busy(self, key):
+        return key in self._pending or key in self._latest
+
+    def _take(self, task_id):
+        entry = self._tasks.pop(task_id, None)
+        if entry is None or self._latest.get(entry[0]) != task_id:
+            return None
+        del self._latest[entry[0]]
+        return entry
+
+    @Slot(int, object)
+    def _on_done(self, task_id, result):
+        entry = self._take(task_id)
+        if entry:
+            entry[2](result)
+
+    @Slot(int, str)
+    def _on_failed(self, task_id, message):
+        entry = self._take(task_id)
+        if entry and entry[3]:
+            entry[3](message)
+
+    def shutdown(self, timeout_ms=2000):
+        """Cancel everything; wait briefly for worker threads so Python objects outlive them."""
+        for key in list(self._pending) + list(self._latest):
+            self.cancel(key)
+        self._pool.waitForDone(timeout_ms)
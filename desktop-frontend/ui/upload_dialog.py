@@ -1,12 +1,23 @@
 """Upload CSV dialog."""
+import os
+
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
     QFileDialog, QProgressBar, QMessageBox, QLineEdit,
 )
 from PySide6.QtCore import Qt, QThread, Signal
 
+from services.api_client import CancelToken, RequestCancelled, file_sha256
+from services.csv_validator import validate_csv
 
-class UploadWorker(QThread):
+# Progress bar resolution (per-mille, so large files still move smoothly)
+PROGRESS_STEPS = 1000
+# Formats the server parses itself (see parse_upload); everything else is checked locally as CSV
+BINARY_FORMATS = ('.xlsx', '.parquet')
+
+
+class ValidateWorker(QThread):
+    """Validate and summarise a CSV locally, then ask the server whether it is a duplicate."""
     finished = Signal(dict)
     error = Signal(str)
     progress = Signal(int)
@@ -15,13 +26,68 @@ class UploadWorker(QThread):
         super().__init__()
         self.api_client = api_client
         self.filepath = filepath
+        self.cancel_token = CancelToken()
+
+    def _report(self, done, total):
+        self.progress.emit(done * PROGRESS_STEPS // total if total else PROGRESS_STEPS)
+
+    def _hash_only(self):
+        """Spreadsheets and Parquet files are validated by the server; only hash them for the duplicate check."""
+        size = os.path.getsize(self.filepath)
+        preview = {'sha256': file_sha256(self.filepath, self.cancel_token), 'size': size, 'summary': None}
+        self._report(size, size)
+        return preview
 
     def run(self):
         try:
-            self.progress.emit(30)
-            result = self.api_client.upload_csv(self.filepath)
-            self.progress.emit(100)
+            if self.filepath.lower().endswith(BINARY_FORMATS):
+                preview = self._hash_only()
+            else:
+                preview = validate_csv(self.filepath, progress=self._report, cancel=self.cancel_token)
+        except RequestCancelled:
+            return
+        except (OSError, ValueError) as e:
+            self.error.emit(str(e))
+            return
+        try:
+            preview['duplicate'] = self.api_client.find_dataset_by_hash(preview['sha256'])
+        except Exception:
+            preview['duplicate'] = None  # offline or older server: the upload itself still checks
+        if not self.cancel_token.cancelled:
+            self.finished.emit(preview)
+
+
+class UploadWorker(QThread):
+    finished = Signal(dict)
+    error = Signal(str)
+    progress = Signal(int)
+    status = Signal(str)
+
+    def __init__(self, api_client, filepath, file_hash=None):
+        super().__init__()
+        self.api_client = api_client
+        self.filepath = filepath
+        self.file_hash = file_hash
+        self.cancel_token = CancelToken()
+        self._last_step = -1
+
+    def _report(self, sent, total):
+        step = sent * PROGRESS_STEPS // total if total else PROGRESS_STEPS
+        if step != self._last_step:
+            self._last_step = step
+            self.progress.emit(step)
+            self.status.emit(f'Uploading... {sent / 1048576:.1f} / {total / 1048576:.1f} MB')
+
+    def run(self):
+        try:
+            if not self.file_hash:
+                self.status.emit('Hashing file...')
+            result = self.api_client.upload_csv_chunked(
+                self.filepath, progress=self._report, cancel=self.cancel_token, file_hash=self.file_hash
+            )
             self.finished.emit(result)
+        except RequestCancelled:
+            pass  # the server keeps the partial upload; retrying the same file resumes it
         except Exception as e:
             self.error.emit(str(e))
 
@@ -32,6 +98,9 @@ class UploadDialog(QDialog):
         self.api_client = api_client
         self.result = None
         self.worker = None
+        self.validator = None
+        self._stale_validators = []
+        self.preview = None
         self.setWindowTitle('Upload CSV')
         self.setMinimumWidth(400)
         self._build_ui()
@@ -40,17 +109,24 @@ class UploadDialog(QDialog):
         layout = QVBoxLayout(self)
         self.path_edit = QLineEdit()
         self.path_edit.setPlaceholderText('Select CSV file...')
+        self.path_edit.editingFinished.connect(self._validate)
         layout.addWidget(self.path_edit)
 
         btn_layout = QHBoxLayout()
         browse_btn = QPushButton('Browse')
         browse_btn.clicked.connect(self._browse)
-        upload_btn = QPushButton('Upload')
-        upload_btn.clicked.connect(self._upload)
+        self.upload_btn = QPushButton('Upload')
+        self.upload_btn.clicked.connect(self._upload)
+        self.upload_btn.setEnabled(False)
         btn_layout.addWidget(browse_btn)
-        btn_layout.addWidget(upload_btn)
+        btn_layout.addWidget(self.upload_btn)
         layout.addLayout(btn_layout)
 
+        self.preview_label = QLabel('')
+        self.preview_label.setTextFormat(Qt.PlainText)
+        self.preview_label.setWordWrap(True)
+        layout.addWidget(self.preview_label)
+
         self.progress = QProgressBar()
         self.progress.setVisible(False)
         layout.addWidget(self.progress)
@@ -60,24 +136,91 @@ class UploadDialog(QDialog):
 
     def _browse(self):
         path, _ = QFileDialog.getOpenFileName(
-            self, 'Select CSV', '', 'CSV files (*.csv)'
+            self, 'Select CSV', '', 'Data files (*.csv *.xlsx *.parquet);;CSV files (*.csv)'
         )
         if path:
             self.path_edit.setText(path)
+            self._validate()
+
+    def _validate(self):
+        path = self.path_edit.text().strip()
+        if self.preview and self.preview.get('path') == path:
+            return
+        if self.validator and self.validator.isRunning() and self.validator.filepath == path:
+            return
+        self._cancel_validation()
+        self.preview = None
+        self.upload_btn.setEnabled(False)
+        self.preview_label.setText('')
+        if not path:
+            return
+        self.progress.setVisible(True)
+        self.progress.setRange(0, PROGRESS_STEPS)
+        self.progress.setValue(0)
+        self.status.setText('Checking file...')
+        self.validator = ValidateWorker(self.api_client, path)
+        self.validator.finished.connect(lambda preview, p=path: self._on_validated(p, preview))
+        self.validator.error.connect(self._on_invalid)
+        self.validator.progress.connect(self.progress.setValue)
+        self.validator.start()
+
+    def _cancel_validation(self):
+        if self.validator and self.validator.isRunning():
+            self.validator.cancel_token.cancel()
+            self.validator.finished.disconnect()
+            self.validator.error.disconnect()
+            self.validator.progress.disconnect()
+            # Keep a reference until the thread notices the cancel and exits
+            self._stale_validators = [v for v in self._stale_validators if v.isRunning()] + [self.validator]
+
+    def _on_validated(self, path, preview):
+        self.progress.setVisible(False)
+        preview['path'] = path
+        self.preview = preview
+        s = preview['summary']
+        if s is None:
+            lines = [f"{preview['size'] / 1048576:.1f} MB, checked by the server on upload"]
+        else:
+            types = ', '.join(f'{t}: {n}' for t, n in preview['type_distribution'].items())
+            lines = [
+                f"{s['total_count']} rows, {preview['size'] / 1048576:.1f} MB",
+                f"Avg flowrate {s['avg_flowrate']:.2f} (min {s['min_flowrate']}, max {s['max_flowrate']})",
+                f"Avg pressure {s['avg_pressure']:.2f} (min {s['min_pressure']}, max {s['max_pressure']})",
+                f"Avg temperature {s['avg_temperature']:.2f} (min {s['min_temperature']}, max {s['max_temperature']})",
+                f'Types: {types}',
+            ]
+        duplicate = preview.get('duplicate')
+        if duplicate:
+            self.status.setText(
+                f"Already uploaded as {duplicate.get('filename', '')} (dataset {duplicate.get('id')})."
+            )
+        else:
+            self.status.setText('File is valid.')
+            self.upload_btn.setEnabled(True)
+        self.preview_label.setText('\n'.join(lines))
+
+    def _on_invalid(self, msg):
+        self.progress.setVisible(False)
+        self.status.setText(f'Invalid file: {msg}')
 
     def _upload(self):
         path = self.path_edit.text().strip()
         if not path:
             QMessageBox.warning(self, 'Error', 'Please select a CSV file.')
             return
+        if not self.preview or self.preview.get('path') != path:
+            self._validate()
+            return
+        self.upload_btn.setEnabled(False)
         self.progress.setVisible(True)
-        self.progress.setRange(0, 100)
+        self.progress.setRange(0, PROGRESS_STEPS)
         self.progress.setValue(0)
         self.status.setText('Uploading...')
-        self.worker = UploadWorker(self.api_client, path)
+        self.worker = UploadWorker(self.api_client, path, self.preview['sha256'])
         self.worker.finished.connect(self._on_success)
         self.worker.error.connect(self._on_error)
         self.worker.progress.connect(self.progress.setValue)
+        self.worker.status.connect(self.status.setText)
         self.worker.start()
 
     def _on_success(self, data):
@@ -89,9 +232,14 @@ class UploadDialog(QDialog):
     def _on_error(self, msg):
         self.progress.setVisible(False)
         self.status.setText('')
+        self.upload_btn.setEnabled(True)
         QMessageBox.critical(self, 'Upload Failed', msg)
 
     def reject(self):
+        self._cancel_validation()
+        for validator in self._stale_validators:
+            validator.wait(3000)
         if self.worker and self.worker.isRunning():
+            self.worker.cancel_token.cancel()
             self.worker.wait(3000)
         super().reject()
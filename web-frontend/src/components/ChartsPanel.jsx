@@ -12,7 +12,10 @@ import {
   Legend,
 } from 'chart.js'
 import { Bar, Line, Pie } from 'react-chartjs-2'
-import { getDataset } from '../services/api'
+import { getChartData } from '../services/api'
+
+// Points per series requested from the server; chart cost is O(resolution), not O(rows)
+const CHART_RESOLUTION = 500
 
 ChartJS.register(
   CategoryScale,
@@ -48,7 +51,7 @@ export default function ChartsPanel({ datasetId }) {
   useEffect(() => {
     if (!datasetId) return
     setLoading(true)
-    getDataset(datasetId)
+    getChartData(datasetId, CHART_RESOLUTION)
       .then((res) => setData(res.data))
       .catch(() => setData(null))
       .finally(() => setLoading(false))
@@ -56,14 +59,14 @@ export default function ChartsPanel({ datasetId }) {
 
   if (loading || !data) return <div>Loading charts...</div>
 
-  const equipment = data.equipment_list || []
-  const typeDist = data.type_summaries || []
+  const typeDist = data.type_distribution || { labels: [], counts: [] }
+  const flowSeries = (data.metrics && data.metrics.flowrate && data.metrics.flowrate.lttb) || { names: [], y: [] }
 
   const barData = {
-    labels: typeDist.map((t) => t.equipment_type),
+    labels: typeDist.labels,
     datasets: [{
       label: 'Count',
-      data: typeDist.map((t) => t.count),
+      data: typeDist.counts,
       backgroundColor: 'rgba(37, 99, 235, 0.7)',
       borderColor: 'rgb(37, 99, 235)',
       borderWidth: 1,
@@ -71,10 +74,11 @@ export default function ChartsPanel({ datasetId }) {
   }
 
   const lineData = {
-    labels: equipment.map((e, i) => e.equipment_name || `#${i + 1}`),
+    labels: flowSeries.names,
     datasets: [{
       label: 'Flowrate',
-      data: equipment.map((e) => parseFloat(e.flowrate)),
+      data: flowSeries.y,
+      pointRadius: flowSeries.y.length > 200 ? 0 : 3,
       borderColor: 'rgb(34, 197, 94)',
       backgroundColor: 'rgba(34, 197, 94, 0.2)',
       tension: 0.3,
@@ -82,9 +86,9 @@ export default function ChartsPanel({ datasetId }) {
   }
 
   const pieData = {
-    labels: typeDist.map((t) => t.equipment_type),
+    labels: typeDist.labels,
     datasets: [{
-      data: typeDist.map((t) => t.count),
+      data: typeDist.counts,
       backgroundColor: [
         'rgba(37, 99, 235, 0.8)',
         'rgba(34, 197, 94, 0.8)',
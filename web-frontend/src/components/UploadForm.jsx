@@ -58,7 +58,7 @@ export default function UploadForm({ onSuccess }) {
       <label style={styles.label}>Upload CSV</label>
       <input
         type="file"
-        accept=".csv"
+        accept=".csv,.xlsx,.parquet"
         style={styles.input}
         onChange={(e) => setFile(e.target.files?.[0] || null)}
         disabled={loading}
@@ -30,6 +30,8 @@ export const uploadCSV = (file) => {
 export const getDatasets = () => api.get('/datasets/')
 export const getDataset = (id) => api.get(`/datasets/${id}/`)
 export const getDatasetSummary = (id) => api.get(`/datasets/${id}/summary/`)
+export const getChartData = (id, resolution = 500, bins = 20) =>
+  api.get(`/datasets/${id}/chart-data/`, { params: { resolution, bins } })
 export const getEquipment = (id, page = 1) => api.get(`/datasets/${id}/equipment/?page=${page}`)
 export const generatePDF = (id) =>
   api.post(`/datasets/${id}/generate-pdf/`, {}, { responseType: 'blob' })